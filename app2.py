@@ -1,18 +1,41 @@
 
 import streamlit as st
-import pandas as pd
-import tempfile
-import os
-import base64
+import hashlib
 import json
-import google.generativeai as genai
-from google.api_core.exceptions import GoogleAPIError
-import io
+import logging
+import os
+import threading
 import time
-import re
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from PIL import Image
-import PyPDF2
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import extractor_core as core
+from extractor_core import ExtractionError
+from job_queue import ACTIVE_STATUSES, DEFAULT_JOB_WORKERS, JobQueue, JobStore, format_job_progress
+import metrics
+from metrics import stage, timed
+from model_registry import get_model_registry
+from rate_limiter import all_limiter_stats
+from result_cache import ResultCache
+from table_export import (
+    export_tables_columnar, export_tables_xlsx, export_tables_zip, frame_to_csv_bytes, get_export_frame,
+    get_original_text, get_xlsx_engine, import_pyarrow, merge_tables, table_file_name, table_label
+)
+from table_processing import restructure_table_data, is_contract_table
+
+logger = logging.getLogger("table_extractor")
+
+# 세션에 보관할 최근 추출 결과 수
+MAX_SESSION_RESULTS = 5
+# 이보다 행이 많은 표는 페이지로 나누어 표시
+DISPLAY_PAGE_ROWS = 500
+# 작업 목록에 표시할 최근 작업 수와 진행 중인 작업의 화면 갱신 간격(초)
+MAX_LISTED_JOBS = 20
+JOB_REFRESH_INTERVAL = 2
+# 일괄 추출 대시보드 갱신 간격(초)
+BATCH_REFRESH_INTERVAL = 0.5
 
 # 페이지 설정
 st.set_page_config(
@@ -34,562 +57,614 @@ def get_api_key():
 # Gemini API 설정
 def setup_gemini_api(api_key):
     try:
-        genai.configure(api_key=api_key)
+        core.configure_gemini(api_key)
         return True
-    except Exception as e:
-        st.error(f"Gemini API 설정 중 오류가 발생했습니다: {e}")
+    except ExtractionError as e:
+        st.error(str(e))
         return False
 
+# 추출 결과 캐시 (프로세스 전체에서 공유)
+@st.cache_resource
+def get_result_cache():
+    try:
+        return ResultCache()
+    except Exception as e:
+        logger.exception("결과 캐시 초기화 중 오류: %s", e)
+        return None
+
+# 백그라운드 작업 대기열 (프로세스 전체에서 공유, 모든 세션의 작업을 같은 작업 풀에서 처리)
+@st.cache_resource
+def get_job_queue():
+    try:
+        workers = int(os.environ.get("TABLE_EXTRACTOR_JOB_WORKERS", DEFAULT_JOB_WORKERS))
+        return JobQueue(JobStore(), workers=workers, cache=get_result_cache())
+    except Exception as e:
+        logger.exception("작업 대기열 초기화 중 오류: %s", e)
+        return None
+
+# 무거운 모듈(google.generativeai, PyPDF2, PIL)과 모델 핸들을 백그라운드에서 미리 준비
+# (처음 사용할 때 불러오는 모듈을 화면을 그리는 동안 불러오며, 프로세스마다 설정 조합별로 한 번만 실행)
+@st.cache_resource(show_spinner=False)
+def start_warm_up(model_name=None, api_key=None, quality="균형", output_format=None):
+    thread = threading.Thread(target=core.warm_up, args=(model_name, api_key, quality, output_format),
+                              name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# 새로고침해도 같은 작업 목록을 볼 수 있도록 URL에 저장하는 작업 소유자 ID
+def get_job_owner():
+    owner = st.query_params.get("jobs")
+    if not owner:
+        owner = uuid.uuid4().hex
+        st.query_params["jobs"] = owner
+    return owner
+
 # 현재 날짜와 시간을 파일명에 적합한 형식으로 반환
 def get_timestamp_filename():
     """현재 날짜와 시간을 'YYYY-MM-DD_HHMMSS' 형식으로 반환"""
     now = datetime.now()
     return now.strftime("%Y-%m-%d_%H%M%S")
 
-# PDF 테이블 구조와 유사하게 데이터 재구성
-def restructure_table_data(df):
-    """
-    Gemini가 추출한 단일 행 CSV 데이터를 PDF 테이블 구조와 유사하게 재구성
+# 핵심 모듈의 알림을 Streamlit 메시지로 표시
+def streamlit_notify(level, message):
+    if level == "warning":
+        st.warning(message)
+    else:
+        st.info(message)
+
+# 세션 설정에서 추출 옵션 구성
+def get_extraction_options():
+    """현재 세션 설정(품질, 커스텀 프롬프트, 캐시)을 핵심 모듈 인자로 변환"""
+    prompt = None
+    if st.session_state.get('developer_mode', False) and st.session_state.get('custom_prompt'):
+        prompt = st.session_state.get('custom_prompt')
+        st.info("커스텀 프롬프트를 사용합니다.")
+    
+    return {
+        'quality': st.session_state.get('extraction_quality', "높음"),
+        'prompt': prompt,
+        'cache': get_result_cache() if st.session_state.get('use_cache', True) else None,
+        'notify': streamlit_notify,
+        'output_format': st.session_state.get('output_format', "auto"),
+    }
+
+# 작업 스레드에서도 st.* 호출이 현재 세션에 표시되도록 실행 컨텍스트를 전달하는 초기화 함수
+def make_thread_initializer():
+    ctx = get_script_run_ctx()
     
-    Args:
-        df (DataFrame): 원본 데이터프레임
+    def attach_context():
+        add_script_run_ctx(threading.current_thread(), ctx)
     
-    Returns:
-        DataFrame: 재구성된 데이터프레임
-    """
-    try:
-        # 데이터가 없는 경우 원본 반환
-        if df.empty or len(df) == 0:
-            return df
-            
-        # 첫 번째 행의 데이터만 사용 (일반적으로 단일 행으로 추출됨)
-        if len(df) == 1:
-            row_data = df.iloc[0]
-        else:
-            # 여러 행이 있는 경우 (드문 경우) 첫 행 사용
-            row_data = df.iloc[0]
-        
-        # 새로운 데이터프레임 구조 정의
-        # 상단 테이블 (기본 정보)
-        header1 = ['호실', '계약자', '면적(㎡)', '분양대금']
-        data1 = []
-        
-        # 행 1 (호실, 계약번호, 계약자, 면적)
-        if '호실' in df.columns and '계약자' in df.columns:
-            data1.append([
-                row_data.get('호실', ''),
-                row_data.get('계약자', ''),
-                row_data.get('면적(㎡)', ''),
-                row_data.get('분양대금', '')
-            ])
-        else:
-            # 컬럼명이 다른 경우 처리
-            columns = df.columns.tolist()
-            if len(columns) >= 4:
-                data1.append([row_data[columns[0]], row_data[columns[1]], 
-                             row_data[columns[2]], row_data[columns[5]]])
-            else:
-                # 컬럼이 부족한 경우 빈 데이터 삽입
-                data1.append(['', '', '', ''])
-        
-        top_table = pd.DataFrame(data1, columns=header1)
-        
-        # 하단 테이블 (납부 정보)
-        header2 = ['구분', '납부할금액(연체료포함)', '납부금액', '납부일']
-        data2 = []
-        
-        # 계약금
-        data2.append(['계약금', 
-                     row_data.get('납부할금액(연체료포함)', ''), 
-                     row_data.get('납부금액', ''),
-                     row_data.get('납부일', '')])
-        
-        # 중도금 1~4차
-        for i in range(1, 5):
-            data2.append([f'중도금 {i}차',
-                         row_data.get(f'납부할금액(연체료포함).{i}', ''),
-                         row_data.get(f'납부금액.{i}', ''),
-                         row_data.get(f'납부일.{i}', '')])
-        
-        # 잔금
-        data2.append(['잔금',
-                     row_data.get('납부할금액(연체료포함).5', ''),
-                     row_data.get('납부금액.5', ''),
-                     row_data.get('납부일.5', '')])
-        
-        bottom_table = pd.DataFrame(data2, columns=header2)
-        
-        # 필요한 경우 두 테이블을 결합
-        # 여기서는 별도로 반환하여 사용자가 선택할 수 있게 함
-        return {
-            'top_table': top_table,
-            'bottom_table': bottom_table,
-            'combined': pd.concat([top_table, pd.DataFrame([['---', '---', '---', '---']], columns=header1), bottom_table], ignore_index=True)
-        }
-        
-    except Exception as e:
-        print(f"테이블 재구성 중 오류: {e}")
-        return df
+    return attach_context
 
-# 이미지 처리 함수
-def process_image_file(image_file):
+# 핵심 함수: 업로드한 파일 하나에서 표 추출 (추출 방식 선택은 core.extract_document가 담당)
+def extract_uploaded_file(uploaded_file, file_format, gemini_model, messages, **document_options):
     """
-    업로드된 이미지 파일을 처리하여 바이트로 반환
+    업로드한 파일 하나를 core.extract_document로 추출
+    
+    PDF 첫 페이지/전체 페이지, 텍스트 레이어, 긴 이미지 분할 중 어떤 방식으로 추출할지는
+    core.extract_document가 정하며, 핵심 모듈의 알림은 messages에 모아 결과 화면에 함께 표시합니다.
     
     Args:
-        image_file: Streamlit의 업로드된 이미지 파일
-        
+        uploaded_file: Streamlit의 업로드된 파일
+        file_format (str): 'pdf' 또는 이미지 확장자
+        gemini_model (str): 사용할 Gemini 모델명
+        messages (list): (level, message) 알림을 모을 목록
+        **document_options: core.extract_document 인자 (all_pages, pages_per_chunk, max_workers 등)
+    
     Returns:
-        bytes: 처리된 이미지의 바이트
+        list: 표 정보 dict 목록 (실패하면 빈 목록)
     """
+    # 스트리밍 모드: 표가 완성되는 즉시 미리보기로 표시하고, 추출이 끝나면 최종 결과 화면으로 대체
+    stream = st.session_state.get('stream_results', False)
+    preview = st.empty()
+    preview_box = preview.container()
+    
+    def show_table(table):
+        with preview_box:
+            st.caption(f"표 {table['index']+1} 수신")
+            if table.get('error', False):
+                st.text(table['df']['original_csv'].iloc[0][:500])
+            else:
+                st.dataframe(table['df'], use_container_width=True)
+    
+    options = get_extraction_options()
+    options['notify'] = lambda level, message: messages.append((level, message))
     try:
-        # 이미지 파일 읽기
-        image_bytes = io.BytesIO(image_file.getvalue())
-        image = Image.open(image_bytes)
-        
-        # 이미지 크기 확인
-        width, height = image.size
-        
-        # 이미지 최적화 및 품질 개선
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # 이미지가 너무 작은 경우 확대
-        min_dimension = 1200  # 최소 권장 크기
-        if width < min_dimension or height < min_dimension:
-            scale_factor = max(min_dimension / width, min_dimension / height)
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            st.info(f"이미지 품질 개선을 위해 크기를 조정했습니다: {width}x{height} → {new_width}x{new_height}")
-        
-        # 이미지 선명도 개선 (필요한 경우)
-        from PIL import ImageEnhance
-        enhancer = ImageEnhance.Sharpness(image)
-        image = enhancer.enhance(1.2)  # 약간의 선명도 향상
-        
-        # 대비 향상
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(1.1)  # 약간의 대비 향상
-            
-        # 고품질 바이트로 변환
-        output_bytes = io.BytesIO()
-        image.save(output_bytes, format='PNG', compress_level=0)  # 최대 품질
-        output_bytes.seek(0)
-        
-        return output_bytes.getvalue()
-        
-    except Exception as e:
-        st.error(f"이미지 처리 중 오류: {e}")
-        return None
+        # PDF는 업로드 파일 객체를 그대로 넘겨 바이트 사본을 만들지 않음
+        result = core.extract_document(
+            uploaded_file if file_format == "pdf" else uploaded_file.getvalue(),
+            file_format, gemini_model, get_api_key(),
+            thread_initializer=make_thread_initializer(),
+            stream=stream,
+            on_table=show_table if stream else None,
+            **options,
+            **document_options
+        )
+    except ExtractionError as e:
+        st.error(str(e))
+        return []
+    finally:
+        preview.empty()
+    
+    failed = result.extra.get('failed') or []
+    if failed and file_format == "pdf":
+        page_list = ", ".join(core.format_page_range(start, end) for start, end in failed)
+        messages.append(("warning", f"다음 페이지는 추출에 실패했습니다: {page_list}"))
+    elif failed:
+        messages.append(("warning", f"다음 조각은 추출에 실패했습니다: {', '.join(map(str, failed))}"))
+    if result.extra.get('text_layer'):
+        messages.append(("info", "텍스트 레이어에서 표를 바로 추출했습니다."))
+    if result.from_cache:
+        messages.append(("info", "이전에 추출한 결과를 캐시에서 불러왔습니다."))
+    
+    # 디버깅 모드 출력 (옵션) - 요청 하나로 추출한 경우의 응답 정보
+    if st.session_state.get('developer_mode', False) and result.raw_text:
+        if not result.from_cache:
+            st.caption(
+                f"시도 {result.attempts}회, 속도 제한 대기 {result.extra.get('rate_limit_wait', 0):.1f}초, "
+                f"재시도 대기 {result.extra.get('backoff_wait', 0):.1f}초"
+            )
+        if result.extra.get('model'):
+            st.caption(
+                f"사용 모델: {result.extra['model']}"
+                + (f" (재추출 사유: {'; '.join(result.extra['escalation_reasons'])})" if result.extra.get('escalated') else "")
+            )
+        st.text_area("API 응답 원본", result.raw_text, height=200)
+    
+    return result.tables
 
-# PDF에서 첫 페이지만 추출
-def extract_first_page_pdf(pdf_file):
-    """PDF에서 첫 페이지만 추출하여 새 PDF로 반환"""
-    try:
-        # 입력 PDF 읽기
-        pdf_bytes = io.BytesIO(pdf_file.getvalue())
-        reader = PyPDF2.PdfReader(pdf_bytes)
-        
-        if len(reader.pages) == 0:
-            st.error("PDF 파일이 비어있습니다.")
-            return None
-            
-        # 새 PDF 생성
-        writer = PyPDF2.PdfWriter()
-        # 첫 페이지만 추가
-        writer.add_page(reader.pages[0])
-        
-        # 새 PDF를 바이트로 저장
-        output_bytes = io.BytesIO()
-        writer.write(output_bytes)
-        output_bytes.seek(0)
-        
-        return output_bytes.getvalue()
-        
-    except Exception as e:
-        st.error(f"PDF 첫 페이지 추출 중 오류: {e}")
-        return None
+# 업로드한 파일과 추출 설정으로 세션 결과 키 생성
+def get_result_key(file_bytes, settings):
+    """파일 내용 해시와 추출 설정을 합쳐 세션에 저장한 결과를 찾는 키 생성"""
+    hasher = hashlib.sha256(file_bytes)
+    hasher.update(json.dumps(settings, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+    return hasher.hexdigest()
 
+# 추출 결과를 세션에 저장 (오래된 결과부터 삭제)
+def store_result(result_key, result):
+    results = st.session_state.setdefault('extraction_results', {})
+    results.pop(result_key, None)
+    results[result_key] = result
+    while len(results) > MAX_SESSION_RESULTS:
+        results.pop(next(iter(results)))
 
-# 핵심 함수: 파일을 Gemini API에 직접 전송하여 표 추출
-def extract_tables_from_file_directly(file_bytes, file_type, gemini_model, max_retries=3):
-    """파일을 직접 Gemini API에 전송하여 표 추출"""
-    try:
-        # API 키 확인
-        api_key = get_api_key()
-        if not api_key:
-            st.error("API 키가 설정되지 않았습니다.")
-            return []
-            
-        # API 키 설정
-        if not setup_gemini_api(api_key):
-            st.error("Gemini API 설정에 실패했습니다.")
-            return []
-        
-        # 고급 설정에 따른 모델 구성
-        temperature = 0.0
-        max_tokens = 30000
-        
-        if 'extraction_quality' in st.session_state:
-            if st.session_state.extraction_quality == "빠름":
-                temperature = 0.2
-                max_tokens = 12000
-            elif st.session_state.extraction_quality == "균형":
-                temperature = 0.1
-                max_tokens = 20000
-            else:  # 높은 품질
-                temperature = 0.0
-                max_tokens = 30000
-        
-        # 파일 타입에 따라 프롬프트 및 MIME 타입 설정
-        if file_type == "pdf":
-            prompt = """
-            이 PDF 문서에서 모든 표를 찾아 정확한 CSV 형식으로 변환해주세요. 
-            PDF가 90도 회전되어 있더라도 알아서 인식하고 표의 내용을 정확히 추출해주세요.
+# 내보내기 바이트를 결과에 보관하여 화면이 다시 실행될 때 다시 만들지 않음
+def get_export_bytes(result, key, build):
+    exports = result.setdefault('exports', {})
+    if key not in exports:
+        exports[key] = build()
+    return exports[key]
 
-            추출 시 다음 지침을 철저히 따라주세요:
-            1. 문서에 있는 모든 표를 개별적으로 추출하세요. 이는 다음과 같은 모든 유형의 표를 포함합니다:
-               - 재무제표/재무상태표/대차대조표
-               - 손익계산서
-               - 현금흐름표
-               - 자본변동표
-               - 주요 투자지표
-               - 주석사항과 부가설명이 포함된 표
-               - 그 외 모든 숫자나 데이터가 포함된 표
+# 큰 표는 페이지로 나누어 표시
+def show_dataframe(df, key):
+    if len(df) <= DISPLAY_PAGE_ROWS:
+        st.dataframe(df, use_container_width=True)
+        return
+    page_count = (len(df) + DISPLAY_PAGE_ROWS - 1) // DISPLAY_PAGE_ROWS
+    page = st.number_input(
+        f"페이지 (전체 {page_count}페이지, {len(df)}행)",
+        min_value=1, max_value=page_count, value=1, key=f"page_{key}"
+    )
+    start = (page - 1) * DISPLAY_PAGE_ROWS
+    st.dataframe(df.iloc[start:start + DISPLAY_PAGE_ROWS], use_container_width=True)
 
-            2. 각 표의 구조와 형식을 정확하게 유지하세요:
-               - 연도별 칼럼 구조 유지 (2016, 2017, 2018, 2019, 2020년 등 모든 연도 포함)
-               - 금액 단위(백만원, 억원 등) 표시 포함
-               - 모든 항목명(매출액, 영업이익, 자산총계 등)을 정확히 포함
-               - 음수 값은 원래 형태로 유지(-기호 포함)
-               - 비율(%) 값은 원래 형태로 유지(% 기호 포함 가능)
-            
-            3. 표 전체를 완전히 추출하세요:
-               - 표의 모든 행과 열이 누락 없이 추출되어야 합니다
-               - 표의 제목/헤더/부제목도 포함해야 합니다
-               - 표 하단의 주석이나 출처 정보도 가능하면 포함하세요
-            
-            4. 각 표를 개별적으로 처리하여 "TABLE_START"로 시작하고 "TABLE_END"로 끝내세요.
-            5. 빈 셀은 빈 문자열("")로 표시하세요.
-            6. 표가 없으면 "NO_TABLES_FOUND"라고 응답하세요.
+# 표 하나를 표시하고 CSV 다운로드 버튼 추가
+def show_table(result, table, result_key):
+    """선택한 표 하나만 화면에 표시 (CSV 바이트도 이 표에 대해서만 생성)"""
+    if 'page' in table:
+        st.caption(f"출처: {table['page']}페이지")
+    if table.get('title') or table.get('unit'):
+        # JSON 응답 모드에서 받은 표 제목과 단위
+        st.caption(" · ".join(filter(None, [table.get('title'), f"단위: {table['unit']}" if table.get('unit') else None])))
+    df = table['df']
+    should_restructure = st.session_state.get('restructure_table', False)
+    table_key = f"{result_key}_{table['index']}"
+    
+    if table.get('error', False):
+        st.warning("이 표는 파싱 오류가 발생했습니다. 원본 CSV 데이터를 표시합니다.")
+        st.text_area("원본 CSV", get_original_text(table), height=200, key=f"raw_{table_key}")
+    elif should_restructure and is_contract_table(df):
+        # 표 재구성 옵션이 켜져 있고, 표가 일정 형식을 가진 경우에만 재구성
+        restructured_data = restructure_table_data(df)
+        if isinstance(restructured_data, dict) and 'top_table' in restructured_data:
+            st.subheader("재구성된 데이터")
+            st.dataframe(restructured_data['top_table'], use_container_width=True)
+            st.dataframe(restructured_data['bottom_table'], use_container_width=True)
+        else:
+            st.subheader("원본 데이터 (재구성 실패)")
+            show_dataframe(df, table_key)
+    else:
+        st.subheader("원본 데이터")
+        show_dataframe(df, table_key)
+    
+    export_df = get_export_frame(table, should_restructure)
+    if export_df is not None:
+        csv = get_export_bytes(
+            result, ('csv', table['index'], should_restructure),
+            lambda: frame_to_csv_bytes(export_df)
+        )
+        st.download_button(
+            label="CSV로 다운로드",
+            data=csv,
+            file_name=f"{table_file_name(result['file_name'] + '_' + result['timestamp'], table)}.csv",
+            mime='text/csv',
+            key=f"csv_{table_key}"
+        )
+
+# 모든 표를 한 번에 내려받는 ZIP/XLSX/Parquet 버튼
+def show_bulk_export(result, result_key):
+    tables = result['tables']
+    should_restructure = st.session_state.get('restructure_table', False)
+    base_name = f"{result['file_name']}_{result['timestamp']}"
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        zip_key = ('zip', should_restructure)
+        if zip_key in result['exports'] or st.button("전체 표 ZIP 만들기", key=f"zip_build_{result_key}"):
+            data = get_export_bytes(result, zip_key,
+                                    lambda: export_tables_zip(tables, base_name, should_restructure))
+            st.download_button(
+                label="전체 표 ZIP 다운로드",
+                data=data,
+                file_name=f"{base_name}_tables.zip",
+                mime='application/zip',
+                key=f"zip_{result_key}"
+            )
+    with col2:
+        if get_xlsx_engine() is None:
+            st.caption("XLSX로 내보내려면 openpyxl 또는 xlsxwriter를 설치하세요.")
+        else:
+            xlsx_key = ('xlsx', should_restructure)
+            if xlsx_key in result['exports'] or st.button("전체 표 XLSX 만들기", key=f"xlsx_build_{result_key}"):
+                data = get_export_bytes(result, xlsx_key,
+                                        lambda: export_tables_xlsx(tables, should_restructure))
+                st.download_button(
+                    label="전체 표 XLSX 다운로드",
+                    data=data,
+                    file_name=f"{base_name}_tables.xlsx",
+                    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                    key=f"xlsx_{result_key}"
+                )
+    with col3:
+        if import_pyarrow() is None:
+            st.caption("Parquet으로 내보내려면 pyarrow를 설치하세요.")
+        else:
+            parquet_key = ('parquet', should_restructure)
+            if parquet_key in result['exports'] or st.button("전체 표 Parquet 만들기", key=f"parquet_build_{result_key}"):
+                data = get_export_bytes(result, parquet_key,
+                                        lambda: export_tables_columnar(tables, "parquet", should_restructure))
+                st.download_button(
+                    label="전체 표 Parquet 다운로드 (숫자 열 타입 유지)",
+                    data=data,
+                    file_name=f"{base_name}_tables.parquet",
+                    mime='application/vnd.apache.parquet',
+                    key=f"parquet_{result_key}"
+                )
 
-            응답은 CSV 형식의 텍스트만 제공하고, 다른 설명이나 분석은 포함하지 마세요.
-            """
-            mime_type = "application/pdf"
-        else:  # 이미지 파일인 경우
-            prompt = """
-            이 이미지에서 모든 표를 찾아 정확한 CSV 형식으로 변환해주세요.
-            이미지가 90도 회전되어 있더라도 알아서 인식하고 표의 내용을 정확히 추출해주세요.
+# 세션에 저장된 추출 결과 표시
+@timed("render")
+def show_results(result, result_key, file_type):
+    """추출 결과 표시 (여러 표는 선택한 표 하나만 그림)"""
+    for level, message in result['messages']:
+        streamlit_notify(level, message)
+    
+    tables = result['tables']
+    
+    # 추출된 표가 하나 이상인 경우 처리
+    if tables:
+        st.success(f"{len(tables)}개의 표를 찾았습니다.")
+        if len(tables) > 1:
+            labels = [table_label(t) for t in tables]
+            selected = st.selectbox("표 선택", options=labels, key=f"table_select_{result_key}")
+            show_table(result, tables[labels.index(selected)], result_key)
+            show_bulk_export(result, result_key)
+        else:
+            # 단일 표인 경우
+            st.subheader("추출된 표")
+            show_table(result, tables[0], result_key)
+    else:
+        st.warning(f"{file_type}에서 표를 찾을 수 없습니다.")
+        if file_type == "PDF 파일":
+            st.info("""
+            다음을 시도해보세요:
+            1. PDF가 텍스트 레이어를 포함하고 있는지 확인하세요 (스캔된 문서는 OCR이 필요할 수 있습니다).
+            2. 표가 실제로 표 형식인지 확인하세요.
+            3. PDF 파일 크기를 줄이거나 해상도를 높여보세요.
+            """)
+        else:
+            st.info("""
+            다음을 시도해보세요:
+            1. 이미지 해상도가 충분히 높은지 확인하세요.
+            2. 이미지가 흐릿하거나 왜곡되지 않았는지 확인하세요.
+            3. 표가 명확하게 보이는지 확인하세요.
+            4. 다른 형식으로 변환해서 시도해보세요.
+            """)
 
-            추출 시 다음 지침을 철저히 따라주세요:
-            1. 이미지에 있는 모든 표를 개별적으로 추출하세요. 이는 다음과 같은 모든 유형의 표를 포함합니다:
-               - 재무제표/재무상태표/대차대조표 (유동자산, 비유동자산, 자산총계, 부채, 자본 등)
-               - 손익계산서 (매출액, 매출원가, 판매비와관리비, 영업이익, EBITDA 등)
-               - 현금흐름표 (영업활동, 투자활동, 재무활동 현금흐름 등)
-               - 자본변동표
-               - 주요 투자지표 (성장성, 수익성, EPS, PER, ROE 등)
-               - 그 외 모든 숫자나 데이터가 포함된 표
-            
-            2. 각 표의 구조와 형식을 정확하게 유지하세요:
-               - 연도별 칼럼 구조 유지 (표에 있는 모든 연도의 데이터를 추출)
-               - 모든 행과 열을 누락 없이 포함 (금액, 비율, 숫자값 등)
-               - 표의 원래 구조를 최대한 그대로 유지
-               - 음수 값은 "-" 기호를 포함하여 원래 형태로 유지
-               - 괄호 안의 숫자(손실/마이너스 표시)도 음수로 적절히 변환
-            
-            3. 표 전체를 완전히 추출하세요:
-               - 표 상단의 제목과 부제목도 가능하면 포함
-               - 표 내의 모든 카테고리와 항목명을 정확하게 포함
-               - 표 하단의 주석이나 출처 정보도 가능하면 포함
-            
-            4. 각 표마다 "TABLE_START"로 시작하고 "TABLE_END"로 끝내세요.
-            5. 빈 셀은 빈 문자열("")로 처리하세요.
-            6. 표가 없으면 "NO_TABLES_FOUND"라고 응답하세요.
+# 단계별 소요 시간과 요청 사용량 요약 (개발자 모드 사이드바)
+def show_metrics_summary():
+    summary = metrics.summary()
+    if not summary['stages']:
+        return
+    st.markdown("**단계별 소요 시간**")
+    for name, entry in sorted(summary['stages'].items(), key=lambda item: -item[1]['total']):
+        st.caption(f"{name}: {entry['count']}회, 평균 {entry['mean']:.2f}초, 최대 {entry['max']:.2f}초")
+    counters = summary['counters']
+    st.caption(
+        f"요청 {counters.get('requests_total', 0)}건, 전송 {counters.get('request_bytes_sent_total', 0) / 1024:.1f} KB, "
+        f"재시도 {counters.get('request_retries_total', 0)}회, "
+        f"토큰 입력 {counters.get('prompt_tokens_total', 0)} / 출력 {counters.get('output_tokens_total', 0)}"
+    )
+    with st.expander("Prometheus 지표"):
+        text = metrics.prometheus_text()
+        st.code(text, language="text")
+        st.download_button("지표 다운로드", data=text, file_name="table_extractor_metrics.prom", mime="text/plain")
 
-            응답은 CSV 형식의 텍스트만 제공하고, 다른 설명이나 분석은 포함하지 마세요.
-            이미지에 보이는 모든 표와 데이터를 완전하고 정확하게 추출하는 것이 가장 중요합니다.
-            """
-            # 이미지 파일 MIME 타입 설정
-            if file_type.lower() in ["jpg", "jpeg"]:
-                mime_type = "image/jpeg"
-            elif file_type.lower() == "png":
-                mime_type = "image/png"
+# 백그라운드 작업 목록 표시 (진행 상황, 취소, 결과 보기)
+def show_job_panel(api_key):
+    queue = get_job_queue()
+    if queue is None:
+        return
+    owner = get_job_owner()
+    if queue.resume_interrupted(owner, api_key):
+        st.info("서버가 다시 시작되어 중단된 작업을 다시 시작했습니다.")
+    
+    jobs = queue.store.list_jobs(owner=owner)[:MAX_LISTED_JOBS]
+    if not jobs:
+        return
+    
+    st.subheader("추출 작업")
+    for job in jobs:
+        progress, label = format_job_progress(job)
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.progress(progress, text=f"{job['file_name']} - {label}")
+            if job['status'] == "failed":
+                st.caption(f"오류: {job['error']}")
+        with col2:
+            if job['status'] in ACTIVE_STATUSES:
+                if st.button("취소", key=f"cancel_{job['id']}", disabled=job['cancel_requested']):
+                    queue.cancel(job['id'])
+                    st.rerun()
+            elif job['has_result']:
+                if st.button("결과 보기", key=f"open_{job['id']}"):
+                    st.session_state.selected_job = job['id']
             else:
-                mime_type = f"image/{file_type.lower()}"
-        
-        # 개발자 모드에서 커스텀 프롬프트 사용
-        if st.session_state.get('developer_mode', False) and st.session_state.get('custom_prompt'):
-            prompt = st.session_state.get('custom_prompt')
-            st.info("커스텀 프롬프트를 사용합니다.")
-        
-        # API 호출 로직
-        for attempt in range(max_retries):
-            try:
-                with st.spinner(f"Gemini API로 표 추출 중... (시도 {attempt+1}/{max_retries})"):
-                    model = genai.GenerativeModel(
-                        gemini_model,
-                        generation_config=genai.GenerationConfig(
-                            temperature=temperature,  # 설정된 온도 사용
-                            top_p=0.95,
-                            max_output_tokens=max_tokens,  # 설정된 토큰 수 사용
-                        )
-                    )
-                    
-                    response = model.generate_content([
-                        prompt, 
-                        {
-                            "mime_type": mime_type,
-                            "data": file_bytes
-                        }
-                    ])
-                    result = response.text
-                    
-                    # 디버깅 모드 출력 (옵션)
-                    if st.session_state.get('developer_mode', False):
-                        st.text_area("API 응답 원본", result, height=200)
-                    
-                    if "NO_TABLES_FOUND" in result:
-                        return []
-                    
-                    # 결과 처리 코드 (CSV 파싱 등)
-                    tables_data = []
-                    table_pattern = r"TABLE_START\s*(.*?)\s*TABLE_END"
-                    matches = re.findall(table_pattern, result, re.DOTALL)
-                    
-                    for table_idx, table_csv in enumerate(matches):
-                        if table_csv.strip():
-                            try:
-                                # 불필요한 빈 공간 및 따옴표 정리
-                                table_csv = re.sub(r'\s*"\s*,\s*', '",', table_csv)
-                                table_csv = re.sub(r'\s*,\s*"\s*', ',"', table_csv)
-                                
-                                # CSV 파싱
-                                table_data = pd.read_csv(
-                                    io.StringIO(table_csv.strip()), 
-                                    skipinitialspace=True,
-                                    on_bad_lines='warn',
-                                    quoting=1,  # QUOTE_ALL 모드 사용하여 따옴표 처리 개선
-                                    dtype=str  # 모든 열을 문자열로 처리
-                                )
-                                
-                                # 빈 열/행 제거
-                                table_data = table_data.dropna(how='all', axis=0).dropna(how='all', axis=1)
-                                
-                                # 모든 열이 Unnamed인 경우 헤더 없이 처리
-                                if all('Unnamed' in str(col) for col in table_data.columns):
-                                    table_data.columns = [f'Column_{i}' for i in range(len(table_data.columns))]
-                                
-                                # 원본 데이터 저장
-                                original_df = table_data.copy()
-                                
-                                # 결과에 추가 - 재구성이 불필요한 경우 원본 데이터를 바로 사용
-                                tables_data.append({
-                                    'index': table_idx,
-                                    'df': original_df,
-                                    'original_df': original_df  # 원본 데이터도 저장
-                                })
-                            except Exception as csv_error:
-                                st.warning(f"표 {table_idx+1} CSV 파싱 오류: {csv_error}")
-                                
-                                # 파싱 오류 복구 시도
-                                try:
-                                    # 쉼표 분리 문제 해결 시도
-                                    fixed_csv = re.sub(r'("[^"]*),([^"]*")', r'\1COMMA\2', table_csv)
-                                    fixed_csv = fixed_csv.replace('COMMA', ',')
-                                    
-                                    table_data = pd.read_csv(
-                                        io.StringIO(fixed_csv.strip()),
-                                        skipinitialspace=True,
-                                        on_bad_lines='skip',
-                                        quoting=3,  # QUOTE_NONE
-                                        dtype=str
-                                    )
-                                    
-                                    if not table_data.empty:
-                                        original_df = table_data.copy()
-                                        tables_data.append({
-                                            'index': table_idx,
-                                            'df': original_df,
-                                            'original_df': original_df,
-                                            'recovery': True
-                                        })
-                                    else:
-                                        raise Exception("복구된 데이터가 비어있습니다")
-                                except:
-                                    # 원본 CSV 텍스트 저장 (디버깅용)
-                                    error_df = pd.DataFrame({'original_csv': [table_csv.strip()]})
-                                    tables_data.append({
-                                        'index': table_idx,
-                                        'df': error_df,
-                                        'error': True
-                                    })
-                    
-                    return tables_data
-                    
-            except GoogleAPIError as e:
-                if attempt < max_retries - 1:
-                    delay = 2 * (attempt + 1)
-                    st.warning(f"API 호출 중 오류 발생: {e}. {delay}초 후 재시도...")
-                    time.sleep(delay)
-                else:
-                    st.error(f"Gemini API 호출 실패: {e}")
-                    return []
-            except Exception as e:
-                st.error(f"표 추출 중 오류가 발생했습니다: {e}")
-                return []
-    except Exception as e:
-        st.error(f"파일 처리 중 오류가 발생했습니다: {e}")
-        return []
+                if st.button("삭제", key=f"delete_{job['id']}"):
+                    queue.store.delete(job['id'])
+                    st.rerun()
+    
+    # 선택한 작업의 결과 표시 (세션에 한 번 불러온 결과는 다시 읽지 않음)
+    selected = st.session_state.get('selected_job')
+    job = next((j for j in jobs if j['id'] == selected and j['has_result']), None)
+    if job is not None:
+        result_key = f"job_{job['id']}"
+        result = st.session_state.get('extraction_results', {}).get(result_key)
+        if result is None:
+            result = {
+                'tables': queue.store.get_tables(job['id']) or [],
+                'file_name': os.path.splitext(job['file_name'])[0],
+                'timestamp': datetime.fromtimestamp(job['created_at']).strftime("%Y-%m-%d_%H%M%S"),
+                'messages': [tuple(message) for message in job['messages']],
+                'exports': {},
+            }
+            store_result(result_key, result)
+        st.subheader(f"{job['file_name']} 추출 결과")
+        show_results(result, result_key, "PDF 파일" if job['file_type'] == "pdf" else "이미지 파일")
+    
+    # 진행 중인 작업이 있으면 잠시 후 화면을 다시 그려 진행 상황 갱신
+    if any(j['status'] in ACTIVE_STATUSES for j in jobs) and st.session_state.get('auto_refresh_jobs', True):
+        time.sleep(JOB_REFRESH_INTERVAL)
+        st.rerun()
 
-# 표가 계약 테이블 형식인지 확인하는 함수
-def is_contract_table(df):
+# 여러 파일을 동시에 추출하며 파일별 상태를 대시보드로 표시
+def run_batch_extraction(files, gemini_model, options, concurrency, dashboard):
     """
-    표가 계약 테이블 형식(호실, 계약자, 면적 등의 정보)인지 확인
+    업로드한 여러 파일을 최대 concurrency개씩 동시에 전처리/추출
     
-    Args:
-        df (DataFrame): 확인할 데이터프레임
-    
-    Returns:
-        bool: 계약 테이블 형식이면 True, 아니면 False
-    """
-    if df is None or df.empty:
-        return False
-    
-    # 계약 관련 키워드 검사
-    contract_keywords = ['호실', '계약자', '면적', '분양대금', '납부', '계약금', '중도금', '잔금']
-    
-    # 컬럼명에 키워드가 포함되어 있는지 확인
-    columns = [str(col).lower() for col in df.columns]
-    column_match = any(keyword in ' '.join(columns).lower() for keyword in contract_keywords)
-    
-    # 데이터에 키워드가 포함되어 있는지 확인
-    data_match = False
-    if len(df) > 0:
-        # 첫 10개 행만 검사 (성능상 이유)
-        sample = df.head(10)
-        for col in sample.columns:
-            # 각 컬럼의 데이터를 문자열로 변환하여 검사
-            col_data = ' '.join(sample[col].astype(str).tolist()).lower()
-            if any(keyword in col_data for keyword in contract_keywords):
-                data_match = True
-                break
-    
-    # 표 형태 검사 (재무제표 같은 복잡한 표는 일반적으로 행이 많고 열이 많음)
-    is_small_table = len(df) < 20 and len(df.columns) < 10
-    
-    # 계약 테이블로 판단하는 조건: 키워드가 포함되어 있고 작은 표여야 함
-    return (column_match or data_match) and is_small_table
-
-# 표 유형을 감지하는 함수
-def detect_table_type(df):
-    """
-    표 유형을 감지하는 함수 (재무상태표, 손익계산서, 현금흐름표 등)
+    작업 스레드는 Streamlit을 호출하지 않고, 대시보드는 이 스크립트 스레드에서 주기적으로 갱신합니다.
     
     Args:
-        df (DataFrame): 감지할 데이터프레임
+        files (list): Streamlit의 업로드된 파일 목록
+        gemini_model (str): 사용할 Gemini 모델명
+        options (dict): core.extract_document 인자 (quality, prompt, all_pages 등)
+        concurrency (int): 동시에 처리할 최대 파일 수
+        dashboard: 상태 표를 그릴 st.empty() 자리
     
     Returns:
-        str: 감지된 표 유형 ('재무상태표', '손익계산서', '현금흐름표', '기타')
+        list: 파일별 결과 dict ('name', 'status', 'elapsed', 'tables', 'failed', 'messages', 'error')
     """
-    if df is None or df.empty:
-        return '알 수 없음'
-    
-    # 표 유형별 키워드
-    table_type_keywords = {
-        '재무상태표': ['재무상태표', '대차대조표', '자산', '부채', '자본', '유동자산', '비유동자산', '자산총계', '부채총계'],
-        '손익계산서': ['손익계산서', '매출액', '매출원가', '매출총이익', '영업이익', '당기순이익', 'EBITDA', '판매비', '관리비'],
-        '현금흐름표': ['현금흐름표', '영업활동', '투자활동', '재무활동', '현금흐름', '기초현금', '기말현금'],
-        '투자지표': ['PER', 'ROA', 'ROE', 'EPS', 'BPS', '성장성', '수익성', '안정성', '주당순이익']
-    }
-    
-    # 컬럼과 데이터를 하나의 문자열로 합침
-    table_text = ' '.join([str(col) for col in df.columns])
-    
-    # 데이터에서 첫 20개 행만 샘플링하여 문자열로 합침
-    if len(df) > 0:
-        sample = df.head(20)
-        for col in sample.columns:
-            try:
-                table_text += ' ' + ' '.join(sample[col].astype(str).tolist())
-            except:
-                pass
-    
-    table_text = table_text.lower()
-    
-    # 각 유형별 키워드 매칭 점수 계산
-    type_scores = {}
-    for table_type, keywords in table_type_keywords.items():
-        score = sum(1 for keyword in keywords if keyword.lower() in table_text)
-        type_scores[table_type] = score
-    
-    # 가장 높은 점수의 유형 선택
-    max_score_type = max(type_scores.items(), key=lambda x: x[1])
+    api_key = get_api_key()
+    results = [
+        {'name': f.name, 'status': "대기", 'elapsed': None, 'tables': [], 'failed': [], 'messages': [], 'error': None}
+        for f in files
+    ]
+    started = {}
+    
+    def extract_file(idx, data, file_format):
+        started[idx] = time.perf_counter()
+        messages = results[idx]['messages']
+        return core.extract_document(
+            data, file_format, gemini_model, api_key,
+            notify=lambda level, message: messages.append((level, message)),
+            **options
+        )
     
-    # 최소 점수 임계값 설정 (최소 2개 이상의 키워드가 매칭되어야 함)
-    if max_score_type[1] >= 2:
-        return max_score_type[0]
-    else:
-        return '기타'
+    with ThreadPoolExecutor(max_workers=max(1, int(concurrency))) as executor:
+        futures = {
+            executor.submit(extract_file, idx, f.getvalue(), f.name.split('.')[-1].lower()): idx
+            for idx, f in enumerate(files)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=BATCH_REFRESH_INTERVAL, return_when=FIRST_COMPLETED)
+            now = time.perf_counter()
+            for future in done:
+                entry = results[futures[future]]
+                entry['elapsed'] = now - started.get(futures[future], now)
+                try:
+                    result = future.result()
+                    entry['tables'] = result.tables
+                    entry['failed'] = result.extra.get('failed') or []
+                    entry['status'] = "완료" if not entry['failed'] else "일부 실패"
+                except Exception as e:
+                    entry['status'] = "실패"
+                    entry['error'] = str(e)
+            for future in pending:
+                idx = futures[future]
+                if idx in started:
+                    results[idx]['status'] = "처리 중"
+                    results[idx]['elapsed'] = now - started[idx]
+            show_batch_dashboard(dashboard, results)
+    return results
 
-# 표를 적절하게 가공하는 함수
-def process_table_by_type(df, table_type):
-    """
-    표 유형에 따라 적절한 후처리를 수행하는 함수
-    
-    Args:
-        df (DataFrame): 처리할 데이터프레임
-        table_type (str): 표 유형 ('재무상태표', '손익계산서', '현금흐름표', '기타')
-    
-    Returns:
-        DataFrame: 처리된 데이터프레임
-    """
-    if df is None or df.empty:
-        return df
-    
-    # 모든 열과 행에서 공백 제거
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-    
-    # 빈 열과 빈 행 제거
-    df = df.dropna(how='all', axis=0).dropna(how='all', axis=1)
-    
-    # 표 유형에 따른 처리
-    if table_type in ['재무상태표', '손익계산서', '현금흐름표']:
-        # 숫자 데이터 정리
-        # 1) 천단위 구분자(쉼표) 제거
-        # 2) 괄호로 표시된 음수를 "-" 기호로 변환
-        for col in df.columns:
-            if col != df.columns[0]:  # 첫 번째 열은 항목명이므로 제외
-                df[col] = df[col].apply(lambda x: process_numeric_value(x) if pd.notna(x) else x)
-    
-    return df
+# 파일별 상태, 소요 시간, 표 수를 표로 표시
+def show_batch_dashboard(dashboard, results):
+    finished = [r for r in results if r['status'] in ("완료", "일부 실패", "실패")]
+    with dashboard.container():
+        st.progress(
+            len(finished) / len(results),
+            text=f"{len(finished)}/{len(results)}개 파일 처리, 표 {sum(len(r['tables']) for r in results)}개"
+        )
+        st.dataframe(pd.DataFrame({
+            "파일": [r['name'] for r in results],
+            "상태": [r['status'] for r in results],
+            "소요 시간(초)": [round(r['elapsed'], 1) if r['elapsed'] is not None else None for r in results],
+            "표 수": [len(r['tables']) if r['status'] not in ("대기", "처리 중") else None for r in results],
+            "오류": [r['error'] or "" for r in results],
+        }), use_container_width=True, hide_index=True)
 
-# 숫자 값 처리 함수
-def process_numeric_value(value):
-    """
-    숫자 값을 처리하는 함수
-    
-    Args:
-        value: 처리할 값
-    
-    Returns:
-        처리된 값
-    """
-    if not isinstance(value, str):
-        return value
-    
-    # 천단위 구분자(쉼표) 제거
-    value = value.replace(',', '')
-    
-    # 괄호로 표시된 음수를 "-" 기호로 변환
-    if value.startswith('(') and value.endswith(')'):
-        value = '-' + value[1:-1]
+# 여러 파일 업로드와 일괄 추출 화면
+def show_batch_upload(gemini_model):
+    uploaded_files = st.file_uploader(
+        "PDF 또는 이미지 파일을 여러 개 업로드하세요",
+        type=["pdf"] + core.IMAGE_FORMATS,
+        accept_multiple_files=True
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        pdf_scope = st.radio("PDF 추출 범위", ["첫 페이지만", "전체 페이지"], horizontal=True)
+    with col2:
+        concurrency = st.slider("동시 처리 파일 수", min_value=1, max_value=16, value=4)
+    with col3:
+        page_workers = st.slider(
+            "파일당 동시 요청 수", min_value=1, max_value=8, value=2,
+            help="전체 페이지 추출과 이미지 조각 추출에서 파일 하나의 페이지/조각을 동시에 보낼 요청 수"
+        )
+    # 실제 동시 요청 수는 두 값의 곱 (분당 요청 한도를 넘는 요청은 속도 제한기가 대기시킴)
+    st.caption(f"최대 동시 요청 수: {concurrency * page_workers}개 (동시 처리 파일 수 × 파일당 동시 요청 수)")
+    
+    prompt = None
+    if st.session_state.get('developer_mode', False) and st.session_state.get('custom_prompt'):
+        prompt = st.session_state.get('custom_prompt')
+    options = {
+        'quality': st.session_state.get('extraction_quality', "높음"),
+        'prompt': prompt,
+        'all_pages': pdf_scope == "전체 페이지",
+        'pages_per_chunk': 1,
+        'max_workers': page_workers,
+        'text_layer': st.session_state.get('use_text_layer', True),
+        'tile_images': True,
+        'output_format': st.session_state.get('output_format', "auto"),
+    }
+    use_cache = st.session_state.get('use_cache', True)
     
-    return value
-
+    if not uploaded_files:
+        st.info("업로드할 파일을 선택하세요.")
+        return
+    st.caption(f"{len(uploaded_files)}개 파일, {sum(f.size for f in uploaded_files) / 1024:.1f} KB")
+    
+    if st.session_state.get('background_jobs', False):
+        if st.button("모든 파일을 작업 대기열에 추가", type="primary"):
+            queue = get_job_queue()
+            if queue is None:
+                st.error("작업 대기열을 사용할 수 없습니다.")
+                return
+            for f in uploaded_files:
+                queue.submit(
+                    get_job_owner(), f.name, f.name.split('.')[-1].lower(), f.getvalue(), get_api_key(),
+                    dict(options, model_name=gemini_model, use_cache=use_cache)
+                )
+            st.success(f"{len(uploaded_files)}개 파일의 추출 작업을 대기열에 추가했습니다.")
+        return
+    
+    hasher = hashlib.sha256()
+    for f in uploaded_files:
+        hasher.update(get_result_key(f.getvalue(), {'name': f.name}).encode("utf-8"))
+    batch_key = get_result_key(hasher.digest(), dict(options, model=gemini_model))
+    
+    if st.button("일괄 추출 시작", type="primary"):
+        dashboard = st.empty()
+        started = time.perf_counter()
+        file_results = run_batch_extraction(
+            uploaded_files, gemini_model, dict(options, cache=get_result_cache() if use_cache else None),
+            concurrency, dashboard
+        )
+        dashboard.empty()
+        batch = {
+            'files': file_results,
+            'elapsed': time.perf_counter() - started,
+            'file_name': "batch",
+            'timestamp': get_timestamp_filename(),
+            'exports': {},
+        }
+        # 병합 내보내기에 쓰도록 표마다 원본 파일 이름 표시
+        batch['tables'] = [
+            dict(table, file_name=os.path.splitext(r['name'])[0]) for r in file_results for table in r['tables']
+        ]
+        batch['messages'] = []
+        # 파일별 표 보기에 쓰는 결과 (show_results 형식)
+        batch['file_results'] = [
+            {
+                'tables': r['tables'],
+                'file_name': os.path.splitext(r['name'])[0],
+                'timestamp': batch['timestamp'],
+                'messages': r['messages'],
+                'exports': {},
+            }
+            for r in file_results
+        ]
+        store_result(batch_key, batch)
+    
+    batch = st.session_state.get('extraction_results', {}).get(batch_key)
+    if batch is not None:
+        show_batch_results(batch, batch_key)
 
+# 일괄 추출 결과: 파일별 상태, 파일별 표 보기, 병합 내보내기
+def show_batch_results(batch, batch_key):
+    files = batch['files']
+    tables = batch['tables']
+    st.success(
+        f"{len(files)}개 파일에서 {len(tables)}개의 표를 찾았습니다 "
+        f"({batch['elapsed']:.1f}초, 실패 {sum(r['status'] == '실패' for r in files)}개)."
+    )
+    show_batch_dashboard(st.empty(), files)
+    
+    labels = {f"{idx + 1}. {r['name']}": idx for idx, r in enumerate(files) if r['tables']}
+    if labels:
+        selected = labels[st.selectbox("파일 선택", options=list(labels), key=f"batch_file_{batch_key}")]
+        name = files[selected]['name']
+        show_results(batch['file_results'][selected], f"{batch_key}_{selected}",
+                     "PDF 파일" if name.lower().endswith(".pdf") else "이미지 파일")
+    
+    if not tables:
+        return
+    st.subheader("전체 파일 내보내기")
+    should_restructure = st.session_state.get('restructure_table', False)
+    merged_key = ('merged_csv', should_restructure)
+    if merged_key in batch['exports'] or st.button("통합 CSV 만들기", key=f"merged_build_{batch_key}"):
+        data = get_export_bytes(batch, merged_key,
+                                lambda: frame_to_csv_bytes(merge_tables(tables, should_restructure)))
+        st.download_button(
+            label="통합 CSV 다운로드 (모든 표를 한 표로)",
+            data=data,
+            file_name=f"batch_{batch['timestamp']}_merged.csv",
+            mime='text/csv',
+            key=f"merged_{batch_key}"
+        )
+    show_bulk_export(batch, batch_key)
 
 def main():
+    start_warm_up()
     st.title("PDF/이미지 표 추출 및 CSV 변환")
     
     # API 키 설정 로직 개선
@@ -606,6 +681,21 @@ def main():
             index=1  # 기본값은 '균형'
         )
         
+        # 응답 형식 설정
+        output_format_labels = {
+            "auto": "자동",
+            "json": "JSON (구조화된 응답)",
+            "csv": "CSV (TABLE_START 블록)",
+        }
+        st.session_state.output_format = st.selectbox(
+            "응답 형식",
+            options=list(output_format_labels),
+            format_func=output_format_labels.get,
+            help="JSON은 표를 구조화된 응답(제목, 헤더, 행 배열, 단위)으로 받아 한 번에 읽습니다. "
+                 "JSON을 읽지 못한 요청은 CSV 형식으로 다시 추출합니다. JSON은 CSV보다 출력 토큰과 "
+                 "지연 시간이 많으므로 자동은 CSV를 사용합니다 (TABLE_EXTRACTOR_OUTPUT_FORMAT 환경 변수로 변경)."
+        )
+        
         # 재구성 옵션 추가
         st.session_state.restructure_table = st.checkbox(
             "표 재구성",
@@ -613,6 +703,36 @@ def main():
             help="표 구조를 재구성합니다. 특정 형식(계약서 등)의 표에 유용하지만, 재무제표 같은 복잡한 표에는 사용하지 않는 것이 좋습니다."
         )
         
+        # 텍스트 레이어 우선 추출 설정
+        st.session_state.use_text_layer = st.checkbox(
+            "텍스트 레이어 우선 추출",
+            value=True,
+            help="디지털로 생성된 PDF는 API 호출 없이 텍스트 레이어에서 바로 표를 추출하고, 확실하지 않은 페이지만 Gemini로 처리합니다."
+        )
+        
+        # 스트리밍 설정
+        st.session_state.stream_results = st.checkbox(
+            "스트리밍 표시",
+            value=True,
+            help="응답을 기다리지 않고 표가 완성되는 대로 바로 표시합니다."
+        )
+        
+        # 백그라운드 작업 설정
+        st.session_state.background_jobs = st.checkbox(
+            "백그라운드 작업으로 추출",
+            value=False,
+            help="추출을 작업 대기열에 추가하고 화면을 막지 않고 처리합니다. 여러 파일을 이어서 추가할 수 있으며, 새로고침해도 진행 중인 작업과 결과가 유지됩니다."
+        )
+        if st.session_state.background_jobs:
+            st.session_state.auto_refresh_jobs = st.checkbox("작업 진행 상황 자동 새로고침", value=True)
+        
+        # 결과 캐시 설정
+        st.session_state.use_cache = st.checkbox(
+            "결과 캐시 사용",
+            value=True,
+            help="같은 파일을 같은 설정으로 다시 추출하면 API를 호출하지 않고 저장된 결과를 사용합니다."
+        )
+        
         # 개발자 모드 설정
         developer_mode = st.checkbox("개발자 모드")
         if developer_mode:
@@ -622,6 +742,35 @@ def main():
                 value=st.session_state.get('custom_prompt', ''),
                 height=200
             )
+            cache = get_result_cache()
+            if cache is not None:
+                stats = cache.stats()
+                st.caption(
+                    f"캐시: {stats['entries']}개 항목, {stats['bytes'] / 1024:.1f} KB, "
+                    f"적중 {stats['hits']} / 실패 {stats['misses']} (유사 파일 재사용 {stats['similar_hits']})"
+                )
+                if cache.near_duplicates is not None:
+                    similar_stats = cache.near_duplicates.stats()
+                    st.caption(
+                        f"유사 파일 색인: {similar_stats['entries']}개, "
+                        f"결과 재사용 {similar_stats['served']}회, 비슷한 파일 알림 {similar_stats['flagged']}회"
+                    )
+                if st.button("캐시 비우기"):
+                    cache.clear()
+            registry_stats = get_model_registry().stats()
+            st.caption(
+                f"모델 핸들: {registry_stats['models']}개 (재사용 {registry_stats['hits']}회), "
+                f"컨텍스트 캐시: "
+                + (f"{registry_stats['context_caches']}개 (사용 {registry_stats['context_cache_hits']}회)"
+                   if registry_stats['context_caching_supported'] else "지원하지 않는 라이브러리 버전")
+            )
+            for model_name, limiter_stats in all_limiter_stats().items():
+                st.caption(
+                    f"{model_name}: 요청 {limiter_stats['acquisitions']}건 "
+                    f"(대기 {limiter_stats['throttled']}건, {limiter_stats['wait_seconds']:.1f}초), "
+                    f"재시도 {limiter_stats['backoffs']}회 ({limiter_stats['backoff_seconds']:.1f}초)"
+                )
+            show_metrics_summary()
         else:
             st.session_state.developer_mode = False
     
@@ -641,18 +790,51 @@ def main():
         st.success("API 키가 설정되어 있습니다.")
     
     # 모델 선택
-    gemini_model = st.selectbox("Gemini 모델", ["gemini-1.5-pro", "gemini-1.5-flash"])
+    gemini_model = st.selectbox(
+        "Gemini 모델",
+        [core.CASCADE_MODEL, "gemini-1.5-pro", "gemini-1.5-flash"],
+        format_func=lambda name: "자동 (flash 우선, 필요하면 pro)" if name == core.CASCADE_MODEL else name,
+        help="자동: gemini-1.5-flash로 먼저 추출하고, 결과 검증(파싱 오류, 열 수 불일치, 숫자 형식 오류)에 "
+             "실패한 요청만 gemini-1.5-pro로 다시 추출합니다."
+    )
+    start_warm_up(gemini_model, api_key, st.session_state.extraction_quality, st.session_state.output_format)
     
     # 파일 타입 및 파일 업로더 설정
-    file_type = st.radio("파일 타입 선택", ["PDF 파일", "이미지 파일"], horizontal=True)
+    file_type = st.radio("파일 타입 선택", ["PDF 파일", "이미지 파일", "여러 파일"], horizontal=True)
     st.subheader(f"{file_type} 업로드")
+    if file_type == "여러 파일":
+        # 여러 파일을 한 번에 올려 동시에 추출
+        show_batch_upload(gemini_model)
+        if st.session_state.get('background_jobs', False):
+            show_job_panel(api_key)
+        return
+    # 전체 페이지 추출이나 긴 이미지 분할 추출을 고르지 않았을 때의 기본값
+    pages_per_chunk, max_workers = 1, 4
     if file_type == "PDF 파일":
         uploaded_file = st.file_uploader("PDF 파일을 업로드하세요", type="pdf")
         file_format = "pdf"
+        
+        # 추출 범위: 첫 페이지만 또는 전체 페이지 동시 처리
+        pdf_scope = st.radio("추출 범위", ["첫 페이지만", "전체 페이지"], horizontal=True)
+        if pdf_scope == "전체 페이지":
+            col1, col2 = st.columns(2)
+            with col1:
+                pages_per_chunk = st.number_input("요청당 페이지 수", min_value=1, max_value=20, value=1)
+            with col2:
+                max_workers = st.slider("동시 요청 수", min_value=1, max_value=16, value=4)
     else:
         uploaded_file = st.file_uploader("이미지 파일을 업로드하세요", type=["jpg", "jpeg", "png", "bmp", "webp"])
         if uploaded_file is not None:
             file_format = uploaded_file.name.split('.')[-1].lower()
+        
+        # 세로로 긴 스캔/스크린샷은 겹치는 조각으로 나누어 동시에 추출
+        tile_images = st.checkbox(
+            "긴 이미지 분할 추출",
+            value=True,
+            help="세로로 매우 긴 이미지를 겹치는 조각으로 나누어 동시에 추출한 뒤 이어 붙입니다."
+        )
+        if tile_images:
+            max_workers = st.slider("동시 요청 수", min_value=1, max_value=16, value=4)
     
     if uploaded_file is not None:
         st.write({
@@ -665,129 +847,77 @@ def main():
         
         file_name = os.path.splitext(uploaded_file.name)[0]
         
-        # 표 추출 결과를 저장할 변수를 미리 초기화하여 UnboundLocalError를 방지합니다.
-        tables = []
+        # 같은 파일을 같은 설정으로 추출한 결과가 세션에 있으면 다시 추출하지 않고 표시
+        # (다운로드 버튼 등으로 화면이 다시 실행되어도 결과가 유지됨)
+        result_key = get_result_key(uploaded_file.getvalue(), {
+            'file_type': file_type,
+            'model': gemini_model,
+            'pdf_scope': pdf_scope if file_type == "PDF 파일" else None,
+            'pages_per_chunk': pages_per_chunk if file_type == "PDF 파일" and pdf_scope == "전체 페이지" else None,
+            'tile_images': tile_images if file_type == "이미지 파일" else None,
+            'quality': st.session_state.get('extraction_quality'),
+            'use_text_layer': st.session_state.get('use_text_layer', True),
+            'prompt': st.session_state.get('custom_prompt') if st.session_state.get('developer_mode', False) else None,
+            'output_format': st.session_state.get('output_format', "auto"),
+        })
         
-        if st.button("표 추출 시작", type="primary"):
-            with st.spinner(f"{file_type}에서 표를 추출하는 중입니다..."):
-                # 파일 처리: PDF는 첫 페이지, 이미지의 경우 필요한 이미지 전처리 적용
-                if file_type == "PDF 파일":
-                    processed_file = extract_first_page_pdf(uploaded_file)
+        if st.session_state.get('background_jobs', False):
+            # 백그라운드 작업: 대기열에 추가하고 아래 작업 목록에서 진행 상황과 결과 확인
+            if st.button("작업 대기열에 추가", type="primary"):
+                queue = get_job_queue()
+                if queue is None:
+                    st.error("작업 대기열을 사용할 수 없습니다.")
                 else:
-                    processed_file = process_image_file(uploaded_file)
-                    
-                if processed_file is None:
-                    st.error(f"{file_type} 처리에 실패했습니다.")
-                    st.stop()
-                
-                # Gemini API를 통해 표 추출
-                tables = extract_tables_from_file_directly(processed_file, file_format, gemini_model)
-            
-            timestamp = get_timestamp_filename()
-            
-            # 추출된 표가 하나 이상인 경우 처리
-            if tables:
-                st.success(f"{len(tables)}개의 표를 찾았습니다.")
-                if len(tables) > 1:
-                    tabs = st.tabs([f"표 {i+1}" for i in range(len(tables))])
-                    for tab_idx, tab in enumerate(tabs):
-                        with tab:
-                            table_data = next((t for t in tables if t['index'] == tab_idx), None)
-                            if table_data:
-                                df = table_data['df']
-                                # 파싱 오류가 발생한 경우
-                                if table_data.get('error', False):
-                                    st.warning("이 표는 파싱 오류가 발생했습니다. 원본 CSV 데이터를 표시합니다.")
-                                    st.text_area("원본 CSV", df.get('original_csv', ''), height=200)
-                                else:
-                                    # 표 재구성 옵션이 켜져 있고, 표가 일정 형식을 가진 경우에만 재구성
-                                    should_restructure = st.session_state.get('restructure_table', False)
-                                    
-                                    if should_restructure and is_contract_table(df):
-                                        restructured_data = restructure_table_data(df)
-                                        if isinstance(restructured_data, dict) and 'top_table' in restructured_data:
-                                            st.subheader("재구성된 데이터")
-                                            st.dataframe(restructured_data['top_table'], use_container_width=True)
-                                            st.dataframe(restructured_data['bottom_table'], use_container_width=True)
-                                            # 재구성된 데이터로 업데이트
-                                            df = restructured_data
-                                        else:
-                                            st.subheader("원본 데이터 (재구성 실패)")
-                                            st.dataframe(df, use_container_width=True)
-                                    else:
-                                        st.subheader("원본 데이터")
-                                        st.dataframe(df, use_container_width=True)
-                                
-                                # 다운로드 버튼 처리 (각 탭 별로 처리)
-                                csv_filename = f"{file_name}_{timestamp}_table_{tab_idx+1}.csv"
-                                if isinstance(df, dict) and 'combined' in df:
-                                    csv = df['combined'].to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
-                                else:
-                                    csv = df.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
-                                
-                                st.download_button(
-                                    label="CSV로 다운로드",
-                                    data=csv,
-                                    file_name=csv_filename,
-                                    mime='text/csv'
-                                )
-                else:
-                    # 단일 표인 경우
-                    st.subheader("추출된 표")
-                    df = tables[0]['df']
-                    if tables[0].get('error', False):
-                        st.warning("이 표는 파싱 오류가 발생했습니다. 원본 CSV 데이터를 표시합니다.")
-                        st.text_area("원본 CSV", df.get('original_csv', ''), height=200)
-                    else:
-                        # 표 재구성 옵션이 켜져 있고, 표가 일정 형식을 가진 경우에만 재구성
-                        should_restructure = st.session_state.get('restructure_table', False)
-                        
-                        if should_restructure and is_contract_table(df):
-                            restructured_data = restructure_table_data(df)
-                            if isinstance(restructured_data, dict) and 'top_table' in restructured_data:
-                                st.subheader("재구성된 데이터")
-                                st.dataframe(restructured_data['top_table'], use_container_width=True)
-                                st.dataframe(restructured_data['bottom_table'], use_container_width=True)
-                                # 재구성된 데이터로 업데이트
-                                df = restructured_data
-                            else:
-                                st.subheader("원본 데이터 (재구성 실패)")
-                                st.dataframe(df, use_container_width=True)
-                        else:
-                            st.subheader("원본 데이터")
-                            st.dataframe(df, use_container_width=True)
-                    
-                    csv_filename = f"{file_name}_{timestamp}_table_1.csv"
-                    if isinstance(df, dict) and 'combined' in df:
-                        csv = df['combined'].to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
-                    else:
-                        csv = df.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
-                    
-                    st.download_button(
-                        label="CSV로 다운로드",
-                        data=csv,
-                        file_name=csv_filename,
-                        mime='text/csv'
+                    prompt = None
+                    if st.session_state.get('developer_mode', False) and st.session_state.get('custom_prompt'):
+                        prompt = st.session_state.get('custom_prompt')
+                    queue.submit(
+                        get_job_owner(), uploaded_file.name,
+                        "pdf" if file_type == "PDF 파일" else uploaded_file.name.split('.')[-1].lower(),
+                        uploaded_file.getvalue(), api_key,
+                        {
+                            'model_name': gemini_model,
+                            'quality': st.session_state.get('extraction_quality', "높음"),
+                            'prompt': prompt,
+                            'all_pages': file_type == "PDF 파일" and pdf_scope == "전체 페이지",
+                            'pages_per_chunk': pages_per_chunk if file_type == "PDF 파일" and pdf_scope == "전체 페이지" else 1,
+                            'max_workers': max_workers if (file_type == "PDF 파일" and pdf_scope == "전체 페이지") or (file_type == "이미지 파일" and tile_images) else 4,
+                            'text_layer': st.session_state.get('use_text_layer', True),
+                            'tile_images': file_type == "이미지 파일" and tile_images,
+                            'use_cache': st.session_state.get('use_cache', True),
+                            'output_format': st.session_state.get('output_format', "auto"),
+                        }
                     )
-            else:
-                st.warning(f"{file_type}에서 표를 찾을 수 없습니다.")
-                if file_type == "PDF 파일":
-                    st.info("""
-                    다음을 시도해보세요:
-                    1. PDF가 텍스트 레이어를 포함하고 있는지 확인하세요 (스캔된 문서는 OCR이 필요할 수 있습니다).
-                    2. 표가 실제로 표 형식인지 확인하세요.
-                    3. PDF 파일 크기를 줄이거나 해상도를 높여보세요.
-                    """)
-                else:
-                    st.info("""
-                    다음을 시도해보세요:
-                    1. 이미지 해상도가 충분히 높은지 확인하세요.
-                    2. 이미지가 흐릿하거나 왜곡되지 않았는지 확인하세요.
-                    3. 표가 명확하게 보이는지 확인하세요.
-                    4. 다른 형식으로 변환해서 시도해보세요.
-                    """)
+                    st.success(f"{uploaded_file.name} 추출 작업을 대기열에 추가했습니다.")
+        elif st.button("표 추출 시작", type="primary"):
+            messages = []
+            with st.spinner(f"{file_type}에서 표를 추출하는 중입니다..."), stage("extract_total", mode="single"):
+                all_pages = file_type == "PDF 파일" and pdf_scope == "전체 페이지"
+                tables = extract_uploaded_file(
+                    uploaded_file, "pdf" if file_type == "PDF 파일" else file_format, gemini_model, messages,
+                    all_pages=all_pages,
+                    pages_per_chunk=pages_per_chunk,
+                    max_workers=max_workers,
+                    text_layer=st.session_state.get('use_text_layer', True),
+                    tile_images=file_type == "이미지 파일" and tile_images,
+                )
+            
+            store_result(result_key, {
+                'tables': tables,
+                'file_name': file_name,
+                'timestamp': get_timestamp_filename(),
+                'messages': messages,
+                'exports': {},
+            })
+        
+        result = st.session_state.get('extraction_results', {}).get(result_key)
+        if result is not None:
+            show_results(result, result_key, file_type)
     else:
         st.info("업로드할 파일을 선택하세요.")
+    
+    if st.session_state.get('background_jobs', False):
+        show_job_panel(api_key)
 
        
 if __name__ == "__main__":
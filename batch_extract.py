@@ -0,0 +1,383 @@
+"""
+PDF/이미지 표 일괄 추출 CLI
+
+Streamlit 없이 디렉터리나 glob 패턴으로 지정한 파일들을 동시에 처리하고,
+추출된 표를 표마다 하나의 CSV 파일로 저장합니다. --dataset을 지정하면 모든 표를 문서/페이지/표 유형별로
+나눈 Parquet(또는 Arrow IPC) 데이터셋에도 추가합니다.
+
+사용 예:
+    python batch_extract.py scans/ -o output/ --workers 8
+    python batch_extract.py "reports/*.pdf" -o output/ --all-pages --page-workers 4
+    python batch_extract.py "reports/*.pdf" -o output/ --dataset warehouse/statements
+"""
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import extractor_core as core
+from extractor_core import ExtractionError
+from rate_limiter import all_limiter_stats, configure_rate_limit, get_default_rate_limit
+from result_cache import DEFAULT_CACHE_DIR, ResultCache
+from table_dataset import DATASET_FORMATS, TableDatasetWriter
+from table_export import get_original_text, table_file_name
+
+logger = logging.getLogger("table_extractor")
+
+SUPPORTED_EXTENSIONS = ["pdf"] + core.IMAGE_FORMATS
+
+# 프로세스별 결과 캐시 (프로세스 풀에서는 작업 프로세스마다 하나씩 생성)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(cache_dir):
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(cache_dir)
+    return _cache
+
+
+# 명령행 한도를 적용한 프로세스 ID (fork된 작업 프로세스는 부모의 값을 물려받으므로 ID로 구분)
+_rate_limit_pid = None
+_rate_limit_lock = threading.Lock()
+
+
+def apply_rate_limit(options):
+    """
+    명령행에서 지정한 RPM/TPM 한도를 이 프로세스의 공유 제한기에 한 번만 적용
+
+    프로세스 풀에서는 작업 프로세스마다 제한기가 따로 있으므로 한도를 작업자 수로 나눕니다.
+    모델이 자동(CASCADE_MODEL)이면 실제로 요청을 보내는 단계별 모델(flash, pro)마다 같은 한도를 적용합니다.
+    """
+    global _rate_limit_pid
+    with _rate_limit_lock:
+        if _rate_limit_pid == os.getpid():
+            return
+        share = options['workers'] if options['executor'] == "process" else 1
+        models = core.CASCADE_MODELS if options['model'] == core.CASCADE_MODEL else (options['model'],)
+        for model_name in models:
+            default_rpm, default_tpm = get_default_rate_limit(model_name)
+            configure_rate_limit(
+                model_name,
+                max(1, (options['rpm'] or default_rpm) // share),
+                max(1, (options['tpm'] or default_tpm) // share),
+            )
+        _rate_limit_pid = os.getpid()
+
+
+def warm_up_worker(options):
+    """
+    작업 스레드/프로세스 초기화 함수: 무거운 모듈과 모델 핸들, 결과 캐시를 첫 파일을 처리하기 전에 준비
+
+    프로세스 풀에서는 작업 프로세스마다 한 번씩 실행되어 파일마다 모듈을 불러오는 시간을 기다리지 않습니다.
+    초기화 함수에서 예외가 나면 작업 풀 전체가 멈추므로, 준비에 실패해도 기록만 하고 넘어갑니다
+    (같은 오류는 파일을 처리할 때 다시 나서 그 파일의 오류로 보고됩니다).
+    """
+    try:
+        core.warm_up(options['model'], options['api_key'], options['quality'], options['output_format'])
+        if options['use_cache']:
+            get_cache(options['cache_dir'])
+    except Exception as e:
+        logger.warning("작업자를 미리 준비하지 못했습니다: %s", e)
+
+
+def collect_input_files(inputs):
+    """
+    입력 경로(파일, 디렉터리, glob 패턴)를 지원 형식의 파일 목록으로 확장
+
+    Args:
+        inputs (list): 명령행에서 받은 경로 목록
+
+    Returns:
+        list: 중복 없이 정렬된 파일 경로 목록
+    """
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = glob.glob(os.path.join(item, "**", "*"), recursive=True)
+        else:
+            candidates = glob.glob(item, recursive=True)
+        for path in candidates:
+            ext = os.path.splitext(path)[1].lstrip(".").lower()
+            if os.path.isfile(path) and ext in SUPPORTED_EXTENSIONS:
+                files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+def make_document_names(files):
+    """
+    입력 파일마다 출력 파일과 데이터셋 파티션에 쓸 겹치지 않는 문서 이름 지정
+
+    디렉터리를 재귀적으로 모으면 'a/report.pdf'와 'b/report.pdf'처럼 파일 이름이 같은 파일이 생기므로,
+    파일 이름(확장자 제외)이 겹치는 파일은 모든 입력의 공통 상위 디렉터리에 대한 상대 경로
+    ('a__report')를 쓰고, 그래도 겹치면(같은 디렉터리의 report.pdf와 report.png) 경로 해시를 붙입니다.
+
+    Args:
+        files (list): collect_input_files로 모은 절대 경로 목록
+
+    Returns:
+        dict: {파일 경로: 문서 이름}
+    """
+    stems = {path: os.path.splitext(os.path.basename(path))[0] for path in files}
+    stem_counts = Counter(stems.values())
+    root = os.path.commonpath([os.path.dirname(path) for path in files]) if files else ""
+    names = {}
+    for path, stem in stems.items():
+        if stem_counts[stem] > 1:
+            stem = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, "__")
+        names[path] = stem
+    name_counts = Counter(names.values())
+    for path, name in names.items():
+        if name_counts[name] > 1:
+            names[path] = f"{name}_{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}"
+    return names
+
+
+def write_tables(tables, output_dir, base_name):
+    """
+    표 목록을 표마다 하나의 CSV 파일로 저장 (파싱에 실패한 표는 원본 텍스트로 저장)
+
+    Returns:
+        list: 저장된 파일 경로 목록
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for table in tables:
+        name = table_file_name(base_name, table)
+
+        if table.get('error', False):
+            path = os.path.join(output_dir, name + "_error.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(get_original_text(table))
+        else:
+            path = os.path.join(output_dir, name + ".csv")
+            table['df'].to_csv(path, index=False, encoding='utf-8-sig')
+        written.append(path)
+    return written
+
+
+def process_file(path, options, document_name=None):
+    """
+    파일 하나를 전처리하고 표를 추출하여 저장
+
+    Args:
+        path (str): 입력 파일 경로
+        options (dict): 명령행 옵션 (프로세스 풀로 전달할 수 있도록 dict 사용)
+        document_name (str): 출력 파일 이름에 쓸 문서 이름 (None이면 확장자를 뺀 파일 이름)
+
+    Returns:
+        dict: 처리 결과 요약 ('path', 'document', 'tables', 'outputs', 'from_cache', 'failed_pages', 'error',
+              'elapsed')
+    """
+    started = time.perf_counter()
+    document_name = document_name or os.path.splitext(os.path.basename(path))[0]
+    summary = {'path': path, 'document': document_name, 'tables': 0, 'outputs': [], 'from_cache': False, 'failed_pages': [], 'error': None}
+    if options['rpm'] or options['tpm'] or options['executor'] == "process":
+        apply_rate_limit(options)
+
+    try:
+        cache = get_cache(options['cache_dir']) if options['use_cache'] else None
+        file_type = os.path.splitext(path)[1].lstrip(".").lower()
+        if file_type == "pdf":
+            # PDF는 경로를 넘겨 메모리 맵으로 필요한 페이지만 읽음
+            data = path
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+        result = core.extract_document(
+            data, file_type, options['model'], options['api_key'],
+            quality=options['quality'],
+            prompt=options['prompt'],
+            cache=cache,
+            all_pages=options['all_pages'],
+            pages_per_chunk=options['pages_per_chunk'],
+            max_workers=options['page_workers'],
+            text_layer=options['text_layer'],
+            tile_images=options['tile_images'],
+            output_format=options['output_format'],
+        )
+        tables = result.tables
+        summary['failed_pages'] = result.extra['failed']
+        summary['from_cache'] = result.from_cache
+
+        summary['outputs'] = write_tables(tables, options['output_dir'], document_name)
+        summary['tables'] = len(tables)
+        if options.get('dataset'):
+            # 데이터셋은 메인 프로세스의 작성기가 여러 파일의 표를 모아 한꺼번에 씀
+            summary['dataset_tables'] = tables
+    except ExtractionError as e:
+        summary['error'] = str(e)
+    except Exception as e:
+        summary['error'] = f"예상하지 못한 오류: {e}"
+
+    summary['elapsed'] = time.perf_counter() - started
+    return summary
+
+
+def run_batch(files, options, workers=4, executor="thread", names=None):
+    """
+    파일 목록을 작업 풀에서 동시에 처리
+
+    Args:
+        files (list): 입력 파일 경로 목록
+        options (dict): process_file에 전달할 옵션
+        workers (int): 동시에 처리할 파일 수
+        executor (str): 'thread' 또는 'process'
+        names (dict): {파일 경로: 문서 이름} (None이면 make_document_names로 지정)
+
+    Yields:
+        dict: 완료된 순서대로 파일별 처리 결과 요약 (작업 프로세스가 비정상 종료되어 처리하지 못한
+              파일은 'error'에 사유를 담은 요약)
+    """
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_class(max_workers=max(1, workers), initializer=warm_up_worker, initargs=(options,)) as pool:
+        names = names or make_document_names(files)
+        futures = {pool.submit(process_file, path, options, names[path]): path for path in files}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool as e:
+                # 작업 프로세스가 비정상 종료되면 남은 파일도 모두 같은 예외로 끝나므로 파일별 실패로 보고
+                path = futures[future]
+                yield {'path': path, 'document': names[path], 'tables': 0, 'outputs': [], 'from_cache': False,
+                       'failed_pages': [], 'error': f"작업 프로세스가 비정상 종료되었습니다: {e}", 'elapsed': 0.0}
+
+
+def print_summary(results, elapsed):
+    """처리 결과와 처리량 요약 출력"""
+    succeeded = [r for r in results if r['error'] is None]
+    failed = [r for r in results if r['error'] is not None]
+    table_count = sum(r['tables'] for r in succeeded)
+    cache_hits = sum(1 for r in succeeded if r['from_cache'])
+    latencies = sorted(r['elapsed'] for r in results)
+
+    print()
+    print("=== 처리 요약 ===")
+    print(f"파일: {len(results)}개 (성공 {len(succeeded)}, 실패 {len(failed)}, 캐시 적중 {cache_hits})")
+    print(f"추출된 표: {table_count}개")
+    print(f"전체 소요 시간: {elapsed:.1f}초")
+    if elapsed > 0:
+        print(f"처리량: {len(results) / elapsed:.2f} 파일/초, {table_count / elapsed:.2f} 표/초")
+    if latencies:
+        print(f"파일당 소요 시간: 평균 {sum(latencies) / len(latencies):.2f}초, "
+              f"최대 {latencies[-1]:.2f}초")
+    for model_name, stats in all_limiter_stats().items():
+        print(f"속도 제한 ({model_name}): 요청 {stats['acquisitions']}건, 대기 {stats['throttled']}건 "
+              f"{stats['wait_seconds']:.1f}초, 재시도 {stats['backoffs']}회 {stats['backoff_seconds']:.1f}초")
+    for r in failed:
+        print(f"  실패: {r['path']}: {r['error']}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="PDF/이미지에서 표를 일괄 추출하여 CSV로 저장합니다.")
+    parser.add_argument("inputs", nargs="+", help="입력 파일, 디렉터리 또는 glob 패턴")
+    parser.add_argument("-o", "--output-dir", default="output", help="CSV 저장 디렉터리 (기본값: output)")
+    parser.add_argument("--model", default="gemini-1.5-flash", help=f"Gemini 모델 (기본값: gemini-1.5-flash, '{core.CASCADE_MODEL}'이면 flash로 먼저 추출하고 "
+                             "검증에 실패한 요청만 pro로 다시 추출)")
+    parser.add_argument("--quality", choices=list(core.QUALITY_SETTINGS), default="균형", help="추출 품질")
+    parser.add_argument("--output-format", choices=["auto"] + list(core.OUTPUT_FORMATS), default="auto",
+                        help="응답 형식 (기본값: auto - TABLE_EXTRACTOR_OUTPUT_FORMAT 환경 변수, 없으면 csv)")
+    parser.add_argument("--prompt-file", help="커스텀 프롬프트 파일 경로")
+    parser.add_argument("--api-key", help="Google API 키 (기본값: GEMINI_API_KEY 환경 변수)")
+    parser.add_argument("--all-pages", action="store_true", help="PDF의 모든 페이지를 추출 (기본값: 첫 페이지만)")
+    parser.add_argument("--pages-per-chunk", type=int, default=1, help="PDF 요청당 페이지 수")
+    parser.add_argument("--page-workers", type=int, default=2, help="한 파일 내 동시 요청 수 (PDF 페이지, 이미지 조각)")
+    parser.add_argument("--no-text-layer", action="store_true", help="PDF 텍스트 레이어 로컬 추출을 사용하지 않음")
+    parser.add_argument("--no-tiles", action="store_true", help="세로로 긴 이미지를 조각으로 나누지 않음")
+    parser.add_argument("--rpm", type=int, help="분당 최대 요청 수 (기본값: 모델별 기본 한도 또는 GEMINI_RPM, 자동 모델이면 단계별 모델마다 적용)")
+    parser.add_argument("--tpm", type=int, help="분당 최대 토큰 수 (기본값: 모델별 기본 한도 또는 GEMINI_TPM, 자동 모델이면 단계별 모델마다 적용)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="동시에 처리할 파일 수")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread", help="작업 풀 종류")
+    parser.add_argument("--no-cache", action="store_true", help="결과 캐시를 사용하지 않음")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="결과 캐시 디렉터리")
+    parser.add_argument("--dataset", help="표를 문서/페이지/표 유형별로 나누어 추가할 데이터셋 디렉터리 (pyarrow 필요)")
+    parser.add_argument("--dataset-format", choices=list(DATASET_FORMATS), default="parquet",
+                        help="데이터셋 파일 형식 (기본값: parquet)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="상세 로그 출력")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s %(message)s")
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    api_key = args.api_key or os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        print("API 키가 필요합니다. --api-key 또는 GEMINI_API_KEY 환경 변수를 설정하세요.", file=sys.stderr)
+        return 2
+
+    files = collect_input_files(args.inputs)
+    if not files:
+        print("처리할 파일이 없습니다.", file=sys.stderr)
+        return 1
+
+    prompt = None
+    if args.prompt_file:
+        with open(args.prompt_file, encoding="utf-8") as f:
+            prompt = f.read()
+
+    options = {
+        'api_key': api_key,
+        'model': args.model,
+        'quality': args.quality,
+        'output_format': args.output_format,
+        'prompt': prompt,
+        'output_dir': args.output_dir,
+        'all_pages': args.all_pages,
+        'pages_per_chunk': args.pages_per_chunk,
+        'page_workers': args.page_workers,
+        'tile_images': not args.no_tiles,
+        'text_layer': not args.no_text_layer,
+        'use_cache': not args.no_cache,
+        'cache_dir': args.cache_dir,
+        'rpm': args.rpm,
+        'tpm': args.tpm,
+        'workers': args.workers,
+        'executor': args.executor,
+        'dataset': args.dataset,
+    }
+
+    dataset_writer = None
+    if args.dataset:
+        try:
+            dataset_writer = TableDatasetWriter(args.dataset, args.dataset_format)
+        except ImportError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+
+    print(f"{len(files)}개 파일 처리 시작 (작업자 {args.workers}개, {args.executor})")
+    started = time.perf_counter()
+    results = []
+    for result in run_batch(files, options, workers=args.workers, executor=args.executor):
+        status = "실패" if result['error'] else f"표 {result['tables']}개"
+        print(f"[{len(results) + 1}/{len(files)}] {os.path.basename(result['path'])}: {status} ({result['elapsed']:.1f}초)")
+        dataset_tables = result.pop('dataset_tables', None)
+        if dataset_writer is not None and dataset_tables:
+            dataset_writer.add(dataset_tables, document=result['document'])
+        results.append(result)
+
+    if dataset_writer is not None:
+        dataset_writer.flush()
+        stats = dataset_writer.stats()
+        print(f"데이터셋 저장: {args.dataset} (파일 {stats['files']}개, 표 {stats['tables']}개, 행 {stats['rows']}개)")
+    print_summary(results, time.perf_counter() - started)
+    return 0 if all(r['error'] is None for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
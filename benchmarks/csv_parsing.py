@@ -0,0 +1,214 @@
+"""
+모델 출력 CSV 파싱 벤치마크 (형식 오류 코퍼스)
+
+합성 재무제표를 모델이 자주 내는 형식 오류(따옴표 없는 천 단위 숫자, 셀 안의 따옴표,
+행 길이 불일치, 코드 블록 표시, 구분자 주변 공백, 빈 줄, CRLF)로 변형한 코퍼스를 만들고,
+이전 파서(정규식 정리 + pandas.read_csv + QUOTE_NONE 재시도)와 csv_tokenizer의
+파싱 성공률(모든 셀이 제자리에 있는 비율)과 처리량을 비교합니다.
+
+사용 예:
+    python benchmarks/csv_parsing.py
+    python benchmarks/csv_parsing.py --tables 500 --seed 7
+"""
+import argparse
+import io
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import extractor_core as core
+from synthetic_data import make_financial_table
+
+
+def legacy_parse(table_csv):
+    """이전 방식의 파싱 (실패하면 None)"""
+    try:
+        table_csv = re.sub(r'\s*"\s*,\s*', '",', table_csv)
+        table_csv = re.sub(r'\s*,\s*"\s*', ',"', table_csv)
+        table_data = pd.read_csv(io.StringIO(table_csv.strip()), skipinitialspace=True,
+                                 on_bad_lines='skip', quoting=1, dtype=str)
+        return table_data.dropna(how='all', axis=0).dropna(how='all', axis=1)
+    except Exception:
+        try:
+            fixed_csv = re.sub(r'("[^"]*),([^"]*")', r'\1COMMA\2', table_csv).replace('COMMA', ',')
+            table_data = pd.read_csv(io.StringIO(fixed_csv.strip()), skipinitialspace=True,
+                                     on_bad_lines='skip', quoting=3, dtype=str)
+            return None if table_data.empty else table_data
+        except Exception:
+            return None
+
+
+def tokenizer_parse(table_csv):
+    """csv_tokenizer를 사용하는 현재 방식의 파싱 (실패하면 None)"""
+    table = core.parse_table_block(table_csv, 0, notify=lambda *_: None)
+    if table is None or table.get('error'):
+        return None
+    return table['df']
+
+
+def quote(cell):
+    return '"' + cell.replace('"', '""') + '"'
+
+
+# 변형 함수: (표, 난수) -> (CSV 텍스트, 정답 표)
+def mutate_clean(table, rng):
+    return "\n".join(",".join(quote(c) for c in row) for row in table), table
+
+
+def mutate_unquoted_numbers(table, rng):
+    lines = [",".join(quote(c) for c in table[0])]
+    for row in table[1:]:
+        lines.append(",".join([quote(row[0])] + [c if rng.random() < 0.5 else quote(c) for c in row[1:]]))
+    return "\n".join(lines), table
+
+
+def mutate_stray_quotes(table, rng):
+    expected = [list(row) for row in table]
+    for row in expected[1:]:
+        if rng.random() < 0.4:
+            row[0] = row[0] + ' (12" 기준)'
+    # 셀 안의 따옴표를 이스케이프하지 않고 그대로 출력
+    return "\n".join(",".join('"' + c + '"' for c in row) for row in expected), expected
+
+
+def mutate_ragged(table, rng):
+    expected = [list(row) for row in table]
+    lines = [",".join(quote(c) for c in expected[0])]
+    for row in expected[1:]:
+        roll = rng.random()
+        if roll < 0.25:
+            row[-1] = ""
+            lines.append(",".join(quote(c) for c in row[:-1]))
+        elif roll < 0.5:
+            lines.append(",".join(quote(c) for c in row) + ',""')
+        else:
+            lines.append(",".join(quote(c) for c in row))
+    return "\n".join(lines), expected
+
+
+def mutate_formatting(table, rng):
+    lines = [" , ".join(quote(c) for c in row) for row in table]
+    for _ in range(2):
+        lines.insert(rng.randint(1, len(lines)), "")
+    return "```csv\r\n" + "\r\n".join(lines) + "\r\n```", table
+
+
+MUTATIONS = {
+    "정상": mutate_clean,
+    "따옴표 없는 숫자": mutate_unquoted_numbers,
+    "셀 안 따옴표": mutate_stray_quotes,
+    "행 길이 불일치": mutate_ragged,
+    "서식(공백/빈 줄/코드 블록)": mutate_formatting,
+}
+
+
+def mutate_combined(table, rng):
+    """여러 오류를 함께 적용 (따옴표 없는 숫자 + 행 길이 불일치 + 서식)"""
+    text, expected = mutate_unquoted_numbers(table, rng)
+    lines = text.split("\n")
+    for i in range(1, len(lines)):
+        if rng.random() < 0.3:
+            lines[i] += ',""'
+    return "```\n" + "\n\n".join(lines) + "\n```", expected
+
+
+MUTATIONS["복합"] = mutate_combined
+
+
+def grid_matches(expected, df):
+    """정답 표의 모든 셀이 같은 위치에 있는지 확인 (빈 셀은 NaN과 같음)"""
+    if df is None:
+        return False
+    actual = [[str(c).strip() for c in df.columns]]
+    actual += [["" if pd.isna(c) else str(c).strip() for c in row] for row in df.values.tolist()]
+    # 빈 열은 두 파서 모두 제거하므로 정답에서도 제거하여 비교
+    keep = [i for i in range(len(expected[0])) if any(row[i] for row in expected[1:])]
+    expected = [[row[i].strip() for i in keep] for row in expected]
+    return actual == expected
+
+
+def corrupt(text, rng, edits=8):
+    """따옴표, 쉼표, 줄바꿈을 무작위로 넣거나 지워 손상된 출력 생성 (정답 없음, 예외 여부만 확인)"""
+    chars = list(text)
+    for _ in range(edits):
+        pos = rng.randrange(len(chars) + 1)
+        if chars and rng.random() < 0.4:
+            del chars[min(pos, len(chars) - 1)]
+        else:
+            chars.insert(pos, rng.choice(['"', ',', '\n', '""', ' ', '```', '\t']))
+    return "".join(chars)
+
+
+def fuzz(parse, corpus, seed):
+    """무작위 손상 입력에서 파서가 예외를 내는 횟수와 표를 만든 비율"""
+    rng = random.Random(seed)
+    crashes = 0
+    parsed = 0
+    for _, text, _ in corpus:
+        try:
+            parsed += parse(corrupt(text, rng)) is not None
+        except Exception:
+            crashes += 1
+    return crashes, parsed
+
+
+def build_corpus(count, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for idx in range(count):
+        table = make_financial_table(rows=rng.randint(5, 40), years=rng.randint(2, 6), seed=seed * 1000 + idx)
+        for name, mutate in MUTATIONS.items():
+            text, expected = mutate(table, rng)
+            corpus.append((name, text, expected))
+    return corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모델 출력 CSV 파싱 성공률/처리량 벤치마크")
+    parser.add_argument("--tables", type=int, default=200, help="변형할 원본 표 수")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.tables, args.seed)
+    total_bytes = sum(len(text.encode("utf-8")) for _, text, _ in corpus)
+    print(f"코퍼스: 표 {len(corpus)}개, {total_bytes / 1024:.0f} KB")
+
+    parsers = [("이전 방식", legacy_parse), ("토크나이저", tokenizer_parse)]
+    print(f"{'변형':<26}" + "".join(f"{label:>12}" for label, _ in parsers))
+    results = {label: {} for label, _ in parsers}
+    timings = {}
+    for label, parse in parsers:
+        started = time.perf_counter()
+        frames = [parse(text) for _, text, _ in corpus]
+        timings[label] = time.perf_counter() - started
+        for (name, _, expected), df in zip(corpus, frames):
+            passed, seen = results[label].get(name, (0, 0))
+            results[label][name] = (passed + grid_matches(expected, df), seen + 1)
+
+    for name in MUTATIONS:
+        line = f"{name:<26}"
+        for label, _ in parsers:
+            passed, seen = results[label][name]
+            line += f"{passed / seen:>12.1%}"
+        print(line)
+
+    for label, _ in parsers:
+        passed = sum(p for p, _ in results[label].values())
+        elapsed = timings[label]
+        print(f"{label}: 성공률 {passed / len(corpus):.1%}, {len(corpus) / elapsed:.0f} 표/초, "
+              f"{total_bytes / 1024 / 1024 / elapsed:.2f} MB/초")
+
+    print("무작위 손상 입력:")
+    for label, parse in parsers:
+        crashes, parsed = fuzz(parse, corpus, args.seed)
+        print(f"  {label}: 예외 {crashes}건, 표 생성 {parsed / len(corpus):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+네트워크 없이 추출 흐름을 시험하기 위한 가짜 Gemini 백엔드
+
+google.generativeai는 gRPC로 통신하므로 로컬 HTTP 서버 대신 모델 핸들을 만드는
+model_registry의 genai 모듈 자리에 이 백엔드를 끼워 넣습니다. 지정한 비율로 429/503 오류를 내고,
+지연 시간과 응답 내용을 조절할 수 있습니다.
+
+녹화한 응답을 재생할 때는 요청 파일 바이트의 해시로 응답을 찾는 ResponseReplay를 response_text로
+넘기며, RecordingBackend로 실제 API 응답을 녹화해 둘 수 있습니다.
+
+사용 예:
+    backend = FakeGeminiBackend(response_text, error_rate=0.3)
+    with backend.installed():
+        core.extract_tables(...)
+
+    backend = FakeGeminiBackend(ResponseReplay.load("responses.json"), latency=0.5)
+"""
+import contextlib
+import hashlib
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from google.api_core import exceptions as api_exceptions
+
+import extractor_core as core
+import model_registry
+
+
+class FakeResponse:
+    """generate_content 응답 흉내 (text, usage_metadata)"""
+
+    def __init__(self, text, prompt_tokens=0):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=len(text) // 2,
+            total_token_count=prompt_tokens + len(text) // 2,
+        )
+
+
+def payload_key(data):
+    """요청 파일 바이트의 응답 조회 키 (SHA-256)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_payload(contents):
+    """generate_content에 넘긴 contents에서 파일 바이트 찾기 (대화 형식이면 첫 사용자 메시지에서 찾음)"""
+    for part in contents:
+        if isinstance(part, dict) and 'parts' in part:
+            return _file_payload(part['parts'])
+        if isinstance(part, dict) and 'data' in part:
+            return part['data']
+        if isinstance(part, FakeFile):
+            return part.data
+    return b""
+
+
+class FakeFile(SimpleNamespace):
+    """File API로 업로드한 파일 흉내 (name, uri, mime_type, state, 업로드한 바이트)"""
+
+
+class ResponseReplay:
+    """
+    요청 파일 바이트의 해시로 녹화/합성 응답을 찾아 돌려주는 응답 모음
+
+    FakeGeminiBackend의 response_text로 넘기면 요청마다 파일에 맞는 응답을 돌려줍니다.
+
+    Args:
+        responses (dict): {payload_key: 응답 텍스트}
+        default (str): 모르는 요청에 돌려줄 응답 텍스트
+    """
+
+    def __init__(self, responses=None, default=""):
+        self.responses = dict(responses or {})
+        self.default = default
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def add(self, data, text):
+        """파일 바이트에 대한 응답 등록"""
+        with self._lock:
+            self.responses[payload_key(data)] = text
+
+    def __contains__(self, data):
+        return payload_key(data) in self.responses
+
+    def __call__(self, contents):
+        text = self.responses.get(payload_key(_file_payload(contents)))
+        if text is None:
+            with self._lock:
+                self.misses += 1
+            return self.default
+        return text
+
+    @classmethod
+    def load(cls, path, default=""):
+        """save로 저장한 JSON 파일에서 응답 모음 읽기"""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)['responses'], default)
+
+    def save(self, path):
+        """응답 모음을 JSON 파일로 저장"""
+        with self._lock, open(path, "w", encoding="utf-8") as f:
+            json.dump({'responses': self.responses}, f, ensure_ascii=False, indent=1)
+
+
+class RecordingBackend:
+    """
+    실제 Gemini API 응답을 ResponseReplay에 녹화하는 백엔드
+
+    Args:
+        replay (ResponseReplay): 응답을 기록할 응답 모음
+    """
+
+    def __init__(self, replay):
+        self.replay = replay
+
+    def _make_model(self, genai):
+        replay = self.replay
+
+        class RecordingGenerativeModel(genai.GenerativeModel):
+            def generate_content(self, contents, stream=False, **kwargs):
+                # 녹화는 전체 응답이 필요하므로 스트리밍 요청도 한 번에 받음
+                response = super().generate_content(contents, **kwargs)
+                replay.add(_file_payload(contents), response.text)
+                return [response] if stream else response
+
+        return RecordingGenerativeModel
+
+    @contextlib.contextmanager
+    def installed(self):
+        """with 블록 안에서 추출 함수가 녹화용 모델을 사용하도록 교체"""
+        registry = model_registry.get_model_registry()
+        original = model_registry.load_genai()
+        model_registry.genai = SimpleNamespace(
+            configure=original.configure,
+            GenerativeModel=self._make_model(original),
+            GenerationConfig=original.GenerationConfig,
+        )
+        registry.clear()
+        try:
+            yield self
+        finally:
+            model_registry.genai = original
+            registry.clear()
+
+
+class FakeGeminiBackend:
+    """
+    오류 주입과 지연을 지원하는 가짜 Gemini 백엔드
+
+    Args:
+        response_text (str): 모든 요청에 돌려줄 응답 텍스트 (callable이면 contents를 받아 텍스트 반환)
+        latency (float): 요청당 평균 지연 시간(초)
+        error_rate (float): 일시적 오류(429/503)를 낼 확률
+        rate_limit_share (float): 일시적 오류 중 429의 비율 (나머지는 503)
+        retry_after (float): 무작위 429 오류 메시지에 포함할 재시도 안내(초), None이면 생략
+        requests_per_minute (int): 이 한도를 넘는 요청은 항상 429이며, 한도가 풀리는 시간을
+            재시도 안내로 포함 (None이면 한도 없음)
+        seed (int): 오류 주입 난수 시드
+    """
+
+    def __init__(self, response_text="", latency=0.05, error_rate=0.0, rate_limit_share=0.7,
+                 retry_after=None, requests_per_minute=None, seed=0):
+        self.response_text = response_text
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_share = rate_limit_share
+        self.retry_after = retry_after
+        self.requests_per_minute = requests_per_minute
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._request_times = []
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.unavailable = 0
+        self.files = {}
+        self.uploads = 0
+        self.deletes = 0
+
+    def _check_errors(self):
+        """주입할 오류를 결정하고 해당 예외 발생"""
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            roll = self._random.random()
+            if self.requests_per_minute:
+                self._request_times = [t for t in self._request_times if now - t < 60]
+                if len(self._request_times) >= self.requests_per_minute:
+                    self.rate_limited += 1
+                    wait = 60 - (now - self._request_times[0])
+                    raise api_exceptions.ResourceExhausted(f"429 Quota exceeded. Please retry in {wait:.1f}s.")
+                self._request_times.append(now)
+            if roll < self.error_rate * self.rate_limit_share:
+                self.rate_limited += 1
+                hint = f" Please retry in {self.retry_after}s." if self.retry_after is not None else ""
+                raise api_exceptions.ResourceExhausted(f"429 Quota exceeded.{hint}")
+            if roll < self.error_rate:
+                self.unavailable += 1
+                raise api_exceptions.ServiceUnavailable("503 The service is currently unavailable.")
+
+    def _respond(self, contents):
+        time.sleep(self._random.uniform(0.5, 1.5) * self.latency if self.latency else 0)
+        self._check_errors()
+        text = self.response_text(contents) if callable(self.response_text) else self.response_text
+        prompt_tokens = core.estimate_request_tokens(contents[0], b"", "png")
+        return FakeResponse(text, prompt_tokens)
+
+    def _make_model(self):
+        backend = self
+
+        class FakeGenerativeModel:
+            def __init__(self, model_name, generation_config=None, **kwargs):
+                self.model_name = model_name
+                self.generation_config = generation_config
+
+            def generate_content(self, contents, stream=False, **kwargs):
+                response = backend._respond(contents)
+                if not stream:
+                    return response
+                # 스트리밍은 응답을 몇 조각으로 나누어 돌려줌
+                text = response.text
+                size = max(1, len(text) // 4)
+                return [SimpleNamespace(text=text[i:i + size]) for i in range(0, len(text), size)]
+
+        return FakeGenerativeModel
+
+    def _upload_file(self, path, mime_type=None, **kwargs):
+        with open(path, "rb") as f:
+            data = f.read()
+        with self._lock:
+            self.uploads += 1
+            name = f"files/fake-{self.uploads}"
+            self.files[name] = FakeFile(name=name, uri=f"fake://{name}", mime_type=mime_type,
+                                        state=SimpleNamespace(name="ACTIVE"), data=data)
+            return self.files[name]
+
+    def _delete_file(self, name):
+        with self._lock:
+            self.deletes += 1
+            self.files.pop(name, None)
+
+    def as_module(self):
+        """model_registry.genai 자리에 넣을 수 있는 모듈 흉내 객체 (File API 업로드 포함)"""
+        return SimpleNamespace(
+            configure=lambda **kwargs: None,
+            GenerativeModel=self._make_model(),
+            GenerationConfig=lambda **kwargs: SimpleNamespace(**kwargs),
+            upload_file=self._upload_file,
+            get_file=lambda name: self.files[name],
+            delete_file=self._delete_file,
+        )
+
+    @contextlib.contextmanager
+    def installed(self):
+        """with 블록 안에서 추출 함수가 이 백엔드를 사용하도록 교체 (보관된 모델 핸들도 비움)"""
+        registry = model_registry.get_model_registry()
+        original = model_registry.genai
+        model_registry.genai = self.as_module()
+        registry.clear()
+        try:
+            yield self
+        finally:
+            model_registry.genai = original
+            registry.clear()
+
+    def stats(self):
+        return {'calls': self.calls, 'rate_limited': self.rate_limited, 'unavailable': self.unavailable,
+                'uploads': self.uploads, 'deletes': self.deletes}
@@ -0,0 +1,134 @@
+"""
+이미지 전송 인코딩 벤치마크
+
+품질 모드별 적응형 인코딩(extractor_core.process_image_bytes)과 이전 방식
+(1200px 확대 + 무압축 PNG)의 전송 크기와 처리 시간을 비교합니다.
+API 키를 지정하면 합성 표 이미지에 대해 실제 추출 정확도(정답 셀 비율)도 측정합니다.
+
+사용 예:
+    python benchmarks/image_encoding.py
+    python benchmarks/image_encoding.py --images samples/ --json results.json
+    python benchmarks/image_encoding.py --api-key $GEMINI_API_KEY --model gemini-1.5-flash
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageEnhance
+
+import extractor_core as core
+from synthetic_data import cell_accuracy, find_font, image_to_bytes, make_financial_table, render_table_image
+
+
+def legacy_encode(image_data):
+    """이전 방식: 1200px 미만이면 확대하고 무압축 PNG로 저장"""
+    image = Image.open(io.BytesIO(image_data)).convert('RGB')
+    width, height = image.size
+    if width < 1200 or height < 1200:
+        scale = max(1200 / width, 1200 / height)
+        image = image.resize((int(width * scale), int(height * scale)), Image.Resampling.LANCZOS)
+    image = ImageEnhance.Sharpness(image).enhance(1.2)
+    image = ImageEnhance.Contrast(image).enhance(1.1)
+    return image_to_bytes(image, "PNG", compress_level=0), "png"
+
+
+def build_samples(image_dir, count):
+    """
+    벤치마크 대상 이미지 목록 생성
+
+    Returns:
+        list: (이름, 이미지 바이트, 정답 표 또는 None) 튜플 목록
+    """
+    if image_dir:
+        samples = []
+        for path in sorted(glob.glob(os.path.join(image_dir, "*"))):
+            if os.path.splitext(path)[1].lstrip(".").lower() in core.IMAGE_FORMATS:
+                with open(path, "rb") as f:
+                    samples.append((os.path.basename(path), f.read(), None))
+        return samples
+
+    font, korean = find_font()
+    samples = []
+    # 작은 휴대폰 사진, 일반 스캔, 매우 큰 스캔을 흉내내도록 크기를 달리함
+    for idx, (rows, scale) in enumerate([(8, 0.5), (15, 1.0), (30, 2.5)] * max(1, count // 3)):
+        table = make_financial_table(rows=rows, years=5, seed=idx, korean=korean)
+        image = render_table_image(table, font=font, scale=scale)
+        samples.append((f"synthetic_{idx}_{image.width}x{image.height}.jpg",
+                        image_to_bytes(image, "JPEG", quality=90), table))
+    return samples
+
+
+def measure_accuracy(payload, file_type, expected, args):
+    """실제 Gemini 호출로 추출 정확도 측정 (정답이 없으면 None)"""
+    if not args.api_key or expected is None:
+        return None
+    try:
+        result = core.extract_tables(payload, file_type, args.model, args.api_key, quality="높음")
+    except core.ExtractionError as e:
+        print(f"  추출 실패: {e}", file=sys.stderr)
+        return 0.0
+    if not result.tables:
+        return 0.0
+    return max(cell_accuracy(expected, t['df']) for t in result.tables if not t.get('error'))
+
+
+def run(args):
+    samples = build_samples(args.images, args.count)
+    results = []
+    for name, data, expected in samples:
+        encoders = [("이전 방식", lambda d: legacy_encode(d))]
+        for quality in core.QUALITY_SETTINGS:
+            encoders.append((quality, lambda d, q=quality: core.process_image_bytes(d, quality=q, notify=lambda *_: None)))
+
+        for label, encode in encoders:
+            started = time.perf_counter()
+            payload, file_type = encode(data)
+            encode_ms = (time.perf_counter() - started) * 1000
+            size = Image.open(io.BytesIO(payload)).size
+            results.append({
+                'image': name,
+                'mode': label,
+                'format': file_type,
+                'width': size[0],
+                'height': size[1],
+                'bytes': len(payload),
+                'encode_ms': round(encode_ms, 1),
+                'accuracy': measure_accuracy(payload, file_type, expected, args),
+            })
+
+    print(f"{'이미지':<36} {'모드':<8} {'형식':<5} {'해상도':>11} {'크기(KB)':>10} {'인코딩(ms)':>11} {'정확도':>7}")
+    for r in results:
+        accuracy = "-" if r['accuracy'] is None else f"{r['accuracy']:.2%}"
+        print(f"{r['image']:<36} {r['mode']:<8} {r['format']:<5} {r['width']:>5}x{r['height']:<5} "
+              f"{r['bytes'] / 1024:>10.1f} {r['encode_ms']:>11.1f} {accuracy:>7}")
+
+    legacy_total = sum(r['bytes'] for r in results if r['mode'] == "이전 방식")
+    for quality in core.QUALITY_SETTINGS:
+        total = sum(r['bytes'] for r in results if r['mode'] == quality)
+        if legacy_total:
+            print(f"{quality}: 전송량 {total / 1024:.0f} KB (이전 방식 대비 {1 - total / legacy_total:.1%} 감소)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="이미지 전송 인코딩 크기/정확도 벤치마크")
+    parser.add_argument("--images", help="샘플 이미지 디렉터리 (없으면 합성 표 이미지 사용)")
+    parser.add_argument("--count", type=int, default=3, help="합성 이미지 수")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"), help="정확도 측정용 API 키")
+    parser.add_argument("--model", default="gemini-1.5-flash", help="정확도 측정에 사용할 모델")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args(argv)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
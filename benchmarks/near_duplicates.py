@@ -0,0 +1,113 @@
+"""
+유사 파일 감지 확인 (양식은 같고 숫자만 다른 재무제표)
+
+결과 캐시에 문서 하나를 추출해 저장한 뒤, 같은 양식에 숫자만 다른 문서나 다시 인코딩한 같은 문서를
+추출하여 지각 해시 유사도, 저장된 결과 재사용 여부, 추출한 표가 두 번째 문서의 정답과 같은지
+출력합니다. 여러 페이지 PDF는 첫 페이지가 같고 둘째 페이지만 다른 묶음도 확인합니다. 숫자가 다른 문서에 이전 문서의 결과를 돌려주면 실패로 표시하고 종료 코드 1을 돌려줍니다.
+
+사용 예:
+    python benchmarks/near_duplicates.py
+"""
+import argparse
+import copy
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extractor_core as core
+from fake_gemini import FakeGeminiBackend, ResponseReplay
+from result_cache import ResultCache
+from synthetic_data import (
+    cell_accuracy, image_to_bytes, make_financial_table, render_table_image, render_table_pdf, table_to_response
+)
+
+MODEL_NAME = "gemini-1.5-flash"
+
+
+def change_cells(table, count):
+    """표의 숫자 셀 count개를 바꾼 복사본"""
+    changed = copy.deepcopy(table)
+    for idx in range(count):
+        row = changed[1 + idx % (len(changed) - 1)]
+        row[1 + idx % (len(row) - 1)] = "987,654"
+    return changed
+
+
+def make_scenarios(seed):
+    """(이름, 첫 문서, 두 번째 문서, 파일 타입, 두 번째 문서가 첫 문서와 같은 내용인지) 목록"""
+    table = make_financial_table(rows=12, years=4, seed=seed)
+    other = make_financial_table(rows=12, years=4, seed=seed + 1)
+    image = render_table_image(table)
+    english = make_financial_table(rows=12, years=4, seed=seed, korean=False)
+    english_other = make_financial_table(rows=12, years=4, seed=seed + 2, korean=False)
+    return [
+        ("숫자 두 칸만 다른 이미지", (image_to_bytes(image), [table]),
+         (image_to_bytes(render_table_image(change_cells(table, 2))), [change_cells(table, 2)]), "png", False),
+        ("숫자가 모두 다른 이미지", (image_to_bytes(image), [table]),
+         (image_to_bytes(render_table_image(other)), [other]), "png", False),
+        ("JPEG로 다시 인코딩한 같은 이미지", (image_to_bytes(image), [table]),
+         (image_to_bytes(image, "JPEG", quality=80), [table]), "jpg", True),
+        ("숫자 두 칸만 다른 텍스트 PDF", (render_table_pdf([english]), [english]),
+         (render_table_pdf([change_cells(english, 2)]), [change_cells(english, 2)]), "pdf", False),
+        ("텍스트가 같은 PDF", (render_table_pdf([english]), [english]),
+         (render_table_pdf([english], font_size=11), [english]), "pdf", True),
+        ("1쪽이 같고 2쪽이 다른 2쪽 PDF", (render_table_pdf([english, english_other]), [english, english_other]),
+         (render_table_pdf([english, change_cells(english_other, 2)]), [english, change_cells(english_other, 2)]),
+         "pdf", False),
+        ("텍스트가 같은 2쪽 PDF", (render_table_pdf([english, english_other]), [english, english_other]),
+         (render_table_pdf([english, english_other], font_size=11), [english, english_other]), "pdf", True),
+    ]
+
+
+def extract(data, file_type, cache):
+    """캐시를 사용해 요청 하나를 추출 (PDF는 텍스트 레이어 없이 Gemini로)"""
+    payload = data if file_type == "pdf" else core.process_image_bytes(data)[0]
+    return core.extract_tables(payload, file_type if file_type == "pdf" else "png", MODEL_NAME, "fake-key",
+                               cache=cache, notify=lambda *_: None)
+
+
+def run_scenario(name, first, second, file_type, same_content):
+    """첫 문서를 캐시에 저장한 뒤 두 번째 문서를 추출하고 결과 반환"""
+    replay = ResponseReplay()
+    for data, tables in (first, second):
+        payload = data if file_type == "pdf" else core.process_image_bytes(data)[0]
+        replay.add(payload, table_to_response(tables))
+    with tempfile.TemporaryDirectory() as cache_dir, FakeGeminiBackend(replay, latency=0).installed() as backend:
+        cache = ResultCache(cache_dir)
+        extract(first[0], file_type, cache)
+        result = extract(second[0], file_type, cache)
+        calls = backend.calls
+    tables = [t for t in result.tables if not t.get('error', False)]
+    # 두 번째 문서의 모든 표를 정답과 비교 (표가 모자라면 그만큼 0점)
+    accuracy = sum(cell_accuracy(expected, table['df'])
+                   for expected, table in zip(second[1], tables)) / len(second[1])
+    return {
+        'name': name,
+        'similarity': result.extra.get('near_duplicate'),
+        'served': result.from_cache,
+        'api_calls': calls,
+        'accuracy': accuracy,
+        # 내용이 다른 문서는 반드시 새로 추출해야 하고, 결과는 두 번째 문서의 정답과 같아야 함
+        'ok': accuracy == 1.0 and (same_content or not result.from_cache),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="유사 파일 감지 확인 (양식이 같고 숫자만 다른 문서)")
+    parser.add_argument("--seed", type=int, default=0, help="합성 데이터 시드")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("GEMINI_RPM", "1000000")
+    results = [run_scenario(*scenario) for scenario in make_scenarios(args.seed)]
+    print(f"{'항목':<26} {'유사도':>7} {'재사용':>6} {'API 호출':>8} {'셀 정확도':>9}  결과")
+    for r in results:
+        similarity = f"{r['similarity']:.3f}" if r['similarity'] is not None else "-"
+        print(f"{r['name']:<26} {similarity:>7} {'예' if r['served'] else '아니오':>6} {r['api_calls']:>8} "
+              f"{r['accuracy']:>9.1%}  {'통과' if r['ok'] else '실패'}")
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
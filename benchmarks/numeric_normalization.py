@@ -0,0 +1,72 @@
+"""
+재무제표 숫자 정규화 벤치마크
+
+여러 해 열이 있는 큰 합성 재무제표에 대해 이전 방식(셀마다 applymap/apply로 공백 제거와
+쉼표/괄호 처리, 결과는 문자열)과 table_processing.process_table_by_type의 열 단위 변환
+(Int64/Float64)의 처리 시간과 결과 메모리 사용량을 비교합니다.
+
+사용 예:
+    python benchmarks/numeric_normalization.py
+    python benchmarks/numeric_normalization.py --rows 20000 --years 30
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from synthetic_data import make_financial_table
+from table_processing import process_numeric_value, process_table_by_type
+
+
+def legacy_process(df):
+    """이전 방식의 process_table_by_type (재무제표 유형)"""
+    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    df = df.dropna(how='all', axis=0).dropna(how='all', axis=1)
+    for col in df.columns:
+        if col != df.columns[0]:
+            df[col] = df[col].apply(lambda x: process_numeric_value(x) if pd.notna(x) else x)
+    return df
+
+
+def build_frame(rows, years):
+    """파서 출력과 같은 문자열 데이터프레임 생성 (일부 셀에 공백, '-' 표시, % 열 포함)"""
+    table = make_financial_table(rows=rows, years=years, seed=0)
+    df = pd.DataFrame(table[1:], columns=table[0], dtype=object)
+    df.iloc[::7, 1] = " - "
+    df[df.columns[2]] = " " + df[df.columns[2]] + " "
+    df["증가율"] = [f"{(i % 200 - 100) / 10}%" for i in range(len(df))]
+    return df
+
+
+def measure(label, func, df, repeat):
+    elapsed = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(df)
+        elapsed.append(time.perf_counter() - started)
+    memory = result.memory_usage(deep=True).sum()
+    print(f"{label:<10} {min(elapsed) * 1000:>10.1f} ms {memory / 1024 / 1024:>10.2f} MB")
+    return min(elapsed), memory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="재무제표 숫자 정규화 속도/메모리 벤치마크")
+    parser.add_argument("--rows", type=int, default=5000, help="행 수")
+    parser.add_argument("--years", type=int, default=20, help="연도 열 수")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 측정 횟수")
+    args = parser.parse_args(argv)
+
+    df = build_frame(args.rows, args.years)
+    print(f"입력: {len(df)}행 x {len(df.columns)}열, {df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB")
+    print(f"{'방식':<10} {'시간':>13} {'결과 메모리':>13}")
+    legacy_time, legacy_memory = measure("이전 방식", legacy_process, df, args.repeat)
+    new_time, new_memory = measure("열 단위", lambda d: process_table_by_type(d, '손익계산서'), df, args.repeat)
+    print(f"속도 {legacy_time / new_time:.1f}배, 메모리 {legacy_memory / new_memory:.1f}배 감소")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+오프라인 추출 벤치마크 모음
+
+합성 표 이미지(Pillow)와 PDF를 로컬에서 만들고, 가짜 Gemini 백엔드가 녹화된 응답 또는
+합성 응답을 지정한 지연 시간/오류율로 돌려주도록 하여 실제 API 없이 추출 전체 흐름
+(core.extract_document)을 반복 측정합니다. 품질 모드('높음', '균형', '빠름')별로
+처리량, 문서별 지연 시간 분위수, 파싱 성공률, 셀 정확도, 전송 바이트, 메모리 최대 사용량을
+측정하고 결과를 JSON으로 저장하여 이전 결과와 비교할 수 있습니다. 메모리는 tracemalloc으로 잰
+파이썬 할당 최대치이며 Pillow 내부 이미지 버퍼는 포함하지 않습니다.
+
+합성 응답은 문서마다 파이프라인이 보낼 요청 바이트(전처리한 이미지, 분할한 PDF 페이지)를
+미리 계산해 정답 표와 연결해 둡니다. --record로 실제 API 응답을 녹화해 두면 --replay로
+같은 요청에 녹화된 응답을 재생합니다.
+
+사용 예:
+    python benchmarks/offline_suite.py --output results.json
+    python benchmarks/offline_suite.py --latency 0.5 --error-rate 0.1 --compare results.json
+    python benchmarks/offline_suite.py --record responses.json --api-key YOUR_KEY
+    python benchmarks/offline_suite.py --replay responses.json --output replay.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extractor_core as core
+import metrics
+from fake_gemini import FakeGeminiBackend, RecordingBackend, ResponseReplay
+from synthetic_data import (
+    cell_accuracy, image_to_bytes, make_financial_table, render_table_image, render_table_pdf, table_to_response
+)
+
+QUALITY_MODES = ("높음", "균형", "빠름")
+MODEL_NAME = "gemini-1.5-flash"
+
+
+def make_documents(count, kinds, seed=0):
+    """
+    합성 문서 목록 생성 (이미지는 표 하나, PDF는 페이지마다 표 하나)
+
+    Returns:
+        list: {'name', 'data', 'file_type', 'tables'} 목록 ('tables'는 페이지/요청 순서의 정답 표)
+    """
+    documents = []
+    for idx in range(count):
+        kind = kinds[idx % len(kinds)]
+        doc_seed = seed * 1000 + idx
+        if kind == "image":
+            table = make_financial_table(rows=8 + idx % 12, years=3 + idx % 3, seed=doc_seed)
+            # 작은 휴대폰 사진부터 큰 스캔본까지 크기를 섞음
+            image = render_table_image(table, scale=(0.6, 1.0, 1.6)[idx % 3])
+            documents.append({'name': f"image_{idx}.png", 'data': image_to_bytes(image),
+                              'file_type': "png", 'tables': [table]})
+        else:
+            # 내장 PDF 글꼴은 라틴 문자만 지원하므로 영문 항목명 사용
+            tables = [make_financial_table(rows=10, years=4, seed=doc_seed * 10 + page, korean=False)
+                      for page in range(1 + idx % 3)]
+            documents.append({'name': f"document_{idx}.pdf", 'data': render_table_pdf(tables),
+                              'file_type': "pdf", 'tables': tables})
+    return documents
+
+
+def request_payloads(document, quality):
+    """
+    extract_document가 문서에 대해 보낼 요청 바이트와 그 요청의 정답 표 목록
+
+    PDF는 전체 페이지를 한 페이지씩, 이미지는 조각으로 나누지 않고 추출한다고 가정합니다.
+    """
+    if document['file_type'] == "pdf":
+        return [(chunk, [document['tables'][start - 1]])
+                for start, _, chunk in core.split_pdf_pages(document['data'])]
+    payload, _ = core.process_image_bytes(document['data'], quality=quality)
+    return [(payload, document['tables'])]
+
+
+def build_synthetic_replay(documents, quality):
+    """문서의 요청 바이트마다 정답 표로 만든 합성 응답을 등록한 응답 모음"""
+    replay = ResponseReplay()
+    for document in documents:
+        for payload, tables in request_payloads(document, quality):
+            replay.add(payload, table_to_response(tables))
+    return replay
+
+
+def extract_document(document, quality, api_key, max_workers):
+    """문서 하나를 추출하고 (소요 시간, 결과, 오류) 반환"""
+    started = time.perf_counter()
+    try:
+        result = core.extract_document(
+            document['data'], document['file_type'], MODEL_NAME, api_key, quality=quality,
+            all_pages=True, max_workers=max_workers, text_layer=False, tile_images=False,
+            notify=lambda *_: None
+        )
+        return time.perf_counter() - started, result, None
+    except core.ExtractionError as e:
+        return time.perf_counter() - started, None, str(e)
+
+
+def score_document(document, result):
+    """문서 결과의 (추출 표 수, 파싱 오류 표 수, 정답 표별 셀 정확도 목록)"""
+    if result is None:
+        return 0, 0, [0.0] * len(document['tables'])
+    tables = [t for t in result.tables if not t.get('error', False)]
+    accuracies = [cell_accuracy(expected, tables[idx]['df']) if idx < len(tables) else 0.0
+                  for idx, expected in enumerate(document['tables'])]
+    return len(result.tables), len(result.tables) - len(tables), accuracies
+
+
+def run_mode(documents, quality, backend, args):
+    """품질 모드 하나로 모든 문서를 추출하고 측정 결과 반환"""
+    metrics.get_metrics_registry().reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with backend.installed(), ThreadPoolExecutor(max_workers=args.workers) as pool:
+        outcomes = list(pool.map(
+            lambda document: extract_document(document, quality, args.api_key or "fake-key", args.page_workers),
+            documents
+        ))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = np.array([latency for latency, _, _ in outcomes])
+    extracted = parse_errors = 0
+    accuracies = []
+    for document, (_, result, _) in zip(documents, outcomes):
+        table_count, error_count, document_accuracies = score_document(document, result)
+        extracted += table_count
+        parse_errors += error_count
+        accuracies.extend(document_accuracies)
+    failed = sum(1 for _, _, error in outcomes if error is not None)
+    expected_tables = sum(len(document['tables']) for document in documents)
+    counters = metrics.summary()['counters']
+    return {
+        'quality': quality,
+        'documents': len(documents),
+        'failed_documents': failed,
+        'elapsed': elapsed,
+        'documents_per_second': len(documents) / elapsed if elapsed else 0.0,
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p90': float(np.percentile(latencies, 90)),
+        'latency_p99': float(np.percentile(latencies, 99)),
+        'expected_tables': expected_tables,
+        'extracted_tables': extracted,
+        'parse_success_rate': (extracted - parse_errors) / expected_tables if expected_tables else 0.0,
+        'cell_accuracy': float(np.mean(accuracies)) if accuracies else 0.0,
+        'requests': counters.get('requests_total', 0),
+        'retries': counters.get('request_retries_total', 0),
+        'bytes_sent': counters.get('request_bytes_sent_total', 0),
+        'peak_memory_mb': peak / 1024 / 1024,
+    }
+
+
+def print_results(results, baseline=None):
+    """모드별 결과 표 출력 (기준 결과가 있으면 변화율 함께 출력)"""
+    baseline = {r['quality']: r for r in (baseline or {}).get('results', [])}
+    print(f"{'모드':<4} {'문서/초':>8} {'p50(초)':>8} {'p90(초)':>8} {'p99(초)':>8} {'파싱 성공':>9} "
+          f"{'셀 정확도':>9} {'요청':>5} {'재시도':>6} {'전송(KB)':>9} {'메모리(MB)':>10}")
+    for r in results:
+        print(f"{r['quality']:<4} {r['documents_per_second']:>8.2f} {r['latency_p50']:>8.2f} "
+              f"{r['latency_p90']:>8.2f} {r['latency_p99']:>8.2f} {r['parse_success_rate']:>9.1%} "
+              f"{r['cell_accuracy']:>9.1%} {r['requests']:>5} {r['retries']:>6} "
+              f"{r['bytes_sent'] / 1024:>9.1f} {r['peak_memory_mb']:>10.1f}")
+        previous = baseline.get(r['quality'])
+        if previous:
+            changes = []
+            for key, label in (('documents_per_second', "처리량"), ('latency_p90', "p90"),
+                               ('bytes_sent', "전송"), ('peak_memory_mb', "메모리")):
+                if previous[key]:
+                    changes.append(f"{label} {(r[key] - previous[key]) / previous[key]:+.1%}")
+            print(f"     기준 대비: {', '.join(changes)}")
+
+
+def record_responses(documents, args):
+    """실제 API로 모든 모드의 요청 응답을 녹화하여 저장"""
+    replay = ResponseReplay.load(args.record) if os.path.exists(args.record) else ResponseReplay()
+    with RecordingBackend(replay).installed():
+        for quality in args.modes:
+            for document in documents:
+                _, _, error = extract_document(document, quality, args.api_key, args.page_workers)
+                if error:
+                    print(f"{quality} {document['name']}: {error}")
+    replay.save(args.record)
+    print(f"{len(replay.responses)}개 응답을 {args.record}에 저장했습니다.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="오프라인 추출 벤치마크 (가짜 백엔드)")
+    parser.add_argument("--documents", type=int, default=12, help="합성 문서 수")
+    parser.add_argument("--kinds", nargs="+", choices=["image", "pdf"], default=["image", "pdf"],
+                        help="만들 문서 종류 (번갈아 생성)")
+    parser.add_argument("--modes", nargs="+", choices=QUALITY_MODES, default=list(QUALITY_MODES),
+                        help="측정할 품질 모드")
+    parser.add_argument("--workers", type=int, default=4, help="동시에 처리할 문서 수")
+    parser.add_argument("--page-workers", type=int, default=4, help="문서 하나의 페이지를 동시에 보낼 요청 수")
+    parser.add_argument("--latency", type=float, default=0.2, help="가짜 백엔드 평균 지연 시간(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="무작위 429/503 오류 비율")
+    parser.add_argument("--seed", type=int, default=0, help="합성 데이터와 오류 주입 시드")
+    parser.add_argument("--replay", help="녹화한 응답 파일 (없으면 합성 응답 사용)")
+    parser.add_argument("--record", help="실제 API 응답을 녹화할 파일 (--api-key 필요)")
+    parser.add_argument("--api-key", help="녹화에 사용할 Google API 키")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    args = parser.parse_args(argv)
+
+    # 반복 측정이 클라이언트 속도 제한에 걸리지 않도록 한도를 넉넉하게 설정 (제한기를 만들기 전에 지정)
+    if not args.record:
+        os.environ.setdefault("GEMINI_RPM", "1000000")
+        os.environ.setdefault("GEMINI_TPM", "1000000000")
+
+    documents = make_documents(args.documents, args.kinds, args.seed)
+    if args.record:
+        if not args.api_key:
+            parser.error("--record에는 --api-key가 필요합니다.")
+        record_responses(documents, args)
+        return
+
+    recorded = ResponseReplay.load(args.replay) if args.replay else None
+    results = []
+    for quality in args.modes:
+        replay = build_synthetic_replay(documents, quality)
+        if recorded is not None:
+            replay.responses.update(recorded.responses)
+        backend = FakeGeminiBackend(replay, latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+        result = run_mode(documents, quality, backend, args)
+        result['unknown_requests'] = replay.misses
+        results.append(result)
+
+    print(f"문서 {len(documents)}개 ({', '.join(args.kinds)}), 지연 {args.latency}초, 오류율 {args.error_rate:.0%}, "
+          f"응답: {'녹화 ' + args.replay if args.replay else '합성'}")
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            'created': datetime.now().isoformat(timespec="seconds"),
+            'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+            'settings': {key: value for key, value in vars(args).items() if key != "api_key"},
+            'results': results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과를 {args.output}에 저장했습니다.")
+
+
+if __name__ == "__main__":
+    main()
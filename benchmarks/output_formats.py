@@ -0,0 +1,266 @@
+"""
+응답 형식 벤치마크 (CSV 블록 대 구조화된 JSON)
+
+offline_suite와 같은 합성 문서를 CSV 모드와 JSON 모드로 각각 추출하여 출력 토큰 수, 응답 글자 수,
+문서별 지연 시간 분위수, 파싱 실패(오류 표, JSON을 읽지 못해 CSV로 다시 요청한 횟수), 잘린 응답
+이어받기 횟수, 셀 정확도를 비교합니다.
+
+가짜 백엔드는 요청 프롬프트가 JSON 형식을 요구하면 JSON 응답을, 아니면 CSV 응답을 돌려줍니다.
+--token-latency로 출력 토큰마다 지연을 더해 응답 길이가 지연 시간에 반영되도록 하고,
+--truncate-rate로 두 모드에서 같은 요청의 첫 응답을 같은 위치에서 자르면 CSV 모드는 이어받기로,
+JSON 모드는 CSV 재요청으로 복구하는 비용을 비교할 수 있습니다. 합성 응답의 토큰 수는 가짜 백엔드가
+글자 2개당 1토큰으로 추정한 값이므로, 실제 토큰 수와 응답 차이는 --record로 녹화한 실제 응답을
+--replay로 재생해 확인합니다.
+
+사용 예:
+    python benchmarks/output_formats.py
+    python benchmarks/output_formats.py --token-latency 0.002 --truncate-rate 0.2 --output formats.json
+    python benchmarks/output_formats.py --record formats_responses.json --api-key YOUR_KEY
+    python benchmarks/output_formats.py --replay formats_responses.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extractor_core as core
+import metrics
+from fake_gemini import FakeGeminiBackend, RecordingBackend, ResponseReplay, payload_key, _file_payload
+from offline_suite import MODEL_NAME, QUALITY_MODES, make_documents, request_payloads, score_document
+from synthetic_data import table_to_json_response, table_to_response
+
+OUTPUT_FORMATS = ("csv", "json")
+# 잘린 응답은 이 비율의 위치에서 자름
+TRUNCATE_AT = 0.6
+
+
+def _request_prompt(contents):
+    """요청 contents의 프롬프트 텍스트 (이어받기 요청이면 첫 사용자 메시지의 프롬프트)"""
+    if contents and isinstance(contents[0], dict) and 'parts' in contents[0]:
+        return _request_prompt(contents[0]['parts'])
+    return next((part for part in contents if isinstance(part, str)), "")
+
+
+class FormatResponder:
+    """
+    요청 프롬프트의 응답 형식에 맞는 응답을 돌려주는 가짜 응답 함수 (FakeGeminiBackend의 response_text)
+
+    Args:
+        replays (dict): {'csv': ResponseReplay, 'json': ResponseReplay}
+        token_latency (float): 출력 토큰마다 더할 지연 시간(초)
+        truncate_rate (float): 요청 파일의 첫 응답을 자를 확률 (파일 바이트로 정하므로 두 모드에서 같은 요청이 잘림)
+        seed (int): 자를 요청을 정하는 시드
+    """
+
+    def __init__(self, replays, token_latency=0.0, truncate_rate=0.0, seed=0):
+        self.replays = replays
+        self.token_latency = token_latency
+        self.truncate_rate = truncate_rate
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._answered = set()
+        self.output_chars = 0
+        self.truncated = 0
+
+    def _should_truncate(self, key):
+        return random.Random(f"{self.seed}:{key}").random() < self.truncate_rate
+
+    def __call__(self, contents):
+        output_format = "json" if core.JSON_FORMAT_INSTRUCTIONS in _request_prompt(contents) else "csv"
+        text = self.replays[output_format](contents)
+        key = payload_key(_file_payload(contents))
+        if contents and isinstance(contents[0], dict) and 'role' in contents[0]:
+            # 이어받기 요청: 지금까지 받은 응답 다음부터 돌려줌
+            prefix = contents[1]['parts'][0]
+            text = text[len(prefix):] if text.startswith(prefix) else text
+        else:
+            with self._lock:
+                first = key not in self._answered
+                self._answered.add(key)
+            if first and text and self._should_truncate(key):
+                text = text[:int(len(text) * TRUNCATE_AT)]
+                with self._lock:
+                    self.truncated += 1
+        with self._lock:
+            self.output_chars += len(text)
+        if self.token_latency:
+            time.sleep(len(text) // core.CHARS_PER_TOKEN * self.token_latency)
+        return text
+
+
+def build_format_replays(documents, quality, recorded=None):
+    """응답 형식마다 문서의 요청 바이트에 정답 표 응답을 등록한 응답 모음 (녹화한 응답이 있으면 덮어씀)"""
+    replays = {output_format: ResponseReplay() for output_format in OUTPUT_FORMATS}
+    for document in documents:
+        for payload, tables in request_payloads(document, quality):
+            replays['csv'].add(payload, table_to_response(tables))
+            replays['json'].add(payload, table_to_json_response(tables))
+    for output_format, replay in (recorded or {}).items():
+        replays[output_format].responses.update(replay.responses)
+    return replays
+
+
+def extract_document(document, output_format, args):
+    """문서 하나를 지정한 응답 형식으로 추출하고 (소요 시간, 결과, 오류) 반환"""
+    started = time.perf_counter()
+    try:
+        result = core.extract_document(
+            document['data'], document['file_type'], MODEL_NAME, args.api_key or "fake-key",
+            quality=args.quality, all_pages=True, max_workers=args.page_workers, text_layer=False,
+            tile_images=False, notify=lambda *_: None, output_format=output_format
+        )
+        return time.perf_counter() - started, result, None
+    except core.ExtractionError as e:
+        return time.perf_counter() - started, None, str(e)
+
+
+def run_format(documents, output_format, replays, args):
+    """응답 형식 하나로 모든 문서를 추출하고 측정 결과 반환"""
+    metrics.get_metrics_registry().reset()
+    responder = FormatResponder(replays, args.token_latency, args.truncate_rate, args.seed)
+    backend = FakeGeminiBackend(responder, latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    started = time.perf_counter()
+    with backend.installed(), ThreadPoolExecutor(max_workers=args.workers) as pool:
+        outcomes = list(pool.map(lambda document: extract_document(document, output_format, args), documents))
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([latency for latency, _, _ in outcomes])
+    extracted = parse_errors = 0
+    accuracies = []
+    for document, (_, result, _) in zip(documents, outcomes):
+        table_count, error_count, document_accuracies = score_document(document, result)
+        extracted += table_count
+        parse_errors += error_count
+        accuracies.extend(document_accuracies)
+    expected_tables = sum(len(document['tables']) for document in documents)
+    counters = metrics.summary()['counters']
+    return {
+        'output_format': output_format,
+        'documents': len(documents),
+        'failed_documents': sum(1 for _, _, error in outcomes if error is not None),
+        'elapsed': elapsed,
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p90': float(np.percentile(latencies, 90)),
+        'requests': backend.calls,
+        'output_tokens': counters.get('output_tokens_total', 0),
+        'output_chars': responder.output_chars,
+        'truncated_responses': responder.truncated,
+        'continuations': counters.get('continuations_total', 0),
+        'json_fallbacks': counters.get('json_fallback_total', 0),
+        'parse_errors': parse_errors,
+        'expected_tables': expected_tables,
+        'extracted_tables': extracted,
+        'parse_success_rate': (extracted - parse_errors) / expected_tables if expected_tables else 0.0,
+        'cell_accuracy': float(np.mean(accuracies)) if accuracies else 0.0,
+        'unknown_requests': sum(replay.misses for replay in replays.values()),
+    }
+
+
+def print_results(results):
+    """형식별 결과 표와 CSV 대비 JSON 변화율 출력"""
+    print(f"{'형식':<4} {'요청':>5} {'출력 토큰':>9} {'응답 글자':>9} {'p50(초)':>8} {'p90(초)':>8} "
+          f"{'잘림':>4} {'이어받기':>8} {'CSV 재요청':>10} {'오류 표':>7} {'파싱 성공':>9} {'셀 정확도':>9}")
+    for r in results:
+        print(f"{r['output_format']:<4} {r['requests']:>5} {r['output_tokens']:>9} {r['output_chars']:>9} "
+              f"{r['latency_p50']:>8.2f} {r['latency_p90']:>8.2f} {r['truncated_responses']:>4} "
+              f"{r['continuations']:>8} {r['json_fallbacks']:>10} {r['parse_errors']:>7} "
+              f"{r['parse_success_rate']:>9.1%} {r['cell_accuracy']:>9.1%}")
+    by_format = {r['output_format']: r for r in results}
+    if set(by_format) == set(OUTPUT_FORMATS):
+        csv_result, json_result = by_format['csv'], by_format['json']
+        changes = []
+        for key, label in (('output_tokens', "출력 토큰"), ('output_chars', "응답 글자"),
+                           ('latency_p50', "p50"), ('latency_p90', "p90"), ('requests', "요청")):
+            if csv_result[key]:
+                changes.append(f"{label} {(json_result[key] - csv_result[key]) / csv_result[key]:+.1%}")
+        print(f"CSV 대비 JSON: {', '.join(changes)}")
+
+
+def load_recorded(path):
+    """녹화 파일에서 형식별 응답 모음 읽기"""
+    with open(path, encoding="utf-8") as f:
+        formats = json.load(f)['formats']
+    return {output_format: ResponseReplay(responses) for output_format, responses in formats.items()}
+
+
+def record_responses(documents, args):
+    """실제 API로 두 응답 형식의 요청 응답을 녹화하여 저장"""
+    recorded = load_recorded(args.record) if os.path.exists(args.record) else {}
+    for output_format in args.formats:
+        replay = recorded.setdefault(output_format, ResponseReplay())
+        with RecordingBackend(replay).installed():
+            for document in documents:
+                _, _, error = extract_document(document, output_format, args)
+                if error:
+                    print(f"{output_format} {document['name']}: {error}")
+    with open(args.record, "w", encoding="utf-8") as f:
+        json.dump({'formats': {output_format: replay.responses for output_format, replay in recorded.items()}},
+                  f, ensure_ascii=False, indent=1)
+    print(f"{sum(len(r.responses) for r in recorded.values())}개 응답을 {args.record}에 저장했습니다.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="응답 형식(CSV/JSON) 비교 벤치마크 (가짜 백엔드)")
+    parser.add_argument("--documents", type=int, default=12, help="합성 문서 수")
+    parser.add_argument("--kinds", nargs="+", choices=["image", "pdf"], default=["image", "pdf"],
+                        help="만들 문서 종류 (번갈아 생성)")
+    parser.add_argument("--formats", nargs="+", choices=OUTPUT_FORMATS, default=list(OUTPUT_FORMATS),
+                        help="비교할 응답 형식")
+    parser.add_argument("--quality", choices=QUALITY_MODES, default="높음", help="추출 품질")
+    parser.add_argument("--workers", type=int, default=4, help="동시에 처리할 문서 수")
+    parser.add_argument("--page-workers", type=int, default=4, help="문서 하나의 페이지를 동시에 보낼 요청 수")
+    parser.add_argument("--latency", type=float, default=0.1, help="가짜 백엔드 평균 지연 시간(초)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="출력 토큰마다 더할 지연 시간(초)")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="첫 응답을 중간에서 자를 요청 비율")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="무작위 429/503 오류 비율")
+    parser.add_argument("--seed", type=int, default=0, help="합성 데이터와 오류 주입 시드")
+    parser.add_argument("--replay", help="녹화한 응답 파일 (없으면 합성 응답 사용)")
+    parser.add_argument("--record", help="실제 API 응답을 녹화할 파일 (--api-key 필요)")
+    parser.add_argument("--api-key", help="녹화에 사용할 Google API 키")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args(argv)
+
+    # 반복 측정이 클라이언트 속도 제한에 걸리지 않도록 한도를 넉넉하게 설정 (제한기를 만들기 전에 지정)
+    if not args.record:
+        os.environ.setdefault("GEMINI_RPM", "1000000")
+        os.environ.setdefault("GEMINI_TPM", "1000000000")
+
+    documents = make_documents(args.documents, args.kinds, args.seed)
+    if args.record:
+        if not args.api_key:
+            parser.error("--record에는 --api-key가 필요합니다.")
+        record_responses(documents, args)
+        return
+
+    recorded = load_recorded(args.replay) if args.replay else None
+    results = [run_format(documents, output_format, build_format_replays(documents, args.quality, recorded), args)
+               for output_format in args.formats]
+
+    print(f"문서 {len(documents)}개 ({', '.join(args.kinds)}), 지연 {args.latency}초 + 토큰당 "
+          f"{args.token_latency}초, 잘림 {args.truncate_rate:.0%}, 응답: {'녹화 ' + args.replay if args.replay else '합성'}")
+    print_results(results)
+
+    if args.output:
+        report = {
+            'created': datetime.now().isoformat(timespec="seconds"),
+            'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+            'settings': {key: value for key, value in vars(args).items() if key != "api_key"},
+            'results': results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과를 {args.output}에 저장했습니다.")
+
+
+if __name__ == "__main__":
+    main()
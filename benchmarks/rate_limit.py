@@ -0,0 +1,153 @@
+"""
+속도 제한기와 재시도 정책 벤치마크
+
+가짜 Gemini 백엔드(429/503 오류 주입)를 대상으로 여러 요청을 동시에 보내고
+성공률, 재시도 횟수, 속도 제한 대기 시간과 재시도 대기 시간을 측정합니다.
+이전 방식(고정 2초/4초 대기, 제한기 없음)과 비교할 수 있습니다.
+마지막으로 batch_extract를 자동 모델(--model auto)로 실행하여 --rpm/--tpm 한도가 단계별 모델(flash, pro)의
+제한기에 모두 적용되는지 확인하고, 적용되지 않으면 종료 코드 1을 돌려줍니다.
+
+사용 예:
+    python benchmarks/rate_limit.py
+    python benchmarks/rate_limit.py --requests 60 --workers 12 --backend-rpm 30 --rpm 30
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_extract
+import extractor_core as core
+import rate_limiter
+from fake_gemini import FakeGeminiBackend
+from rate_limiter import RetryPolicy, TokenBucketLimiter
+from synthetic_data import image_to_bytes, make_financial_table, render_table_image, table_to_response
+
+
+class LegacyRetryPolicy(RetryPolicy):
+    """이전 방식: 고정 2초, 4초 대기"""
+
+    def compute_delay(self, attempt, retry_after=None):
+        return 2 * (attempt + 1)
+
+
+class UnlimitedLimiter(TokenBucketLimiter):
+    """대기하지 않는 제한기 (이전 방식 비교용)"""
+
+    def __init__(self):
+        super().__init__(1, 1)
+
+    def acquire(self, tokens=0):
+        self.acquisitions += 1
+        return 0.0
+
+    def penalize(self, delay):
+        pass
+
+
+def run_scenario(label, backend, limiter, retry_policy, args):
+    """동시 요청을 보내고 결과 요약 반환"""
+    def extract(_):
+        try:
+            result = core.extract_tables(b"fake-image", "png", "fake-model", "fake-key", quality="빠름",
+                                         limiter=limiter, retry_policy=retry_policy,
+                                         notify=lambda *_: None)
+            return result.attempts, None
+        except core.ExtractionError as e:
+            return retry_policy.max_retries, str(e)
+
+    started = time.perf_counter()
+    with backend.installed(), ThreadPoolExecutor(max_workers=args.workers) as pool:
+        outcomes = list(pool.map(extract, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    stats = limiter.stats()
+    succeeded = sum(1 for _, error in outcomes if error is None)
+    return {
+        'scenario': label,
+        'succeeded': succeeded,
+        'failed': len(outcomes) - succeeded,
+        'api_calls': backend.calls,
+        'rate_limited': backend.rate_limited,
+        'unavailable': backend.unavailable,
+        'limiter_wait': stats['wait_seconds'],
+        'backoff_wait': stats['backoff_seconds'],
+        'elapsed': elapsed,
+    }
+
+
+def check_cascade_limits(rpm, tpm, files=3):
+    """
+    자동 모델로 배치 추출을 실행하고 단계별 모델 제한기에 한도가 적용되었는지 확인
+
+    빠른 모델이 표를 찾지 못하도록 응답을 고정하여 모든 파일이 정확한 모델까지 요청을 보내게 합니다.
+
+    Returns:
+        list: 모델별 (모델 이름, 분당 요청 한도, 분당 토큰 한도, 요청 수, 통과 여부)
+    """
+    image = image_to_bytes(render_table_image(make_financial_table(rows=5, years=3, seed=0)))
+    with tempfile.TemporaryDirectory() as work_dir:
+        for idx in range(files):
+            with open(os.path.join(work_dir, f"statement_{idx}.png"), "wb") as f:
+                f.write(image)
+        rate_limiter._limiters.clear()
+        batch_extract._rate_limit_pid = None
+        with FakeGeminiBackend("NO_TABLES_FOUND", latency=0).installed():
+            batch_extract.main([work_dir, "-o", os.path.join(work_dir, "output"), "--api-key", "fake-key",
+                                "--no-cache", "--model", core.CASCADE_MODEL,
+                                "--rpm", str(rpm), "--tpm", str(tpm)])
+        stats = rate_limiter.all_limiter_stats()
+
+    checks = []
+    for model_name in core.CASCADE_MODELS:
+        s = stats.get(model_name, {})
+        ok = (s.get('requests_per_minute') == rpm and s.get('tokens_per_minute') == tpm
+              and s.get('acquisitions', 0) >= files)
+        checks.append((model_name, s.get('requests_per_minute'), s.get('tokens_per_minute'),
+                       s.get('acquisitions', 0), ok))
+    return checks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="속도 제한/재시도 벤치마크 (가짜 백엔드)")
+    parser.add_argument("--requests", type=int, default=40, help="보낼 요청 수")
+    parser.add_argument("--workers", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--error-rate", type=float, default=0.15, help="무작위 429/503 오류 비율")
+    parser.add_argument("--backend-rpm", type=int, default=120, help="가짜 백엔드의 분당 요청 한도")
+    parser.add_argument("--rpm", type=int, default=100, help="클라이언트 제한기의 분당 요청 수")
+    parser.add_argument("--latency", type=float, default=0.05, help="가짜 백엔드 지연 시간(초)")
+    parser.add_argument("--base-delay", type=float, default=0.5, help="재시도 기본 대기 시간(초)")
+    parser.add_argument("--max-retries", type=int, default=4, help="최대 시도 횟수")
+    args = parser.parse_args(argv)
+
+    response = table_to_response([make_financial_table(rows=5, years=3, seed=0)])
+    scenarios = [
+        ("이전 방식", UnlimitedLimiter(), LegacyRetryPolicy(max_retries=3)),
+        ("제한기+지터 백오프", TokenBucketLimiter(args.rpm, 1_000_000),
+         RetryPolicy(max_retries=args.max_retries, base_delay=args.base_delay, max_delay=10)),
+    ]
+
+    print(f"{'시나리오':<18} {'성공':>5} {'실패':>5} {'호출':>5} {'429':>5} {'503':>5} "
+          f"{'제한 대기(초)':>13} {'재시도 대기(초)':>15} {'소요(초)':>9}")
+    for label, limiter, policy in scenarios:
+        backend = FakeGeminiBackend(response, latency=args.latency, error_rate=args.error_rate,
+                                    retry_after=1, requests_per_minute=args.backend_rpm)
+        r = run_scenario(label, backend, limiter, policy, args)
+        print(f"{r['scenario']:<18} {r['succeeded']:>5} {r['failed']:>5} {r['api_calls']:>5} "
+              f"{r['rate_limited']:>5} {r['unavailable']:>5} {r['limiter_wait']:>13.1f} "
+              f"{r['backoff_wait']:>15.1f} {r['elapsed']:>9.1f}")
+
+    print()
+    print(f"{'자동 모델 단계':<18} {'RPM':>6} {'TPM':>9} {'요청':>5}  결과")
+    checks = check_cascade_limits(args.rpm, 1_000_000)
+    for model_name, rpm, tpm, acquisitions, ok in checks:
+        print(f"{model_name:<18} {rpm or '-':>6} {tpm or '-':>9} {acquisitions:>5}  {'통과' if ok else '실패'}")
+    return 0 if all(ok for *_, ok in checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
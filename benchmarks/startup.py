@@ -0,0 +1,127 @@
+"""
+시작 시간 벤치마크 (모듈 import, 미리 불러오기, Streamlit 첫 화면)
+
+매번 새 파이썬 프로세스에서 핵심 모듈을 import하는 시간, extractor_core.warm_up으로 무거운 모듈을
+미리 불러오는 시간, AppTest로 app2.py의 첫 화면을 그리는 시간을 반복 측정하여 중앙값과 최댓값을 출력합니다.
+처음 사용할 때 불러와야 하는 모듈(google.generativeai, google.api_core, PyPDF2, PIL)이 import만으로
+불러와지면 실패로 표시하고, --max-import로 extractor_core import 시간 한도를 지정하면 한도를 넘을 때
+종료 코드 1을 돌려주므로 CI에서 시작 시간 회귀를 잡을 수 있습니다.
+
+사용 예:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 10 --output startup.json
+    python benchmarks/startup.py --compare startup.json --max-import 1.0
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import만으로는 불러오지 않아야 하는 무거운 모듈
+LAZY_MODULES = ("google.generativeai", "google.api_core", "PyPDF2", "PIL")
+# 측정 항목: (이름, 측정 전 준비 코드, 측정할 코드, import만 하는 항목인지 여부)
+SCENARIOS = [
+    ("extractor_core import", "", "import extractor_core", True),
+    ("batch_extract import", "", "import batch_extract", True),
+    ("job_queue import", "", "import job_queue", True),
+    ("warm_up", "import extractor_core", "extractor_core.warm_up()", False),
+    ("app2 첫 화면 (AppTest)", "from streamlit.testing.v1 import AppTest",
+     "AppTest.from_file('app2.py', default_timeout=120).run()", False),
+]
+
+RUNNER = """
+import json, sys, time
+{setup}
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {modules!r} if m in sys.modules]}}))
+"""
+
+
+def measure(setup, statement):
+    """새 프로세스에서 코드 한 번 실행 시간과 실행 후 불러와진 무거운 모듈 목록"""
+    code = RUNNER.format(setup=setup, statement=statement, modules=LAZY_MODULES)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True,
+                               text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_scenario(name, setup, statement, import_only, repeat):
+    """항목 하나를 반복 측정하고 결과 반환 (import 항목은 불러오지 않아야 할 모듈도 확인)"""
+    runs = [measure(setup, statement) for _ in range(repeat)]
+    seconds = [run['seconds'] for run in runs]
+    loaded = sorted({module for run in runs for module in run['loaded']})
+    return {
+        'name': name,
+        'median': statistics.median(seconds),
+        'max': max(seconds),
+        'loaded_lazy_modules': loaded if import_only else [],
+    }
+
+
+def print_results(results, baseline=None):
+    """항목별 결과 표 출력 (기준 결과가 있으면 변화율 함께 출력)"""
+    baseline = {r['name']: r for r in (baseline or {}).get('results', [])}
+    print(f"{'항목':<24} {'중앙값(초)':>10} {'최대(초)':>9}  미리 불러온 모듈")
+    for r in results:
+        change = ""
+        previous = baseline.get(r['name'])
+        if previous and previous['median']:
+            change = f"  (기준 대비 {(r['median'] - previous['median']) / previous['median']:+.1%})"
+        loaded = ", ".join(r['loaded_lazy_modules']) or "-"
+        print(f"{r['name']:<24} {r['median']:>10.3f} {r['max']:>9.3f}  {loaded}{change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모듈 import와 첫 화면 시작 시간 벤치마크")
+    parser.add_argument("--repeat", type=int, default=5, help="항목별 반복 횟수 (매번 새 프로세스)")
+    parser.add_argument("--skip-app", action="store_true", help="Streamlit 첫 화면 측정 생략")
+    parser.add_argument("--max-import", type=float, help="extractor_core import 중앙값 한도(초), 넘으면 실패")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, setup, statement, import_only in SCENARIOS:
+        if args.skip_app and "AppTest" in setup:
+            continue
+        results.append(run_scenario(name, setup, statement, import_only, args.repeat))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(f"반복 {args.repeat}회, python {platform.python_version()}")
+    print_results(results, baseline)
+
+    failures = [f"{r['name']}: import만으로 {', '.join(r['loaded_lazy_modules'])}을(를) 불러왔습니다."
+                for r in results if r['loaded_lazy_modules']]
+    core_import = results[0]['median']
+    if args.max_import is not None and core_import > args.max_import:
+        failures.append(f"extractor_core import {core_import:.3f}초가 한도 {args.max_import}초를 넘었습니다.")
+    for failure in failures:
+        print(f"실패: {failure}")
+
+    if args.output:
+        report = {
+            'created': datetime.now().isoformat(timespec="seconds"),
+            'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+            'settings': vars(args),
+            'results': results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과를 {args.output}에 저장했습니다.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
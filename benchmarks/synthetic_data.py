@@ -0,0 +1,228 @@
+"""
+벤치마크용 합성 표 데이터 생성
+
+정답(ground truth)을 알고 있는 재무제표 형태의 표를 만들고,
+Pillow로 이미지로 그리거나 CSV/JSON 응답 텍스트로 변환합니다.
+"""
+import io
+import json
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+# 한글 표시가 가능한 글꼴 후보 (없으면 영문 항목명 사용)
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+    "C:/Windows/Fonts/malgun.ttf",
+]
+
+KOREAN_ITEMS = ["매출액", "매출원가", "매출총이익", "판매비와관리비", "영업이익", "금융수익", "금융비용",
+                "법인세비용차감전순이익", "법인세비용", "당기순이익", "EBITDA", "자산총계", "부채총계", "자본총계"]
+ENGLISH_ITEMS = ["Revenue", "Cost of sales", "Gross profit", "SG&A", "Operating income", "Finance income",
+                 "Finance costs", "Pre-tax income", "Income tax", "Net income", "EBITDA", "Total assets",
+                 "Total liabilities", "Total equity"]
+
+
+def find_font(size=22):
+    """
+    사용 가능한 한글 글꼴 검색
+
+    Returns:
+        tuple: (글꼴 객체, 한글 지원 여부)
+    """
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size), True
+    try:
+        return ImageFont.load_default(size=size), False
+    except TypeError:
+        # Pillow 10.1 미만은 크기 지정 불가
+        return ImageFont.load_default(), False
+
+
+def make_financial_table(rows=10, years=5, seed=None, korean=True):
+    """
+    재무제표 형태의 합성 표 생성
+
+    Args:
+        rows (int): 항목 수
+        years (int): 연도 열 수
+        seed (int): 난수 시드
+        korean (bool): 한글 항목명 사용 여부
+
+    Returns:
+        list: 첫 행이 헤더인 문자열 2차원 목록
+    """
+    rng = random.Random(seed)
+    items = KOREAN_ITEMS if korean else ENGLISH_ITEMS
+    header = ["항목" if korean else "Item"] + [str(2024 - years + i + 1) for i in range(years)]
+    table = [header]
+    for row_idx in range(rows):
+        name = items[row_idx % len(items)]
+        if row_idx >= len(items):
+            name += f" {row_idx // len(items) + 1}"
+        values = []
+        for _ in range(years):
+            value = rng.randint(-50000, 500000)
+            values.append(f"({abs(value):,})" if value < 0 else f"{value:,}")
+        table.append([name] + values)
+    return table
+
+
+def render_table_image(table, font=None, cell_padding=12, scale=1.0):
+    """
+    표를 격자선이 있는 이미지로 렌더링
+
+    Args:
+        table (list): 문자열 2차원 목록
+        font: Pillow 글꼴 (None이면 find_font 사용)
+        cell_padding (int): 셀 안쪽 여백 (픽셀)
+        scale (float): 최종 이미지 배율 (작은 휴대폰 사진 등을 흉내낼 때 사용)
+
+    Returns:
+        Image: RGB 이미지
+    """
+    if font is None:
+        font, _ = find_font()
+    probe = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+    def text_size(text):
+        left, top, right, bottom = probe.textbbox((0, 0), text, font=font)
+        return right - left, bottom - top
+
+    col_count = max(len(row) for row in table)
+    col_widths = [0] * col_count
+    row_height = 0
+    for row in table:
+        for col_idx, cell in enumerate(row):
+            width, height = text_size(cell)
+            col_widths[col_idx] = max(col_widths[col_idx], width + cell_padding * 2)
+            row_height = max(row_height, height + cell_padding * 2)
+
+    image = Image.new("RGB", (sum(col_widths) + 1, row_height * len(table) + 1), "white")
+    draw = ImageDraw.Draw(image)
+    y = 0
+    for row in table:
+        x = 0
+        for col_idx, cell in enumerate(row):
+            draw.rectangle([x, y, x + col_widths[col_idx], y + row_height], outline="black")
+            draw.text((x + cell_padding, y + cell_padding), cell, fill="black", font=font)
+            x += col_widths[col_idx]
+        y += row_height
+
+    if scale != 1.0:
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                             Image.Resampling.LANCZOS)
+    return image
+
+
+def image_to_bytes(image, fmt="PNG", **save_options):
+    """이미지를 지정한 형식의 바이트로 변환"""
+    output = io.BytesIO()
+    image.save(output, format=fmt, **save_options)
+    return output.getvalue()
+
+
+def table_to_response(tables):
+    """표 목록을 Gemini가 반환하는 TABLE_START/TABLE_END CSV 응답 형식으로 변환"""
+    blocks = []
+    for table in tables:
+        lines = [",".join('"' + cell.replace('"', '""') + '"' for cell in row) for row in table]
+        blocks.append("TABLE_START\n" + "\n".join(lines) + "\nTABLE_END")
+    return "\n\n".join(blocks)
+
+
+def table_to_json_response(tables):
+    """표 목록을 JSON 응답 모드의 {"tables": [...]} 응답 형식으로 변환"""
+    payload = {'tables': [{'title': "", 'unit': "", 'header': table[0], 'rows': table[1:]} for table in tables]}
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def cell_accuracy(expected, df):
+    """
+    정답 표의 셀 중 추출된 데이터프레임에서 찾은 셀의 비율
+
+    Args:
+        expected (list): 첫 행이 헤더인 정답 2차원 목록
+        df (DataFrame): 추출된 표
+
+    Returns:
+        float: 0.0 ~ 1.0
+    """
+    def normalize(value):
+        return str(value).replace(" ", "").replace(",", "").strip()
+
+    found = {normalize(col) for col in df.columns}
+    for row in df.astype(str).values.tolist():
+        found.update(normalize(cell) for cell in row)
+
+    cells = [normalize(cell) for row in expected for cell in row]
+    if not cells:
+        return 0.0
+    return sum(1 for cell in cells if cell in found) / len(cells)
+
+
+def _pdf_string(text):
+    """PDF 문자열 리터럴 이스케이프"""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_table_pdf(tables, font_size=10, page_size=(612, 792)):
+    """
+    표를 텍스트 레이어가 있는 PDF로 렌더링 (표마다 한 페이지)
+
+    외부 라이브러리 없이 기본 Helvetica 글꼴로 직접 PDF를 작성하므로 라틴 문자만 지원합니다.
+    숫자 열은 오른쪽 정렬하여 실제 재무제표와 비슷한 배치를 만듭니다.
+
+    Args:
+        tables (list): 표(첫 행이 헤더인 문자열 2차원 목록) 목록
+        font_size (int): 글꼴 크기
+        page_size (tuple): 페이지 크기 (포인트)
+
+    Returns:
+        bytes: PDF 바이트
+    """
+    char_width = font_size * 0.55
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for table in tables:
+        col_count = max(len(row) for row in table)
+        col_widths = [max(len(row[i]) if i < len(row) else 0 for row in table) * char_width + 24
+                      for i in range(col_count)]
+        ops = []
+        y = page_size[1] - 72
+        for row_idx, row in enumerate(table):
+            x = 50
+            for col_idx, cell in enumerate(row):
+                # 첫 열과 헤더는 왼쪽 정렬, 나머지는 오른쪽 정렬
+                cell_x = x if col_idx == 0 or row_idx == 0 else x + col_widths[col_idx] - 24 - len(cell) * char_width
+                ops.append(f"BT /F1 {font_size} Tf 1 0 0 1 {cell_x:.1f} {y:.1f} Tm ({_pdf_string(cell)}) Tj ET")
+                x += col_widths[col_idx]
+            y -= font_size * 1.6
+        stream = "\n".join(ops).encode("latin-1", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+            "/Contents %d 0 R >>" % (page_size[0], page_size[1], content_id)
+        ).encode())
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for obj_id, obj in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n" % obj_id + obj + b"\nendobj\n")
+    xref = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return output.getvalue()
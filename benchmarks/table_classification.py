@@ -0,0 +1,103 @@
+"""
+표 유형 분류 벤치마크
+
+합성 재무제표(행 수별)에 대해 이전 방식(유형마다 앞 10/20행 샘플 문자열을 키워드 수만큼 검사)과
+table_classifier의 컴파일된 키워드 매처(앞쪽/뒤쪽 행의 셀을 한 번 훑어 모든 유형 점수 계산)의
+detect_table_type + is_contract_table 처리 시간을 비교합니다.
+키워드가 앞쪽 행에 없는 표에서 이전 방식이 유형을 놓치는지도 확인합니다.
+
+사용 예:
+    python benchmarks/table_classification.py
+    python benchmarks/table_classification.py --rows 100 1000 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from synthetic_data import make_financial_table
+from table_classifier import CONTRACT_KEYWORDS, STATEMENT_KEYWORDS, score_table_types
+from table_processing import detect_table_type, is_contract_table
+
+
+def legacy_detect(df):
+    """이전 방식의 detect_table_type (앞 20행 샘플)"""
+    table_text = ' '.join([str(col) for col in df.columns])
+    sample = df.head(20)
+    for col in sample.columns:
+        table_text += ' ' + ' '.join(sample[col].astype(str).tolist())
+    table_text = table_text.lower()
+    type_scores = {
+        table_type: sum(1 for keyword in keywords if keyword.lower() in table_text)
+        for table_type, keywords in STATEMENT_KEYWORDS.items()
+    }
+    best = max(type_scores.items(), key=lambda x: x[1])
+    return best[0] if best[1] >= 2 else '기타'
+
+
+def legacy_is_contract(df):
+    """이전 방식의 is_contract_table (앞 10행 샘플)"""
+    columns = ' '.join(str(col).lower() for col in df.columns)
+    column_match = any(keyword in columns for keyword in CONTRACT_KEYWORDS)
+    data_match = False
+    sample = df.head(10)
+    for col in sample.columns:
+        col_data = ' '.join(sample[col].astype(str).tolist()).lower()
+        if any(keyword in col_data for keyword in CONTRACT_KEYWORDS):
+            data_match = True
+            break
+    return (column_match or data_match) and len(df) < 20 and len(df.columns) < 10
+
+
+def current_classify(df):
+    scores = score_table_types(df)
+    return detect_table_type(df, scores=scores), is_contract_table(df, scores=scores)
+
+
+def legacy_classify(df):
+    return legacy_detect(df), legacy_is_contract(df)
+
+
+def build_frame(rows, hide_keywords=False):
+    """합성 재무제표 (hide_keywords면 앞 30행의 항목명을 키워드가 없는 이름으로 바꿈)"""
+    table = make_financial_table(rows=rows, years=5, seed=rows)
+    df = pd.DataFrame(table[1:], columns=table[0], dtype=object)
+    if hide_keywords:
+        df.iloc[:30, 0] = [f"기타항목{i}" for i in range(min(30, len(df)))]
+        df.iloc[-3:, 0] = ['영업이익', '당기순이익', '매출액'][:min(3, len(df))]
+    return df
+
+
+def measure(func, df, repeat):
+    elapsed = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(df)
+        elapsed.append(time.perf_counter() - started)
+    return min(elapsed), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="표 유형 분류 속도/정확도 벤치마크")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 200, 2000, 20000], help="표 행 수")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 측정 횟수")
+    args = parser.parse_args(argv)
+
+    print(f"{'행 수':>8} {'이전 방식':>12} {'매처(앞뒤 행)':>14}  이전 결과 / 현재 결과")
+    for rows in args.rows:
+        df = build_frame(rows)
+        legacy_time, legacy_result = measure(legacy_classify, df, args.repeat)
+        new_time, new_result = measure(current_classify, df, args.repeat)
+        print(f"{rows:>8} {legacy_time * 1000:>10.2f}ms {new_time * 1000:>12.2f}ms  {legacy_result} / {new_result}")
+
+    print("키워드가 뒤쪽 행에만 있는 표:")
+    df = build_frame(max(args.rows), hide_keywords=True)
+    print(f"  이전 방식: {legacy_classify(df)[0]}, 매처: {current_classify(df)[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Gemini가 출력하는 CSV(모든 셀을 큰따옴표로 감싼 형식)를 한 번에 읽는 관대한 토크나이저
+
+모델 출력에는 표준 CSV 파서가 거부하거나 잘못 읽는 형태가 자주 섞입니다.
+- 셀 안의 이스케이프되지 않은 따옴표 ("12" 인치")
+- 따옴표 없이 쓴 천 단위 구분 숫자 (1,234,567 → 여러 셀로 쪼개짐)
+- 행마다 다른 셀 개수, 코드 블록 표시(```), 빈 줄, 구분자 주변 공백
+
+각 줄을 한 번만 훑어 셀로 나누고, 행 길이를 헤더에 맞게 보정한 뒤 데이터프레임을 바로 만듭니다.
+줄바꿈은 항상 행의 끝으로 취급합니다 (닫히지 않은 따옴표는 줄 끝에서 닫음).
+"""
+import re
+
+import pandas as pd
+
+# 올바른 QUOTE_ALL 형식의 줄 (빠른 경로)
+QUOTED_LINE_PATTERN = re.compile(r'\s*"(?:[^"]|"")*"\s*(?:,\s*"(?:[^"]|"")*"\s*)*')
+QUOTED_FIELD_PATTERN = re.compile(r'"((?:[^"]|"")*)"')
+
+# 천 단위 구분 쉼표로 쪼개졌을 수 있는 숫자 조각 (부호/괄호/통화 + 숫자 + 소수/닫는 괄호/단위)
+NUMBER_FRAGMENT_PATTERN = re.compile(
+    r'(?P<prefix>[△▲\-+(]?\s*[₩$]?)(?P<digits>\d{1,3})(?P<suffix>(?:\.\d+)?\)?\s*(?:원|천원|백만원|억원|%)?)'
+)
+
+CODE_FENCE_PATTERN = re.compile(r'\s*```')
+
+
+def tokenize_line(line):
+    """
+    CSV 한 줄을 셀 목록으로 분리
+
+    Args:
+        line (str): 줄바꿈이 없는 한 줄
+
+    Returns:
+        tuple: (셀 문자열 목록, 각 셀이 따옴표로 감싸져 있었는지 여부 목록, 짝이 맞지 않는 따옴표 수)
+    """
+    if QUOTED_LINE_PATTERN.fullmatch(line):
+        cells = [cell.replace('""', '"') for cell in QUOTED_FIELD_PATTERN.findall(line)]
+        return cells, [True] * len(cells), 0
+
+    cells = []
+    quoted = []
+    stray_quotes = 0
+    field = []
+    in_quotes = False
+    was_quoted = False
+    length = len(line)
+    i = 0
+    while i < length:
+        ch = line[i]
+        if in_quotes:
+            if ch == '"':
+                if i + 1 < length and line[i + 1] == '"':
+                    field.append('"')
+                    i += 2
+                    continue
+                # 뒤에 공백과 구분자(또는 줄 끝)가 오는 따옴표만 닫는 따옴표로 인정
+                j = i + 1
+                while j < length and line[j] in ' \t':
+                    j += 1
+                if j >= length or line[j] == ',':
+                    in_quotes = False
+                    i = j
+                    continue
+                stray_quotes += 1
+            field.append(ch)
+        elif ch == ',':
+            cells.append("".join(field) if was_quoted else "".join(field).strip())
+            quoted.append(was_quoted)
+            field = []
+            was_quoted = False
+        elif ch == '"' and not was_quoted and not "".join(field).strip():
+            in_quotes = True
+            was_quoted = True
+            field = []
+        else:
+            if ch == '"':
+                stray_quotes += 1
+            field.append(ch)
+        i += 1
+
+    if in_quotes:
+        stray_quotes += 1
+    cells.append("".join(field) if was_quoted else "".join(field).strip())
+    quoted.append(was_quoted)
+    return cells, quoted, stray_quotes
+
+
+def _fragment_role(cell):
+    """
+    숫자 조각이 숫자의 시작/중간/끝 중 어디에 올 수 있는지 판단
+
+    Returns:
+        tuple: (숫자를 시작할 수 있는지, 앞 조각에 이어질 수 있는지, 뒤 조각이 이어질 수 있는지),
+               숫자 조각이 아니면 None
+    """
+    match = NUMBER_FRAGMENT_PATTERN.fullmatch(cell)
+    if match is None:
+        return None
+    digits = match.group('digits')
+    # 부호/괄호가 있거나 3자리가 아니면 숫자의 시작, 0으로 시작하는 3자리는 이어지는 조각
+    can_start = not (len(digits) == 3 and digits[0] == "0") or digits == "0"
+    can_continue = not match.group('prefix') and len(digits) == 3
+    can_extend = not match.group('suffix')
+    return can_start, can_continue, can_extend
+
+
+def _partition_run(roles):
+    """
+    숫자 조각 구간을 숫자들로 나누는 방법 중 숫자 개수별로 조각 수가 가장 고른 분할 계산
+
+    Args:
+        roles (list): 조각별 _fragment_role 결과
+
+    Returns:
+        dict: {숫자 개수: 숫자별 조각 수 목록} - 가능한 분할만 포함
+    """
+    length = len(roles)
+    # best[i][k]: 앞 i개 조각을 k개의 숫자로 나눴을 때 (조각 수 제곱합, 분할)
+    best = [dict() for _ in range(length + 1)]
+    best[0][0] = (0, [])
+    for start in range(length):
+        if not best[start] or not roles[start][0]:
+            continue
+        for end in range(start + 1, length + 1):
+            # 숫자의 두 번째 조각부터는 이어지는 조각이어야 하고, 마지막이 아닌 조각은 뒤가 열려 있어야 함
+            if end - start > 1 and not (roles[end - 1][1] and roles[end - 2][2]):
+                break
+            size = end - start
+            for k, (cost, sizes) in best[start].items():
+                candidate = (cost + size * size, sizes + [size])
+                if k + 1 not in best[end] or candidate[0] < best[end][k + 1][0]:
+                    best[end][k + 1] = candidate
+    return {count: sizes for count, (_, sizes) in best[length].items()}
+
+
+def merge_thousands_fragments(cells, quoted, width):
+    """
+    행이 헤더보다 길면 따옴표 없이 쪼개진 천 단위 숫자 조각을 다시 합침
+
+    따옴표 없는 숫자 조각이 이어진 구간마다 가능한 분할(0으로 시작하는 3자리 조각은 앞에 붙고,
+    부호나 괄호가 있는 조각은 새 숫자를 시작)을 찾고, 넘치는 셀 수만큼 합치되
+    숫자마다 조각 수가 고르게 되도록 나눕니다.
+
+    Args:
+        cells (list): 셀 목록
+        quoted (list): 셀별 따옴표 여부
+        width (int): 목표 셀 개수
+
+    Returns:
+        tuple: (합친 셀 목록, 따옴표 여부 목록, 합친 횟수)
+    """
+    # 따옴표 없는 숫자 조각이 2개 이상 이어진 구간 찾기
+    runs = []
+    start = None
+    for i, (cell, was_quoted) in enumerate(zip(cells + [""], quoted + [True])):
+        role = None if was_quoted else _fragment_role(cell)
+        if role is not None and start is None:
+            start = i
+        elif role is None and start is not None:
+            if i - start >= 2:
+                runs.append((start, i, [_fragment_role(c) for c in cells[start:i]]))
+            start = None
+
+    # 구간별로 가능한 숫자 개수 범위를 구하고, 조각이 가장 잘게 나뉜 구간부터 합침
+    plans = []
+    for run_start, run_end, roles in runs:
+        feasible = _partition_run(roles)
+        if feasible:
+            plans.append([run_start, run_end, feasible, max(feasible)])
+
+    surplus = len(cells) - width
+    while surplus > 0:
+        candidates = [plan for plan in plans if any(c < plan[3] for c in plan[2])]
+        if not candidates:
+            break
+        plan = max(candidates, key=lambda p: p[3] / (p[1] - p[0]))
+        plan[3] = max(c for c in plan[2] if c < plan[3])
+        surplus = len(cells) - width - sum((p[1] - p[0]) - p[3] for p in plans)
+
+    merged_cells = []
+    merged_quoted = []
+    merges = 0
+    position = 0
+    for run_start, run_end, feasible, count in sorted(plans):
+        merged_cells.extend(cells[position:run_start])
+        merged_quoted.extend(quoted[position:run_start])
+        index = run_start
+        for size in feasible[count]:
+            merged_cells.append(",".join(cells[index:index + size]))
+            merged_quoted.append(False)
+            index += size
+        merges += (run_end - run_start) - count
+        position = run_end
+    merged_cells.extend(cells[position:])
+    merged_quoted.extend(quoted[position:])
+    return merged_cells, merged_quoted, merges
+
+
+def make_unique_columns(header):
+    """빈 헤더는 'Unnamed: i', 중복 헤더는 'name.1' 형식으로 바꿔 pandas.read_csv와 같은 열 이름 생성"""
+    columns = []
+    seen = {}
+    for i, name in enumerate(header):
+        name = name if name else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            candidate = f"{name}.{seen[name]}"
+            while candidate in seen:
+                seen[name] += 1
+                candidate = f"{name}.{seen[name]}"
+            seen[candidate] = 0
+            name = candidate
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def parse_model_csv(text):
+    """
+    모델이 출력한 CSV 텍스트를 데이터프레임으로 변환
+
+    헤더보다 짧은 행은 빈 셀로 채우고, 긴 행은 천 단위 숫자 조각을 합친 뒤 끝의 빈 셀을 버리며,
+    그래도 길면 열을 늘립니다. 빈 셀은 NaN이며 모든 값은 문자열입니다.
+
+    Args:
+        text (str): TABLE_START/TABLE_END 블록 안의 CSV 텍스트
+
+    Returns:
+        tuple: (데이터프레임, 보정 내역 dict - 'padded', 'merged', 'widened', 'stray_quotes'),
+               표로 읽을 내용이 없으면 (None, 보정 내역)
+    """
+    repairs = {'padded': 0, 'merged': 0, 'widened': 0, 'stray_quotes': 0}
+    rows = []
+    for line in text.splitlines():
+        if not line.strip() or CODE_FENCE_PATTERN.match(line):
+            continue
+        cells, quoted, stray_quotes = tokenize_line(line)
+        repairs['stray_quotes'] += stray_quotes
+        rows.append((cells, quoted))
+    if not rows:
+        return None, repairs
+
+    header = rows[0][0]
+    width = len(header)
+
+    data = []
+    for cells, quoted in rows[1:]:
+        while len(cells) > width and not cells[-1]:
+            cells = cells[:-1]
+            quoted = quoted[:-1]
+        if len(cells) > width:
+            cells, quoted, merges = merge_thousands_fragments(cells, quoted, width)
+            repairs['merged'] += merges
+        if len(cells) > width:
+            repairs['widened'] += 1
+            width = len(cells)
+        elif len(cells) < width:
+            repairs['padded'] += 1
+        data.append(cells)
+
+    return rows_to_frame(header, data), repairs
+
+
+def rows_to_frame(header, data):
+    """
+    헤더와 행 목록을 데이터프레임으로 변환 (CSV와 JSON 응답 공통 정규화)
+
+    헤더와 행을 가장 긴 행에 맞춰 빈 셀로 채우고, 빈 행과 데이터가 없는 열을 제거한 뒤
+    빈 헤더와 중복 헤더를 pandas.read_csv와 같은 이름으로 바꿉니다.
+
+    Args:
+        header (list): 헤더 셀 문자열 목록 (빈 헤더는 "")
+        data (list): 데이터 행 목록 (각 행은 셀 문자열 목록, 빈 셀은 "")
+
+    Returns:
+        pandas.DataFrame: 빈 셀이 None인 object 데이터프레임, 남는 열이 없으면 None
+    """
+    width = max([len(header)] + [len(row) for row in data])
+    header = list(header) + [""] * (width - len(header))
+    data = [list(row) + [""] * (width - len(row)) for row in data]
+
+    # 빈 행과 데이터가 없는 열 제거 (데이터 행이 없으면 헤더만 있는 표로 유지)
+    data = [row for row in data if any(row)]
+    if data:
+        keep = [i for i in range(width) if any(row[i] for row in data)]
+    else:
+        keep = [i for i in range(width) if header[i]]
+    if not keep:
+        return None
+    columns = make_unique_columns([header[i] for i in keep])
+    return pd.DataFrame(
+        [[row[i] if row[i] else None for i in keep] for row in data],
+        columns=columns,
+        dtype=object
+    )
@@ -0,0 +1,1778 @@
+import functools
+import io
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import pandas as pd
+# PyPDF2와 PIL은 시작 시간을 줄이기 위해 처음 사용하는 함수 안에서 불러옴
+
+from csv_tokenizer import parse_model_csv
+from json_tables import JSON_MIME_TYPE, TABLE_SCHEMA, JsonTablesError, json_table_to_frame, load_json_tables
+from metrics import get_metrics_registry, get_usage_counts, record_request, stage, timed
+from model_registry import get_model_registry, load_genai, supports_file_upload, supports_structured_output
+from pdf_source import open_pdf_stream
+from pdf_text_layer import extract_text_layer_tables
+from rate_limiter import RetryPolicy, get_rate_limiter, get_retry_after, get_retryable_errors, is_retryable_error
+from result_cache import make_cache_key, make_similarity_scope
+from table_validation import validate_tables
+
+logger = logging.getLogger("table_extractor")
+
+# 추출 품질별 생성 설정 (temperature, max_output_tokens)
+QUALITY_SETTINGS = {
+    "높음": (0.0, 30000),
+    "균형": (0.1, 20000),
+    "빠름": (0.2, 12000),
+}
+
+PDF_PROMPT = """이 PDF 문서에서 모든 표를 찾아 정확한 CSV 형식으로 변환해주세요. 
+PDF가 90도 회전되어 있더라도 알아서 인식하고 표의 내용을 정확히 추출해주세요.
+
+추출 시 다음 지침을 철저히 따라주세요:
+1. 문서에 있는 모든 표를 개별적으로 추출하세요. 이는 다음과 같은 모든 유형의 표를 포함합니다:
+   - 재무제표/재무상태표/대차대조표
+   - 손익계산서
+   - 현금흐름표
+   - 자본변동표
+   - 주요 투자지표
+   - 주석사항과 부가설명이 포함된 표
+   - 그 외 모든 숫자나 데이터가 포함된 표
+
+2. 각 표의 구조와 형식을 정확하게 유지하세요:
+   - 연도별 칼럼 구조 유지 (2016, 2017, 2018, 2019, 2020년 등 모든 연도 포함)
+   - 금액 단위(백만원, 억원 등) 표시 포함
+   - 모든 항목명(매출액, 영업이익, 자산총계 등)을 정확히 포함
+   - 음수 값은 원래 형태로 유지(-기호 포함)
+   - 비율(%) 값은 원래 형태로 유지(% 기호 포함 가능)
+
+3. 표 전체를 완전히 추출하세요:
+   - 표의 모든 행과 열이 누락 없이 추출되어야 합니다
+   - 표의 제목/헤더/부제목도 포함해야 합니다
+   - 표 하단의 주석이나 출처 정보도 가능하면 포함하세요
+
+4. 각 표를 개별적으로 처리하여 "TABLE_START"로 시작하고 "TABLE_END"로 끝내세요.
+5. 빈 셀은 빈 문자열("")로 표시하세요.
+6. 표가 없으면 "NO_TABLES_FOUND"라고 응답하세요.
+
+응답은 CSV 형식의 텍스트만 제공하고, 다른 설명이나 분석은 포함하지 마세요."""
+
+IMAGE_PROMPT = """이 이미지에서 모든 표를 찾아 정확한 CSV 형식으로 변환해주세요.
+이미지가 90도 회전되어 있더라도 알아서 인식하고 표의 내용을 정확히 추출해주세요.
+
+추출 시 다음 지침을 철저히 따라주세요:
+1. 이미지에 있는 모든 표를 개별적으로 추출하세요. 이는 다음과 같은 모든 유형의 표를 포함합니다:
+   - 재무제표/재무상태표/대차대조표 (유동자산, 비유동자산, 자산총계, 부채, 자본 등)
+   - 손익계산서 (매출액, 매출원가, 판매비와관리비, 영업이익, EBITDA 등)
+   - 현금흐름표 (영업활동, 투자활동, 재무활동 현금흐름 등)
+   - 자본변동표
+   - 주요 투자지표 (성장성, 수익성, EPS, PER, ROE 등)
+   - 그 외 모든 숫자나 데이터가 포함된 표
+
+2. 각 표의 구조와 형식을 정확하게 유지하세요:
+   - 연도별 칼럼 구조 유지 (표에 있는 모든 연도의 데이터를 추출)
+   - 모든 행과 열을 누락 없이 포함 (금액, 비율, 숫자값 등)
+   - 표의 원래 구조를 최대한 그대로 유지
+   - 음수 값은 "-" 기호를 포함하여 원래 형태로 유지
+   - 괄호 안의 숫자(손실/마이너스 표시)도 음수로 적절히 변환
+
+3. 표 전체를 완전히 추출하세요:
+   - 표 상단의 제목과 부제목도 가능하면 포함
+   - 표 내의 모든 카테고리와 항목명을 정확하게 포함
+   - 표 하단의 주석이나 출처 정보도 가능하면 포함
+
+4. 각 표마다 "TABLE_START"로 시작하고 "TABLE_END"로 끝내세요.
+5. 빈 셀은 빈 문자열("")로 처리하세요.
+6. 표가 없으면 "NO_TABLES_FOUND"라고 응답하세요.
+
+응답은 CSV 형식의 텍스트만 제공하고, 다른 설명이나 분석은 포함하지 마세요.
+이미지에 보이는 모든 표와 데이터를 완전하고 정확하게 추출하는 것이 가장 중요합니다."""
+
+# JSON 응답 모드의 출력 형식 안내 (표를 찾고 구조를 유지하는 1~3번 지침은 CSV 프롬프트와 같음)
+JSON_FORMAT_INSTRUCTIONS = """4. 결과는 다음 형식의 JSON 하나로만 응답하세요 (코드 블록 표시나 다른 설명 없이):
+{"tables": [{"title": "표 제목", "unit": "금액 단위 (없으면 빈 문자열)", "header": ["열 이름", ...], "rows": [["셀", ...], ...]}]}
+5. 표마다 tables 배열의 원소 하나로 만드세요. 모든 셀은 문자열이며 빈 셀은 빈 문자열("")로 표시하세요.
+6. 여러 줄로 된 헤더는 열마다 하나의 이름으로 합치고, 각 행의 셀 수는 header와 같게 맞추세요.
+7. 표가 없으면 {"tables": []}로 응답하세요."""
+JSON_PDF_PROMPT = (PDF_PROMPT[:PDF_PROMPT.index("\n4. ")].replace("정확한 CSV 형식으로", "JSON 형식으로")
+                   + "\n" + JSON_FORMAT_INSTRUCTIONS)
+JSON_IMAGE_PROMPT = (IMAGE_PROMPT[:IMAGE_PROMPT.index("\n4. ")].replace("정확한 CSV 형식으로", "JSON 형식으로")
+                     + "\n" + JSON_FORMAT_INSTRUCTIONS)
+# 응답 형식: 'csv'(TABLE_START/TABLE_END 블록) 또는 'json'(구조화된 JSON), 지정하지 않으면 환경 변수나 자동 선택
+OUTPUT_FORMATS = ("csv", "json")
+OUTPUT_FORMAT_ENV = "TABLE_EXTRACTOR_OUTPUT_FORMAT"
+
+IMAGE_FORMATS = ["jpg", "jpeg", "png", "bmp", "webp"]
+
+# 추출 품질별 이미지 전송 한도 (최소/최대 변 길이, 최대 바이트)
+IMAGE_BUDGETS = {
+    "높음": {'min_dimension': 1200, 'max_dimension': 4096, 'max_bytes': 6 * 1024 * 1024},
+    "균형": {'min_dimension': 1000, 'max_dimension': 3072, 'max_bytes': 3 * 1024 * 1024},
+    "빠름": {'min_dimension': 800, 'max_dimension': 2048, 'max_bytes': 1536 * 1024},
+}
+
+# 이미지 인코딩 후보 (우선순위 순: 무손실 → 고품질 JPEG)
+IMAGE_ENCODE_FORMATS = [
+    ("png", {'format': 'PNG', 'compress_level': 6}),
+    ("webp", {'format': 'WEBP', 'lossless': True, 'method': 4}),
+    ("jpeg", {'format': 'JPEG', 'quality': 92, 'subsampling': 0}),
+    ("jpeg", {'format': 'JPEG', 'quality': 85}),
+]
+
+# 긴 이미지 분할 시 인접 조각이 겹치는 비율
+TILE_OVERLAP_RATIO = 0.12
+
+# 조각 이미지 추출 시 프롬프트에 덧붙이는 안내
+TILE_PROMPT_SUFFIX = """
+이 이미지는 긴 문서를 세로로 나눈 조각 중 하나입니다.
+위/아래 가장자리에서 잘려 일부만 보이는 행은 제외하고, 표의 헤더가 보이지 않으면 첫 행부터 데이터로 출력하세요."""
+
+TABLE_PATTERN = re.compile(r"TABLE_START\s*(.*?)\s*TABLE_END", re.DOTALL)
+# 출력 길이 제한으로 잘린 응답을 이어받는 최대 요청 수와 이어받기 안내
+MAX_CONTINUATIONS = 3
+MAX_TOKENS_FINISH_REASON = "MAX_TOKENS"
+CONTINUE_TABLE_PROMPT = """이전 응답이 출력 길이 제한으로 표 중간에서 잘렸습니다.
+잘린 표의 마지막으로 완성된 행은 다음과 같습니다:
+{last_row}
+이 행 바로 다음 행부터 같은 CSV 형식으로 이어서 출력하세요. TABLE_START와 헤더, 이미 출력한 행은 반복하지 말고,
+표가 끝나면 TABLE_END를 쓴 뒤 남은 표가 있으면 같은 형식으로 계속 출력하세요."""
+CONTINUE_TABLES_PROMPT = """이전 응답이 출력 길이 제한으로 잘렸습니다.
+이미 출력한 표는 반복하지 말고, 아직 출력하지 않은 표부터 같은 형식(TABLE_START … TABLE_END)으로 이어서 출력하세요.
+남은 표가 없으면 아무것도 출력하지 마세요."""
+
+# 요청 토큰 수 추정치 (이미지/PDF 페이지당 고정 토큰, 프롬프트는 글자 2개당 약 1토큰)
+TOKENS_PER_MEDIA_PAGE = 258
+CHARS_PER_TOKEN = 2
+
+# 동시 처리 중 취소 요청을 확인하는 간격(초)
+CANCEL_POLL_INTERVAL = 0.5
+# 이보다 큰 요청 파일은 인라인 대신 File API로 업로드 (인라인 요청 한도 20MB에서 base64 인코딩 증가분 제외)
+INLINE_PAYLOAD_LIMIT = int(os.environ.get("TABLE_EXTRACTOR_UPLOAD_THRESHOLD", 15 * 1024 * 1024))
+# PDF 페이지 묶음은 동시 요청 수의 이 배수까지만 미리 만들어 둠 (메모리 사용량 제한)
+PDF_CHUNK_PREFETCH = 2
+# 단계적 모델 사용: 이 모델명을 지정하면 빠른 모델로 먼저 추출하고 검증을 통과하지 못한 요청만 강한 모델로 다시 보냄
+CASCADE_MODEL = "auto"
+CASCADE_MODELS = ("gemini-1.5-flash", "gemini-1.5-pro")
+# 빠른 모델 응답이 이 시간(초) 안에 오지 않으면 강한 모델에도 같은 요청을 보냄 (지정하지 않으면 사용 안 함)
+CASCADE_HEDGE_ENV = "TABLE_EXTRACTOR_HEDGE_AFTER"
+
+
+class ExtractionError(Exception):
+    """파일 전처리 또는 Gemini 호출이 실패했을 때 발생하는 예외"""
+
+
+class ExtractionCancelled(ExtractionError):
+    """취소 요청(cancel_event)으로 추출을 중단했을 때 발생하는 예외"""
+
+
+@dataclass
+class ExtractionResult:
+    """단일 Gemini 요청의 추출 결과"""
+    tables: list
+    raw_text: str = ""
+    from_cache: bool = False
+    attempts: int = 0
+    elapsed: float = 0.0
+    extra: dict = field(default_factory=dict)
+
+
+def _log_notify(level, message):
+    """기본 알림 함수: 메시지를 로거로 전달"""
+    logger.log(logging.WARNING if level == "warning" else logging.INFO, message)
+
+
+def get_generation_settings(quality):
+    """
+    추출 품질 이름으로 생성 설정 조회
+
+    Args:
+        quality (str): '높음', '균형', '빠름' ('높음 (느림)'처럼 설명이 붙은 이름도 허용)
+
+    Returns:
+        tuple: (temperature, max_output_tokens)
+    """
+    for name, settings in QUALITY_SETTINGS.items():
+        if quality and quality.startswith(name):
+            return settings
+    return QUALITY_SETTINGS["높음"]
+
+
+def get_generation_config(quality, output_format="csv"):
+    """
+    추출 품질과 응답 형식에 맞는 GenerationConfig 인자
+
+    Args:
+        quality (str): 추출 품질
+        output_format (str): 'csv' 또는 'json'
+
+    Returns:
+        dict: 모델 저장소(get_model)에 넘길 생성 설정
+    """
+    temperature, max_tokens = get_generation_settings(quality)
+    generation_config = {
+        'temperature': temperature,  # 설정된 온도 사용
+        'top_p': 0.95,
+        'max_output_tokens': max_tokens,  # 설정된 토큰 수 사용
+    }
+    if output_format == "json" and supports_structured_output():
+        # 응답 스키마로 JSON 형식을 강제 (지원하지 않는 버전은 프롬프트로만 요청)
+        generation_config.update(response_mime_type=JSON_MIME_TYPE, response_schema=TABLE_SCHEMA)
+    return generation_config
+
+
+def get_image_budget(quality):
+    """추출 품질 이름으로 이미지 전송 한도 조회"""
+    for name, budget in IMAGE_BUDGETS.items():
+        if quality and quality.startswith(name):
+            return budget
+    return IMAGE_BUDGETS["높음"]
+
+
+def get_default_prompt(file_type, output_format="csv"):
+    """파일 타입과 응답 형식에 맞는 기본 프롬프트 반환"""
+    if output_format == "json":
+        return JSON_PDF_PROMPT if file_type == "pdf" else JSON_IMAGE_PROMPT
+    return PDF_PROMPT if file_type == "pdf" else IMAGE_PROMPT
+
+
+def get_output_format(output_format=None):
+    """
+    사용할 응답 형식 결정
+
+    지정하지 않았거나 'auto'이면 환경 변수 TABLE_EXTRACTOR_OUTPUT_FORMAT을 따르고, 환경 변수도 없으면
+    'csv'를 사용합니다. JSON 모드는 CSV보다 출력 토큰과 지연 시간이 많아(benchmarks/output_formats.py)
+    명시적으로 지정할 때만 사용합니다.
+
+    Returns:
+        str: 'csv' 또는 'json'
+    """
+    if output_format in (None, "", "auto"):
+        output_format = os.environ.get(OUTPUT_FORMAT_ENV) or "csv"
+    output_format = output_format.lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ExtractionError(f"지원하지 않는 응답 형식입니다: {output_format}")
+    return output_format
+
+
+def _csv_fallback_prompt(prompt):
+    """JSON 기본 프롬프트를 포함한 프롬프트(조각 이미지 프롬프트 등)를 CSV 기본 프롬프트로 바꿈"""
+    for json_prompt, csv_prompt in ((JSON_PDF_PROMPT, PDF_PROMPT), (JSON_IMAGE_PROMPT, IMAGE_PROMPT)):
+        if prompt and json_prompt in prompt:
+            return prompt.replace(json_prompt, csv_prompt)
+    return prompt
+
+
+def get_mime_type(file_type):
+    """파일 타입(확장자)에 맞는 MIME 타입 반환"""
+    file_type = file_type.lower()
+    if file_type == "pdf":
+        return "application/pdf"
+    if file_type in ["jpg", "jpeg"]:
+        return "image/jpeg"
+    return f"image/{file_type}"
+
+
+def configure_gemini(api_key):
+    """Gemini API 키 설정 (이미 같은 키로 설정되어 있으면 다시 설정하지 않음)"""
+    if not api_key:
+        raise ExtractionError("API 키가 설정되지 않았습니다.")
+    try:
+        get_model_registry().configure(api_key)
+    except Exception as e:
+        raise ExtractionError(f"Gemini API 설정 중 오류가 발생했습니다: {e}") from e
+
+
+def warm_up(model_name=None, api_key=None, quality="균형", output_format=None):
+    """
+    처음 사용할 때 불러오는 무거운 모듈(google.generativeai, PyPDF2, PIL)을 미리 불러오고 모델 핸들 준비
+
+    작업 풀의 initializer로 넘기거나 앱이 시작할 때 백그라운드 스레드에서 호출하면 첫 요청이
+    모듈을 불러오는 시간을 기다리지 않습니다. 이미 불러온 모듈은 다시 불러오지 않으므로 여러 번 호출해도 됩니다.
+
+    Args:
+        model_name (str): 모델 핸들을 미리 만들 Gemini 모델명 (CASCADE_MODEL이면 단계별 모델 모두)
+        api_key (str): Google API 키 (모델명과 함께 지정해야 모델 핸들을 만듦)
+        quality (str): 모델 핸들의 생성 설정에 사용할 추출 품질
+        output_format (str): 모델 핸들의 생성 설정에 사용할 응답 형식 (None이면 자동)
+
+    Returns:
+        float: 걸린 시간(초)
+    """
+    # 모듈을 불러오는 시간이 대부분이므로 import도 측정에 포함
+    started = time.perf_counter()
+    with stage("warm_up"):
+        import PyPDF2  # noqa: F401
+        from PIL import Image
+
+        # 이미지 형식 플러그인을 모두 등록해 두어 첫 Image.open이 플러그인을 찾지 않도록 함
+        Image.init()
+        load_genai()
+        get_retryable_errors()
+        if model_name and api_key:
+            generation_config = get_generation_config(quality, get_output_format(output_format))
+            for name in CASCADE_MODELS if model_name == CASCADE_MODEL else (model_name,):
+                try:
+                    get_model_registry().get_model(api_key, name, generation_config)
+                except Exception as e:
+                    logger.warning("모델 핸들을 미리 만들지 못했습니다 (%s): %s", name, e)
+    return time.perf_counter() - started
+
+
+@timed("image_encode")
+def encode_image_payload(image, max_bytes, max_dimension, formats=IMAGE_ENCODE_FORMATS):
+    """
+    이미지를 전송 용량 한도 안에 들어오는 첫 번째 형식으로 인코딩
+
+    무손실 형식(PNG, WebP)을 먼저 시도하고, 한도를 넘으면 고품질 JPEG,
+    그래도 넘으면 해상도를 줄여 다시 시도합니다.
+
+    Args:
+        image (Image): RGB 이미지
+        max_bytes (int): 최대 바이트 수
+        max_dimension (int): 긴 변의 최대 픽셀 수
+        formats (list): 시도할 (파일 타입, 저장 옵션) 목록 (앞쪽일수록 우선)
+
+    Returns:
+        tuple: (인코딩된 바이트, 파일 타입, (너비, 높이))
+    """
+    from PIL import Image
+
+    # 너무 큰 이미지는 먼저 축소
+    if max(image.size) > max_dimension:
+        scale = max_dimension / max(image.size)
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                             Image.Resampling.LANCZOS)
+
+    def is_lossless(save_options):
+        return save_options['format'] == 'PNG' or save_options.get('lossless', False)
+
+    while True:
+        smallest = None
+        for file_type, save_options in formats:
+            # 무손실 결과가 한도의 2배를 넘으면 다른 무손실 형식도 들어오기 어려우므로 건너뜀
+            if is_lossless(save_options) and smallest is not None and len(smallest[0]) > 2 * max_bytes:
+                continue
+            output_bytes = io.BytesIO()
+            image.save(output_bytes, **save_options)
+            data = output_bytes.getvalue()
+            if len(data) <= max_bytes:
+                return data, file_type, image.size
+            if smallest is None or len(data) < len(smallest[0]):
+                smallest = (data, file_type)
+
+        # 모든 형식이 한도를 넘으면 용량 비율에 맞춰 해상도를 줄여 재시도
+        scale = max(0.5, min(0.9, (max_bytes / len(smallest[0])) ** 0.5))
+        if min(image.size) * scale < 200:
+            return smallest[0], smallest[1], image.size
+        image = image.resize((int(image.width * scale), int(image.height * scale)), Image.Resampling.LANCZOS)
+        # 축소 후에는 손실 형식만 다시 시도 (무손실 형식은 이미 한도를 크게 넘었음)
+        formats = [f for f in formats if not is_lossless(f[1])] or formats
+
+
+@timed("image_prepare")
+def prepare_image(image, budget, notify=_log_notify):
+    """
+    RGB 이미지를 확대/선명화한 뒤 전송 한도에 맞게 인코딩
+
+    Args:
+        image (Image): RGB 이미지
+        budget (dict): IMAGE_BUDGETS 항목 (min_dimension, max_dimension, max_bytes)
+        notify (callable): (level, message)를 받는 알림 함수
+
+    Returns:
+        tuple: (인코딩된 바이트, 파일 타입)
+    """
+    from PIL import Image, ImageEnhance
+
+    # 이미지 크기 확인
+    width, height = image.size
+
+    # 이미지가 너무 작은 경우 확대 (긴 변이 최대 크기를 넘지 않는 범위에서)
+    min_dimension = budget['min_dimension']
+    if width < min_dimension or height < min_dimension:
+        scale_factor = min(
+            max(min_dimension / width, min_dimension / height),
+            budget['max_dimension'] / max(width, height)
+        )
+        if scale_factor > 1:
+            new_width = int(width * scale_factor)
+            new_height = int(height * scale_factor)
+            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            notify("info", f"이미지 품질 개선을 위해 크기를 조정했습니다: {width}x{height} → {new_width}x{new_height}")
+
+    # 이미지 선명도 개선
+    image = ImageEnhance.Sharpness(image).enhance(1.2)  # 약간의 선명도 향상
+
+    # 대비 향상
+    image = ImageEnhance.Contrast(image).enhance(1.1)  # 약간의 대비 향상
+
+    # 용량 한도 안에서 가장 작은 형식으로 인코딩
+    data, file_type, (new_width, new_height) = encode_image_payload(
+        image, budget['max_bytes'], budget['max_dimension']
+    )
+    # 비교 기준: 무압축 PNG(이전 방식)의 크기는 RGB 원시 데이터 크기와 거의 같음
+    uncompressed = image.width * image.height * 3
+    notify("info", (
+        f"이미지 인코딩: {file_type.upper()} {new_width}x{new_height}, {len(data) / 1024:.0f} KB "
+        f"(무압축 대비 {max(0, uncompressed - len(data)) / 1024:.0f} KB 절약)"
+    ))
+    return data, file_type
+
+
+def open_rgb_image(image_data):
+    """이미지 바이트를 RGB 이미지로 열기"""
+    from PIL import Image
+
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return image
+    except Exception as e:
+        raise ExtractionError(f"이미지 처리 중 오류: {e}") from e
+
+
+def process_image_bytes(image_data, quality="높음", notify=_log_notify):
+    """
+    이미지 바이트를 추출에 적합하도록 전처리
+
+    Args:
+        image_data (bytes): 원본 이미지 바이트
+        quality (str): 추출 품질 (IMAGE_BUDGETS의 해상도/용량 한도 선택)
+        notify (callable): (level, message)를 받는 알림 함수
+
+    Returns:
+        tuple: (처리된 이미지 바이트, 인코딩된 파일 타입)
+    """
+    image = open_rgb_image(image_data)
+    try:
+        return prepare_image(image, get_image_budget(quality), notify)
+    except Exception as e:
+        raise ExtractionError(f"이미지 처리 중 오류: {e}") from e
+
+
+def needs_tiling(image_data, quality="높음"):
+    """이미지를 조각으로 나누어 추출해야 하는지 확인 (헤더만 읽으므로 전체 디코딩 없음)"""
+    from PIL import Image
+
+    try:
+        size = Image.open(io.BytesIO(image_data)).size
+    except Exception:
+        return False
+    return get_tile_layout(size, quality) is not None
+
+
+def split_image_tiles(image, tile_height, overlap):
+    """
+    세로로 긴 이미지를 서로 겹치는 가로 띠 조각으로 분할
+
+    열 구조가 깨지지 않도록 세로 방향으로만 나누며, 인접한 조각은 overlap 픽셀만큼 겹칩니다.
+
+    Args:
+        image (Image): 원본 이미지
+        tile_height (int): 조각 높이 (픽셀)
+        overlap (int): 인접 조각이 겹치는 높이 (픽셀)
+
+    Returns:
+        list: (위쪽 y, 아래쪽 y, 조각 이미지) 튜플 목록
+    """
+    width, height = image.size
+    if height <= tile_height:
+        return [(0, height, image)]
+
+    step = max(1, tile_height - overlap)
+    tiles = []
+    top = 0
+    while True:
+        bottom = min(top + tile_height, height)
+        tiles.append((top, bottom, image.crop((0, top, width, bottom))))
+        if bottom >= height:
+            break
+        top += step
+        # 마지막 조각이 너무 얇아지지 않도록 끝에 맞춤
+        if height - top < tile_height:
+            top = max(0, height - tile_height)
+    return tiles
+
+
+def get_tile_layout(image_size, quality="높음"):
+    """
+    이미지를 조각으로 나눌지와 조각 크기 결정
+
+    긴 변이 전송 한도를 크게 넘는 세로로 긴 이미지만 분할합니다 (한 번에 보내면 축소되어 글자가 뭉개짐).
+
+    Returns:
+        tuple: (조각 높이, 겹침 높이), 분할이 필요 없으면 None
+    """
+    width, height = image_size
+    max_dimension = get_image_budget(quality)['max_dimension']
+    # 조각은 너비 기준으로 정하되 한도 안에서 충분히 길게 (요청 수를 줄이기 위함)
+    tile_height = max(min(max_dimension, width * 2), max_dimension // 2)
+    if height <= tile_height * 1.25 or height <= width * 2:
+        return None
+    overlap = max(120, int(tile_height * TILE_OVERLAP_RATIO))
+    return tile_height, overlap
+
+
+def get_pdf_page_count(pdf_data):
+    """
+    PDF 페이지 수 (페이지 내용은 읽지 않음)
+
+    Args:
+        pdf_data: PDF 바이트, 파일 객체 또는 파일 경로
+
+    Raises:
+        ExtractionError: PDF를 읽을 수 없거나 페이지가 없는 경우
+    """
+    import PyPDF2
+
+    with open_pdf_stream(pdf_data) as stream:
+        try:
+            page_count = len(PyPDF2.PdfReader(stream).pages)
+        except Exception as e:
+            raise ExtractionError(f"PDF 읽기 중 오류: {e}") from e
+    if page_count == 0:
+        raise ExtractionError("PDF 파일이 비어있습니다.")
+    return page_count
+
+
+def get_chunk_ranges(page_count, pages_per_chunk=1):
+    """페이지 수를 묶음 단위로 나눈 (시작 페이지, 끝 페이지) 목록 (페이지 번호는 1부터 시작)"""
+    pages_per_chunk = max(1, int(pages_per_chunk))
+    return [(start + 1, min(start + pages_per_chunk, page_count))
+            for start in range(0, page_count, pages_per_chunk)]
+
+
+def iter_pdf_chunks(pdf_data, pages_per_chunk=1, max_pages=None, ranges=None):
+    """
+    PDF를 페이지 묶음 단위의 개별 PDF로 하나씩 분할
+
+    묶음은 다음 값을 요청할 때 만들므로, 받는 쪽이 처리한 묶음을 버리면 모든 페이지의
+    사본을 한꺼번에 메모리에 두지 않습니다. 원본은 읽는 동안 계속 열어 둡니다.
+
+    Args:
+        pdf_data: 원본 PDF 바이트, 파일 객체 또는 파일 경로
+        pages_per_chunk (int): 한 번의 요청에 포함할 페이지 수
+        max_pages (int): 앞에서부터 처리할 최대 페이지 수 (None이면 전체)
+        ranges (list): 만들 (시작 페이지, 끝 페이지) 목록 (None이면 pages_per_chunk로 나눈 전체)
+
+    Yields:
+        tuple: (시작 페이지, 끝 페이지, PDF 바이트) (페이지 번호는 1부터 시작)
+    """
+    import PyPDF2
+
+    with open_pdf_stream(pdf_data) as stream:
+        try:
+            reader = PyPDF2.PdfReader(stream)
+            page_count = len(reader.pages)
+        except Exception as e:
+            raise ExtractionError(f"PDF 읽기 중 오류: {e}") from e
+
+        if page_count == 0:
+            raise ExtractionError("PDF 파일이 비어있습니다.")
+        if max_pages:
+            page_count = min(page_count, max_pages)
+        if ranges is None:
+            ranges = get_chunk_ranges(page_count, pages_per_chunk)
+
+        for start, end in ranges:
+            try:
+                with stage("pdf_split"):
+                    writer = PyPDF2.PdfWriter()
+                    for page_idx in range(start - 1, end):
+                        writer.add_page(reader.pages[page_idx])
+                    output_bytes = io.BytesIO()
+                    writer.write(output_bytes)
+            except Exception as e:
+                raise ExtractionError(f"PDF 페이지 분할 중 오류: {e}") from e
+            yield start, end, output_bytes.getvalue()
+
+
+def split_pdf_pages(pdf_data, pages_per_chunk=1, max_pages=None):
+    """
+    PDF를 페이지 묶음 단위의 개별 PDF로 분할
+
+    Args:
+        pdf_data: 원본 PDF 바이트, 파일 객체 또는 파일 경로
+        pages_per_chunk (int): 한 번의 요청에 포함할 페이지 수
+        max_pages (int): 앞에서부터 처리할 최대 페이지 수 (None이면 전체)
+
+    Returns:
+        list: (시작 페이지, 끝 페이지, PDF 바이트) 튜플 목록 (페이지 번호는 1부터 시작)
+    """
+    return list(iter_pdf_chunks(pdf_data, pages_per_chunk, max_pages))
+
+
+def extract_first_page_pdf(pdf_data):
+    """PDF(바이트, 파일 객체 또는 경로)에서 첫 페이지만 추출하여 새 PDF 바이트로 반환"""
+    return split_pdf_pages(pdf_data, pages_per_chunk=1, max_pages=1)[0][2]
+
+
+def name_headerless_columns(table_data):
+    """모든 열이 Unnamed인 표(헤더 없는 표)의 열 이름을 Column_0, Column_1, ... 로 바꿈"""
+    if all('Unnamed' in str(col) for col in table_data.columns):
+        table_data.columns = [f'Column_{i}' for i in range(len(table_data.columns))]
+    return table_data
+
+
+def parse_table_block(table_csv, table_idx, notify=_log_notify):
+    """
+    TABLE_START/TABLE_END 블록 하나의 CSV 텍스트를 데이터프레임으로 변환
+
+    Args:
+        table_csv (str): 블록 안의 CSV 텍스트
+        table_idx (int): 응답 내 표 순번 (0부터 시작)
+        notify (callable): (level, message)를 받는 알림 함수
+
+    Returns:
+        dict: 표 정보 ('index', 'df', 'original_df', 'recovery', 'error'), 빈 블록이면 None
+    """
+    if not table_csv.strip():
+        return None
+
+    try:
+        # 모델 출력용 관대한 CSV 토크나이저로 한 번에 파싱 (따옴표 오류, 행 길이 불일치, 천 단위 쉼표 보정)
+        table_data, repairs = parse_model_csv(table_csv)
+    except Exception as csv_error:
+        notify("warning", f"표 {table_idx+1} CSV 파싱 오류: {csv_error}")
+        table_data, repairs = None, {}
+
+    if table_data is None or table_data.empty:
+        # 원본 CSV 텍스트 저장 (디버깅용)
+        error_df = pd.DataFrame({'original_csv': [table_csv.strip()]})
+        return {
+            'index': table_idx,
+            'df': error_df,
+            'error': True
+        }
+
+    name_headerless_columns(table_data)
+
+    # 셀을 합치거나 열을 늘리는 등 내용이 바뀔 수 있는 보정을 했으면 알림
+    recovered = bool(repairs['merged'] or repairs['widened'] or repairs['stray_quotes'])
+    if recovered:
+        notify("warning", f"표 {table_idx+1} CSV 형식 오류를 보정했습니다 "
+                          f"(숫자 병합 {repairs['merged']}, 열 추가 {repairs['widened']}, "
+                          f"따옴표 {repairs['stray_quotes']})")
+
+    # 원본 데이터 저장
+    original_df = table_data.copy()
+
+    # 결과에 추가 - 재구성이 불필요한 경우 원본 데이터를 바로 사용
+    table = {
+        'index': table_idx,
+        'df': original_df,
+        'original_df': original_df  # 원본 데이터도 저장
+    }
+    if recovered:
+        table['recovery'] = True
+    return table
+
+
+def parse_json_response(result, notify=_log_notify):
+    """
+    JSON 응답 모드의 응답 텍스트를 표 정보 목록으로 변환
+
+    Args:
+        result (str): Gemini 응답 원본 텍스트
+        notify (callable): (level, message)를 받는 알림 함수
+
+    Returns:
+        list: 표 정보 dict 목록 ('index', 'df', 'original_df', 'title', 'unit', 'recovery')
+
+    Raises:
+        JsonTablesError: JSON으로 읽을 수 없는 응답 (잘린 응답 포함)
+    """
+    tables_data = []
+    for json_table in load_json_tables(result):
+        df, widened = json_table_to_frame(json_table)
+        if df is None:
+            continue
+        # CSV 블록과 같은 열 이름 규칙 적용
+        name_headerless_columns(df)
+        table_idx = len(tables_data)
+        table = {'index': table_idx, 'df': df, 'original_df': df.copy()}
+        for key in ('title', 'unit'):
+            if json_table.get(key):
+                table[key] = str(json_table[key])
+        if widened:
+            notify("warning", f"표 {table_idx+1}의 {widened}개 행이 헤더보다 길어 열을 추가했습니다.")
+            table['recovery'] = True
+        tables_data.append(table)
+    return tables_data
+
+
+def parse_tables_from_response(result, notify=_log_notify):
+    """
+    Gemini 응답 텍스트의 TABLE_START/TABLE_END 블록을 데이터프레임으로 변환
+
+    Args:
+        result (str): Gemini 응답 원본 텍스트
+        notify (callable): (level, message)를 받는 알림 함수
+
+    Returns:
+        list: 표 정보 dict 목록 ('index', 'df', 'original_df', 'recovery', 'error')
+    """
+    if "NO_TABLES_FOUND" in result:
+        return []
+
+    tables_data = []
+    for table_idx, table_csv in enumerate(TABLE_PATTERN.findall(result)):
+        table = parse_table_block(table_csv, table_idx, notify)
+        if table is not None:
+            tables_data.append(table)
+    return tables_data
+
+
+class TableStreamParser:
+    """
+    스트리밍 응답 조각에서 완성된 TABLE_START…TABLE_END 블록을 순서대로 꺼내는 파서
+
+    아직 닫히지 않은 표의 텍스트만 버퍼에 남기므로, 조각이 도착할 때마다
+    전체 응답을 다시 검색하지 않습니다.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._buffer = ""
+        self.block_count = 0
+
+    @property
+    def text(self):
+        """지금까지 받은 전체 응답 텍스트"""
+        return "".join(self._chunks)
+
+    def feed(self, chunk):
+        """
+        응답 조각을 추가하고 새로 닫힌 표 블록을 반환
+
+        Returns:
+            list: (표 순번, CSV 텍스트) 튜플 목록
+        """
+        self._chunks.append(chunk)
+        self._buffer += chunk
+
+        blocks = []
+        while "TABLE_END" in self._buffer:
+            match = TABLE_PATTERN.search(self._buffer)
+            if match is None:
+                break
+            blocks.append((self.block_count, match.group(1)))
+            self.block_count += 1
+            self._buffer = self._buffer[match.end():]
+
+        # 열린 표가 없으면 마커가 조각 경계에 걸친 경우에 대비해 끝부분만 보관
+        if "TABLE_START" not in self._buffer:
+            self._buffer = self._buffer[-len("TABLE_START"):]
+        return blocks
+
+
+def _stream_tables(model, contents, emitted, on_table, notify):
+    """
+    스트리밍 응답을 조각 단위로 읽으면서 닫힌 표를 즉시 파싱하여 on_table로 전달
+
+    Args:
+        model: GenerativeModel 인스턴스
+        contents (list): generate_content에 전달할 내용
+        emitted (list): 파싱된 표를 차례로 추가할 목록 (호출자가 진행 상황을 확인하는 용도)
+        on_table (callable): 표 정보 dict를 받는 콜백
+        notify (callable): (level, message)를 받는 알림 함수
+
+    Returns:
+        tuple: (전체 응답 텍스트, 마지막 조각 - 사용량 정보 usage_metadata 포함)
+    """
+    parser = TableStreamParser()
+    chunk = None
+    for chunk in model.generate_content(contents, stream=True):
+        try:
+            text = chunk.text
+        except ValueError:
+            # 텍스트가 없는 조각(종료 사유만 포함된 경우 등)은 건너뜀
+            continue
+        for table_idx, table_csv in parser.feed(text):
+            table = parse_table_block(table_csv, table_idx, notify)
+            if table is not None:
+                emitted.append(table)
+                if on_table is not None:
+                    on_table(table)
+    return parser.text, chunk
+
+
+def estimate_request_tokens(prompt, file_bytes, file_type):
+    """
+    속도 제한용 요청 입력 토큰 수 추정
+
+    Args:
+        prompt (str): 프롬프트
+        file_bytes (bytes): 전송할 파일 바이트
+        file_type (str): 'pdf' 또는 이미지 확장자
+
+    Returns:
+        int: 추정 토큰 수
+    """
+    pages = 1
+    if file_type == "pdf":
+        import PyPDF2
+
+        try:
+            pages = len(PyPDF2.PdfReader(io.BytesIO(file_bytes)).pages)
+        except Exception:
+            pass
+    return len(prompt) // CHARS_PER_TOKEN + TOKENS_PER_MEDIA_PAGE * pages
+
+
+def _get_usage_tokens(response):
+    """응답의 실제 사용 토큰 수 (라이브러리 버전에 따라 없으면 None)"""
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", None)
+    return total or None
+
+
+def _finish_reason(response):
+    """응답의 종료 사유 이름 (예: 'STOP', 'MAX_TOKENS'), 알 수 없으면 None"""
+    try:
+        reason = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return None
+    return getattr(reason, "name", None) or str(reason)
+
+
+def find_truncation(text, finish_reason=None):
+    """
+    잘린 응답에서 이어받을 위치 찾기
+
+    마지막 TABLE_START가 닫히지 않았거나 종료 사유가 MAX_TOKENS이면 잘린 응답으로 봅니다.
+    열린 표 안의 완성되지 않은 마지막 줄은 버리고, 표가 모두 닫혔으면 닫는 TABLE_END 줄은
+    완성된 줄로 보아 남깁니다.
+
+    Args:
+        text (str): 응답 텍스트
+        finish_reason (str): 응답의 종료 사유 이름
+
+    Returns:
+        dict: 잘린 응답이면 {'prefix': 완성된 줄까지의 텍스트, 'table_start': 열린 표의 시작 위치,
+              'header': 열린 표의 헤더 행, 'last_row': 열린 표의 마지막 완성 행}
+              (열린 표가 없거나 완성된 데이터 행이 없으면 'header'/'last_row'는 None), 아니면 None
+    """
+    start = text.rfind("TABLE_START")
+    is_open = start != -1 and "TABLE_END" not in text[start:]
+    if not is_open and finish_reason != MAX_TOKENS_FINISH_REASON:
+        return None
+
+    if text.endswith("\n"):
+        prefix = text
+    elif not is_open and text[text.rfind("\n") + 1:].strip() == "TABLE_END":
+        # 닫는 줄까지 완성된 표는 그대로 두고 이어받은 응답이 새 줄에서 시작하도록 줄바꿈만 붙임
+        prefix = text + "\n"
+    else:
+        # 마지막 줄은 중간에 잘렸을 수 있으므로 버림
+        prefix = text[:text.rfind("\n") + 1]
+    truncation = {'prefix': prefix, 'table_start': None, 'header': None, 'last_row': None}
+    if not is_open:
+        return truncation
+
+    lines = [line for line in prefix[start + len("TABLE_START"):].split("\n")
+             if line.strip() and not line.strip().startswith("```")]
+    if len(lines) < 2:
+        # 헤더나 첫 행도 완성되지 않았으면 열린 표를 통째로 다시 받음
+        truncation['prefix'] = text[:start]
+        return truncation
+    truncation.update(table_start=start, header=lines[0], last_row=lines[-1])
+    return truncation
+
+
+def merge_continuation(truncation, continuation):
+    """
+    잘린 응답과 이어받은 응답 합치기
+
+    이어받은 응답 앞에 반복된 TABLE_START, 헤더, 마지막 완성 행은 버립니다.
+
+    Args:
+        truncation (dict): find_truncation 결과
+        continuation (str): 이어받기 요청의 응답 텍스트
+
+    Returns:
+        str: 합친 응답 텍스트
+    """
+    lines = [line for line in continuation.strip().split("\n") if not line.strip().startswith("```")]
+    if truncation['header'] is not None:
+        if lines and lines[0].strip() == "TABLE_START":
+            lines.pop(0)
+        if lines and lines[0].strip() == truncation['header'].strip():
+            lines.pop(0)
+        while lines and lines[0].strip() == truncation['last_row'].strip():
+            lines.pop(0)
+    return truncation['prefix'] + "\n".join(lines)
+
+
+def _continue_truncated(model, contents, text, response, limiter, estimated_tokens, notify, cancel_event):
+    """
+    출력 길이 제한으로 잘린 응답을 마지막 완성 행부터 이어받아 합침
+
+    이어받기 요청은 원래 요청과 지금까지의 응답을 대화 기록으로 보내므로 처음부터 다시
+    생성하지 않습니다. MAX_CONTINUATIONS번 이어받아도 표가 닫히지 않거나 이어받기가 실패하면
+    열린 표를 마지막 완성 행까지만 닫아서 남깁니다.
+
+    Returns:
+        tuple: (합친 응답 텍스트, 이어받기 요청 수, 이어받기로 추가 전송한 바이트 수)
+    """
+    continuations = 0
+    bytes_sent = 0
+    truncation = find_truncation(text, _finish_reason(response))
+    while truncation is not None and continuations < MAX_CONTINUATIONS:
+        _check_cancelled(cancel_event)
+        if truncation['header'] is not None:
+            instruction = CONTINUE_TABLE_PROMPT.format(last_row=truncation['last_row'])
+        else:
+            instruction = CONTINUE_TABLES_PROMPT
+        request = [
+            {'role': 'user', 'parts': list(contents)},
+            {'role': 'model', 'parts': [truncation['prefix']]},
+            {'role': 'user', 'parts': [instruction]},
+        ]
+        limiter.acquire(estimated_tokens + len(truncation['prefix']) // CHARS_PER_TOKEN)
+        try:
+            with stage("continuation") as fields:
+                fields['resumed_chars'] = len(truncation['prefix'])
+                response = model.generate_content(request)
+                piece = response.text
+        except Exception as e:
+            notify("warning", f"잘린 응답을 이어받지 못했습니다: {e}")
+            break
+        continuations += 1
+        bytes_sent += len(truncation['prefix'].encode("utf-8")) + len(instruction.encode("utf-8"))
+        text = merge_continuation(truncation, piece)
+        truncation = find_truncation(text, _finish_reason(response))
+
+    if continuations:
+        get_metrics_registry().increment("continuations_total", continuations)
+        notify("info", f"출력 길이 제한으로 잘린 응답을 {continuations}번 이어받았습니다.")
+
+    if truncation is not None:
+        if truncation['header'] is not None:
+            # 완성된 행까지만 표를 닫아서 보존
+            text = truncation['prefix'] + "TABLE_END"
+            notify("warning", "응답이 출력 길이 제한으로 잘려 마지막 표는 일부 행만 추출했습니다.")
+        else:
+            text = truncation['prefix']
+            notify("warning", "응답이 출력 길이 제한으로 잘려 일부 표가 누락되었을 수 있습니다.")
+    return text, continuations, bytes_sent
+
+
+def extract_tables(file_bytes, file_type, model_name, api_key, quality="높음", prompt=None,
+                   cache=None, max_retries=3, notify=_log_notify, stream=False, on_table=None,
+                   limiter=None, retry_policy=None, cancel_event=None, output_format=None):
+    """
+    파일을 직접 Gemini API에 전송하여 표 추출
+
+    모든 호출은 모델별로 공유하는 속도 제한기를 거치며, 요청 한도 초과(429)나 일시적인
+    서버 오류는 지터가 있는 지수 백오프로 재시도하고 잘못된 요청/인증 오류는 바로 실패합니다.
+    출력 길이 제한으로 잘린 CSV 응답은 마지막 완성 행부터 이어받아 합칩니다.
+    JSON 응답 모드에서 응답을 JSON으로 읽을 수 없으면(잘린 응답 포함) CSV 모드로 다시 추출합니다.
+
+    Args:
+        file_bytes (bytes): 전처리된 파일 바이트
+        file_type (str): 'pdf' 또는 이미지 확장자
+        model_name (str): Gemini 모델명 (CASCADE_MODEL이면 extract_tables_cascade로 단계적 추출)
+        api_key (str): Google API 키
+        quality (str): 추출 품질 ('높음', '균형', '빠름')
+        prompt (str): 사용할 프롬프트 (None이면 파일 타입별 기본 프롬프트)
+        cache (ResultCache): 결과 캐시 (None이면 사용하지 않음)
+        max_retries (int): API 오류 시 최대 시도 횟수 (retry_policy를 지정하면 무시)
+        notify (callable): (level, message)를 받는 알림 함수
+        stream (bool): 스트리밍 응답을 사용하여 표가 완성되는 즉시 on_table 호출
+        on_table (callable): 표 정보 dict를 받는 콜백 (stream=True이거나 캐시 적중 시 호출)
+        limiter (TokenBucketLimiter): 속도 제한기 (None이면 모델별 공유 제한기)
+        retry_policy (RetryPolicy): 재시도 정책 (None이면 max_retries로 생성)
+        cancel_event (threading.Event): 설정되면 다음 시도 전이나 재시도 대기 중에 중단
+        output_format (str): 응답 형식 'csv' 또는 'json' (None이나 'auto'면 get_output_format으로 결정,
+                             JSON 모드는 스트리밍 중 표를 하나씩 전달하지 않고 응답을 다 받은 뒤 전달)
+
+    Returns:
+        ExtractionResult: 추출 결과 (extra에 'rate_limit_wait', 'backoff_wait' 대기 시간,
+                          잘린 응답을 이어받은 횟수 'continuations', 실제 응답 형식 'output_format',
+                          CSV 모드로 다시 추출했는지 'json_fallback' 포함)
+
+    Raises:
+        ExtractionError: API 설정 또는 호출이 실패한 경우
+        ExtractionCancelled: cancel_event로 취소된 경우
+    """
+    if model_name == CASCADE_MODEL:
+        # 속도 제한기는 모델별이므로 실제 모델마다 공유 제한기를 사용
+        return extract_tables_cascade(
+            file_bytes, file_type, api_key, quality=quality, prompt=prompt, cache=cache,
+            max_retries=max_retries, notify=notify, stream=stream, on_table=on_table,
+            retry_policy=retry_policy, cancel_event=cancel_event, output_format=output_format
+        )
+
+    started = time.perf_counter()
+    output_format = get_output_format(output_format)
+    temperature, max_tokens = get_generation_settings(quality)
+    custom_prompt = prompt
+    prompt = prompt or get_default_prompt(file_type, output_format)
+    mime_type = get_mime_type(file_type)
+
+    # 캐시 조회: 동일한 파일/모델/프롬프트/설정이면 API 호출 없이 저장된 결과 사용
+    # (바이트가 다르면 다시 인코딩한 것처럼 거의 같은 이미지/페이지의 결과를 찾음)
+    cache_key = None
+    similar = None
+    if cache is not None:
+        cache_key = make_cache_key(file_bytes, model_name, prompt, mime_type, temperature, max_tokens,
+                                   output_format)
+        with stage("cache_lookup") as fields:
+            cached = cache.get(cache_key)
+            if cached is None:
+                scope = make_similarity_scope(model_name, prompt, temperature, max_tokens, output_format)
+                cached, similar = cache.find_similar(file_bytes, file_type, scope)
+            fields['hit'] = cached is not None
+        if similar is not None and similar['similarity'] is not None:
+            if similar['served']:
+                notify("info", "텍스트가 같은 이전 파일의 결과를 사용했습니다.")
+            else:
+                notify("info", f"이전에 추출한 파일과 비슷합니다(유사도 {similar['similarity']:.1%}). "
+                               "같은 양식의 다른 문서일 수 있어 새로 추출합니다.")
+        if cached is not None:
+            if on_table is not None:
+                for table in cached[1]:
+                    on_table(table)
+            record_request(model_name, 0, 0, from_cache=True)
+            return ExtractionResult(
+                tables=cached[1],
+                raw_text=cached[0],
+                from_cache=True,
+                elapsed=time.perf_counter() - started,
+                extra={'near_duplicate': similar['similarity'] if similar else None}
+            )
+
+    configure_gemini(api_key)
+    generation_config = get_generation_config(quality, output_format)
+    # JSON 응답은 다 받은 뒤 한 번에 읽으므로 스트리밍 파서를 사용하지 않음
+    stream_tables = stream and output_format == "csv"
+    # 같은 설정의 모델 핸들은 재시도와 이후 요청에서 재사용하고, 가능하면 프롬프트를 컨텍스트 캐시에 올림
+    try:
+        model, prompt_cached = get_model_registry().get_model(
+            api_key,
+            model_name,
+            generation_config,
+            prompt=prompt
+        )
+    except Exception as e:
+        raise ExtractionError(f"Gemini 모델 설정 중 오류가 발생했습니다: {e}") from e
+
+    file_part = {
+        "mime_type": mime_type,
+        "data": file_bytes
+    }
+    # 인라인 요청 한도를 넘을 수 있는 큰 파일은 File API로 올리고 요청에는 파일 참조만 넣음
+    uploaded = None
+    if len(file_bytes) > INLINE_PAYLOAD_LIMIT:
+        if supports_file_upload():
+            try:
+                with stage("file_upload") as fields:
+                    fields['bytes'] = len(file_bytes)
+                    uploaded = get_model_registry().upload_file(api_key, file_bytes, mime_type)
+            except Exception as e:
+                raise ExtractionError(f"파일 업로드 중 오류가 발생했습니다: {e}") from e
+            file_part = uploaded
+        else:
+            notify("warning", f"요청 파일({len(file_bytes) / 1024 / 1024:.1f} MB)이 인라인 전송 한도를 넘을 수 있지만 "
+                              "설치된 google-generativeai가 파일 업로드를 지원하지 않아 그대로 보냅니다.")
+    contents = [file_part] if prompt_cached else [prompt, file_part]
+
+    limiter = limiter or get_rate_limiter(model_name)
+    retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
+    estimated_tokens = estimate_request_tokens(prompt, file_bytes, file_type)
+    rate_limit_wait = 0.0
+    backoff_wait = 0.0
+    # 시도마다 다시 보내는 요청 크기 (컨텍스트 캐시에 올린 프롬프트와 한 번만 올린 파일은 제외)
+    request_bytes = (0 if uploaded is not None else len(file_bytes)) + (0 if prompt_cached else len(prompt.encode("utf-8")))
+    upload_bytes = len(file_bytes) if uploaded is not None else 0
+
+    try:
+        # API 호출 로직
+        for attempt in range(retry_policy.max_retries):
+            _check_cancelled(cancel_event)
+            emitted = []
+            response = None
+            rate_limit_wait += limiter.acquire(estimated_tokens)
+            try:
+                # 모델 호출 시간 (업로드, 대기, 생성 포함 - 스트리밍은 표 파싱 시간도 포함)
+                with stage("model_call", model=model_name, stream=stream_tables) as fields:
+                    fields['bytes_sent'] = request_bytes
+                    if stream_tables:
+                        result, response = _stream_tables(model, contents, emitted, on_table, notify)
+                    else:
+                        response = model.generate_content(contents)
+                        result = response.text
+            except Exception as e:
+                failed = not is_retryable_error(e) or emitted or attempt >= retry_policy.max_retries - 1
+                if failed:
+                    record_request(model_name, upload_bytes + request_bytes * (attempt + 1), attempt + 1, status="error")
+                if not is_retryable_error(e):
+                    raise ExtractionError(f"표 추출 중 오류가 발생했습니다: {e}") from e
+                # 스트리밍 중 이미 전달한 표가 있으면 처음부터 다시 보내면 중복되므로 재시도하지 않음
+                if emitted:
+                    raise ExtractionError(f"스트리밍 중 오류가 발생했습니다 ({len(emitted)}개 표 수신 후): {e}") from e
+                if attempt < retry_policy.max_retries - 1:
+                    retry_after = get_retry_after(e)
+                    delay = retry_policy.compute_delay(attempt, retry_after)
+                    if retry_after is not None:
+                        # 서버가 대기 시간을 알려주면 같은 모델을 쓰는 다른 요청도 함께 대기
+                        limiter.penalize(delay)
+                    limiter.record_backoff(delay)
+                    backoff_wait += delay
+                    notify("warning", f"API 호출 중 오류 발생: {e}. {delay:.1f}초 후 재시도...")
+                    if cancel_event is not None:
+                        cancel_event.wait(delay)
+                    else:
+                        time.sleep(delay)
+                    continue
+                raise ExtractionError(f"Gemini API 호출 실패 ({attempt + 1}회 시도): {e}") from e
+
+            prompt_tokens, output_tokens = get_usage_counts(response)
+            actual_tokens = _get_usage_tokens(response)
+            if actual_tokens is not None:
+                limiter.record_usage(estimated_tokens, actual_tokens)
+
+            continuations, continuation_bytes = 0, 0
+            streamed_text = result
+            if output_format == "csv":
+                # 출력 길이 제한으로 잘린 응답은 처음부터 다시 요청하지 않고 이어받음
+                result, continuations, continuation_bytes = _continue_truncated(
+                    model, contents, result, response, limiter, estimated_tokens, notify, cancel_event
+                )
+            record_request(model_name, upload_bytes + request_bytes * (attempt + 1) + continuation_bytes, attempt + 1,
+                           prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+
+            if output_format == "json":
+                try:
+                    with stage("json_parse") as fields:
+                        tables_data = parse_json_response(result, notify)
+                        fields['tables'] = len(tables_data)
+                except JsonTablesError as e:
+                    # 잘렸거나 형식이 맞지 않는 JSON은 이어받을 수 없으므로 CSV 모드로 다시 추출
+                    notify("warning", f"{e} - CSV 형식으로 다시 추출합니다.")
+                    get_metrics_registry().increment("json_fallback_total", labels={'model': model_name})
+                    fallback = extract_tables(
+                        file_bytes, file_type, model_name, api_key, quality=quality,
+                        prompt=_csv_fallback_prompt(custom_prompt), cache=cache, notify=notify, stream=stream,
+                        on_table=on_table, limiter=limiter, retry_policy=retry_policy,
+                        cancel_event=cancel_event, output_format="csv"
+                    )
+                    fallback.attempts += attempt + 1
+                    fallback.elapsed = time.perf_counter() - started
+                    fallback.extra['json_fallback'] = True
+                    return fallback
+                if on_table is not None:
+                    for table in tables_data:
+                        on_table(table)
+            elif stream and result == streamed_text:
+                tables_data = emitted
+            else:
+                with stage("csv_parse") as fields:
+                    tables_data = parse_tables_from_response(result, notify)
+                    fields['tables'] = len(tables_data)
+                if stream:
+                    # 스트리밍 중 이미 전달한 표는 그대로 두고 이어받았거나 잘린 채로 닫은 표만 전달
+                    emitted_indices = {t['index'] for t in emitted}
+                    for table in tables_data:
+                        if table['index'] not in emitted_indices and on_table is not None:
+                            on_table(table)
+
+            # 파싱 오류가 없는 결과만 캐시에 저장 (오류가 있으면 다음 요청에서 다시 시도)
+            if cache is not None and not any(t.get('error', False) for t in tables_data):
+                cache.put(cache_key, result, tables_data, similar=similar)
+
+            return ExtractionResult(
+                tables=tables_data,
+                raw_text=result,
+                attempts=attempt + 1,
+                elapsed=time.perf_counter() - started,
+                extra={'rate_limit_wait': rate_limit_wait, 'backoff_wait': backoff_wait,
+                       'continuations': continuations, 'output_format': output_format,
+                       'near_duplicate': similar['similarity'] if similar else None}
+            )
+
+        raise ExtractionError("Gemini API 호출 실패")
+    finally:
+        if uploaded is not None:
+            get_model_registry().delete_file(uploaded)
+
+
+def get_hedge_after():
+    """환경 변수 TABLE_EXTRACTOR_HEDGE_AFTER의 동시 요청 대기 시간(초), 없거나 잘못된 값이면 None"""
+    try:
+        value = float(os.environ.get(CASCADE_HEDGE_ENV, ""))
+    except ValueError:
+        return None
+    return value if value >= 0 else None
+
+
+def _extract_validated(file_bytes, file_type, model_name, api_key, **kwargs):
+    """
+    extract_tables 결과와 검증 문제 목록 반환 (요청이 실패하면 결과 None과 실패 사유)
+
+    Raises:
+        ExtractionCancelled: 취소된 경우
+    """
+    try:
+        result = extract_tables(file_bytes, file_type, model_name, api_key, **kwargs)
+    except ExtractionCancelled:
+        raise
+    except ExtractionError as e:
+        return None, [str(e)]
+    return result, validate_tables(result.tables)
+
+
+def _cascade_result(result, model_name, started, reasons=(), hedged=False):
+    """단계적 추출에서 사용한 결과에 모델 정보 기록"""
+    escalated = model_name != CASCADE_MODELS[0]
+    result.extra.update(model=model_name, escalated=escalated, escalation_reasons=list(reasons), hedged=hedged)
+    result.elapsed = time.perf_counter() - started
+    outcome = "hedged" if hedged else "escalated" if escalated else "fast"
+    get_metrics_registry().increment("cascade_total", labels={'outcome': outcome})
+    return result
+
+
+def extract_tables_cascade(file_bytes, file_type, api_key, models=CASCADE_MODELS, hedge_after=None,
+                           notify=_log_notify, stream=False, on_table=None, cancel_event=None, **kwargs):
+    """
+    빠른 모델로 먼저 추출하고, 요청이 실패하거나 결과가 로컬 검증(validate_tables)을
+    통과하지 못한 경우에만 강한 모델로 다시 추출
+
+    hedge_after를 지정하면 빠른 모델 응답이 그 시간 안에 오지 않을 때 강한 모델에도 같은 요청을
+    보내고 먼저 쓸 수 있는 결과를 사용합니다. 이때는 두 요청을 작업 스레드에서 보내므로
+    스트리밍 미리보기를 사용하지 않고, 알림은 끝난 뒤 호출한 스레드에서 전달합니다.
+
+    Args:
+        file_bytes (bytes): 전처리된 파일 바이트
+        file_type (str): 'pdf' 또는 이미지 확장자
+        api_key (str): Google API 키
+        models (tuple): (빠른 모델, 강한 모델)
+        hedge_after (float): 강한 모델에 동시 요청을 보내기까지 기다릴 시간(초)
+                             (None이면 환경 변수 TABLE_EXTRACTOR_HEDGE_AFTER, 그것도 없으면 사용 안 함)
+        notify (callable): (level, message)를 받는 알림 함수
+        stream (bool): 빠른 모델 요청에 스트리밍 응답 사용 여부
+        on_table (callable): 스트리밍 중 완성된 표를 받는 콜백
+        cancel_event (threading.Event): 설정되면 추출 중단
+        **kwargs: extract_tables에 넘길 나머지 인자 (quality, prompt, cache, max_retries, retry_policy)
+
+    Returns:
+        ExtractionResult: 사용한 결과 (extra에 'model', 'escalated', 'escalation_reasons', 'hedged' 포함)
+    """
+    started = time.perf_counter()
+    fast_model, strong_model = models
+    if hedge_after is None:
+        hedge_after = get_hedge_after()
+    if hedge_after is not None:
+        return _extract_hedged(file_bytes, file_type, api_key, models, hedge_after, notify,
+                               cancel_event, started, **kwargs)
+
+    result, issues = _extract_validated(file_bytes, file_type, fast_model, api_key, notify=notify,
+                                        stream=stream, on_table=on_table, cancel_event=cancel_event, **kwargs)
+    if not issues:
+        return _cascade_result(result, fast_model, started)
+
+    notify("info", f"{fast_model} 결과를 {strong_model}로 다시 추출합니다: {'; '.join(issues)}")
+    try:
+        strong = extract_tables(file_bytes, file_type, strong_model, api_key, notify=notify,
+                                cancel_event=cancel_event, **kwargs)
+    except ExtractionCancelled:
+        raise
+    except ExtractionError as e:
+        if result is None:
+            raise
+        notify("warning", f"{strong_model} 추출에 실패하여 {fast_model} 결과를 사용합니다: {e}")
+        return _cascade_result(result, fast_model, started, issues)
+    return _cascade_result(strong, strong_model, started, issues)
+
+
+def _extract_hedged(file_bytes, file_type, api_key, models, hedge_after, notify, cancel_event, started, **kwargs):
+    """extract_tables_cascade의 동시 요청 방식 (빠른 모델이 느리면 강한 모델에도 요청)"""
+    fast_model, strong_model = models
+    # 작업 스레드의 알림은 모았다가 끝난 뒤 호출한 스레드에서 전달
+    messages = []
+    # 쓰지 않게 된 요청은 다음 재시도 전에 중단
+    events = {fast_model: threading.Event(), strong_model: threading.Event()}
+
+    def run(model_name):
+        return _extract_validated(file_bytes, file_type, model_name, api_key,
+                                  notify=lambda level, message: messages.append((level, message)),
+                                  cancel_event=events[model_name], **kwargs)
+
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cascade")
+    pending = {pool.submit(run, fast_model): fast_model}
+    deadline = time.monotonic() + hedge_after
+    strong_sent = hedged = False
+    fallback = None
+    try:
+        while pending:
+            _check_cancelled(cancel_event)
+            timeout = CANCEL_POLL_INTERVAL
+            if not strong_sent:
+                timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                model_name = pending.pop(future)
+                result, issues = future.result()
+                if model_name == strong_model:
+                    if result is not None:
+                        reasons = fallback[1] if fallback else [f"{fast_model} 응답 지연 ({hedge_after:g}초 초과)"]
+                        return _cascade_result(result, strong_model, started, reasons, hedged)
+                    messages.append(("warning", f"{strong_model} 추출 실패: {'; '.join(issues)}"))
+                elif not issues:
+                    return _cascade_result(result, fast_model, started, hedged=hedged)
+                else:
+                    fallback = (result, issues)
+            if not strong_sent and (fallback is not None or time.monotonic() >= deadline):
+                if fallback is not None:
+                    messages.append(("info", f"{fast_model} 결과를 {strong_model}로 다시 추출합니다: "
+                                             f"{'; '.join(fallback[1])}"))
+                else:
+                    hedged = True
+                pending[pool.submit(run, strong_model)] = strong_model
+                strong_sent = True
+        if fallback is not None and fallback[0] is not None:
+            messages.append(("warning", f"{strong_model} 추출에 실패하여 {fast_model} 결과를 사용합니다."))
+            return _cascade_result(fallback[0], fast_model, started, fallback[1], hedged)
+        raise ExtractionError(f"표 추출 중 오류가 발생했습니다 ({fast_model}, {strong_model} 모두 실패)")
+    finally:
+        for event in events.values():
+            event.set()
+        pool.shutdown(wait=False)
+        for level, message in list(messages):
+            notify(level, message)
+
+
+def _check_cancelled(cancel_event):
+    """취소 요청이 있으면 ExtractionCancelled 발생"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ExtractionCancelled("작업이 취소되었습니다.")
+
+
+def _iter_completed(futures, cancel_event=None):
+    """
+    완료된 순서대로 future 반환 (as_completed와 같으며 취소 요청을 주기적으로 확인)
+
+    취소 요청이 있으면 아직 시작하지 않은 작업을 취소하고 ExtractionCancelled를 발생시킵니다.
+    이미 진행 중인 요청은 끝날 때까지 기다립니다.
+    """
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        if cancel_event is not None and cancel_event.is_set():
+            for future in pending:
+                future.cancel()
+            raise ExtractionCancelled("작업이 취소되었습니다.")
+        yield from done
+
+
+def _iter_bounded(executor, tasks, window, cancel_event=None):
+    """
+    작업을 최대 window개까지만 제출하면서 완료된 순서대로 (키, future) 반환
+
+    tasks는 (키, 인자 없는 함수)를 차례로 만드는 이터레이터이며, 앞선 작업이 끝나야 다음 작업을
+    만들므로 페이지 묶음처럼 큰 입력을 한꺼번에 메모리에 두지 않습니다.
+    취소 요청 처리는 _iter_completed와 같습니다.
+    """
+    tasks = iter(tasks)
+    pending = {}
+
+    def fill():
+        while len(pending) < window:
+            task = next(tasks, None)
+            if task is None:
+                return
+            key, func = task
+            pending[executor.submit(func)] = key
+
+    fill()
+    while pending:
+        done, _ = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        if cancel_event is not None and cancel_event.is_set():
+            for future in pending:
+                future.cancel()
+            raise ExtractionCancelled("작업이 취소되었습니다.")
+        for future in done:
+            yield pending.pop(future), future
+        fill()
+
+
+def format_page_range(start, end):
+    """페이지 범위를 '3' 또는 '3-4' 형식의 문자열로 변환"""
+    return str(start) if start == end else f"{start}-{end}"
+
+
+@timed("text_layer")
+def extract_tables_from_text_layer(pdf_data, max_pages=None):
+    """
+    텍스트 레이어로 API 호출 없이 표를 추출할 수 있는 페이지의 결과 반환
+
+    Args:
+        pdf_data: PDF 바이트, 파일 객체 또는 파일 경로
+        max_pages (int): 앞에서부터 확인할 최대 페이지 수 (None이면 전체)
+
+    Returns:
+        dict: {페이지 번호(1부터): 표 정보 dict 목록} - 로컬 추출을 확신할 수 있는 페이지만 포함
+    """
+    results = {}
+    for page_no, csv_blocks in extract_text_layer_tables(pdf_data, max_pages=max_pages).items():
+        tables = []
+        for csv_text in csv_blocks:
+            table = parse_table_block(csv_text, len(tables), notify=lambda *_: None)
+            if table is not None and not table.get('error'):
+                table['source'] = 'text_layer'
+                tables.append(table)
+        if tables:
+            results[page_no] = tables
+    return results
+
+
+def extract_tables_from_pdf_pages(pdf_data, model_name, api_key, quality="높음", pages_per_chunk=1,
+                                  max_workers=4, prompt=None, cache=None, notify=_log_notify,
+                                  thread_initializer=None, local_first=False, on_progress=None,
+                                  cancel_event=None, output_format=None):
+    """
+    PDF를 페이지 단위로 나누어 Gemini API에 동시에 전송하고 결과를 페이지 순서대로 합침
+
+    Args:
+        pdf_data: 원본 PDF 바이트, 파일 객체 또는 파일 경로
+        model_name (str): Gemini 모델명
+        api_key (str): Google API 키
+        quality (str): 추출 품질
+        pages_per_chunk (int): 한 번의 요청에 포함할 페이지 수
+        max_workers (int): 동시에 처리할 최대 요청 수
+        prompt (str): 사용할 프롬프트 (None이면 기본 PDF 프롬프트)
+        cache (ResultCache): 결과 캐시
+        notify (callable): (level, message)를 받는 알림 함수
+        thread_initializer (callable): 작업 스레드 시작 시 호출할 함수 (UI 컨텍스트 전달 등)
+        local_first (bool): 텍스트 레이어로 확실하게 추출되는 페이지는 API를 호출하지 않음
+        on_progress (callable): (완료한 요청 수, 전체 요청 수)를 받는 진행 상황 콜백
+        cancel_event (threading.Event): 설정되면 남은 요청을 취소하고 ExtractionCancelled 발생
+        output_format (str): 응답 형식 ('csv', 'json', None이면 자동)
+
+    Returns:
+        tuple: (표 정보 dict 목록, 실패한 (시작, 끝) 페이지 범위 목록)
+    """
+    # 페이지 묶음은 요청할 차례가 되었을 때 만듦 (동시 요청 수의 PDF_CHUNK_PREFETCH배까지만 메모리에 둠)
+    ranges = get_chunk_ranges(get_pdf_page_count(pdf_data), pages_per_chunk)
+
+    results = [[] for _ in ranges]
+    failed_pages = []
+    remote_chunks = list(range(len(ranges)))
+    if local_first:
+        # 묶음의 모든 페이지를 로컬에서 처리할 수 있으면 해당 묶음은 API 호출 생략
+        local = extract_tables_from_text_layer(pdf_data)
+        remote_chunks = []
+        local_pages = 0
+        for chunk_idx, (start, end) in enumerate(ranges):
+            if all(page_no in local for page_no in range(start, end + 1)):
+                results[chunk_idx] = [
+                    dict(table, page=str(page_no))
+                    for page_no in range(start, end + 1) for table in local[page_no]
+                ]
+                local_pages += end - start + 1
+            else:
+                remote_chunks.append(chunk_idx)
+        if local_pages:
+            notify("info", f"텍스트 레이어에서 {local_pages}개 페이지의 표를 바로 추출했습니다. "
+                           f"나머지 {len(remote_chunks)}개 요청은 Gemini로 처리합니다.")
+
+    completed = len(ranges) - len(remote_chunks)
+    if on_progress is not None:
+        on_progress(completed, len(ranges))
+    max_workers = max(1, int(max_workers))
+    chunks = iter_pdf_chunks(pdf_data, ranges=[ranges[chunk_idx] for chunk_idx in remote_chunks])
+    tasks = (
+        (chunk_idx, functools.partial(
+            extract_tables, chunk, "pdf", model_name, api_key,
+            quality=quality, prompt=prompt, cache=cache, notify=notify, cancel_event=cancel_event,
+            output_format=output_format
+        ))
+        for chunk_idx, (_, _, chunk) in zip(remote_chunks, chunks)
+    )
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=thread_initializer) as executor:
+        try:
+            for chunk_idx, future in _iter_bounded(executor, tasks, max_workers * PDF_CHUNK_PREFETCH,
+                                                   cancel_event):
+                start, end = ranges[chunk_idx]
+                completed += 1
+                if on_progress is not None:
+                    on_progress(completed, len(ranges))
+                try:
+                    results[chunk_idx] = future.result().tables
+                except ExtractionCancelled:
+                    raise
+                except Exception as e:
+                    # 한 페이지의 실패가 다른 페이지 결과에 영향을 주지 않도록 기록만 함
+                    notify("warning", f"{format_page_range(start, end)}페이지 처리 중 오류: {e}")
+                    failed_pages.append((start, end))
+        finally:
+            # 중간에 끝나도 원본 PDF 스트림(메모리 맵)을 바로 닫음
+            chunks.close()
+
+    # 페이지 순서대로 재조립하고 출처 페이지 표시
+    tables = []
+    for (start, end), chunk_tables in zip(ranges, results):
+        for table in chunk_tables:
+            table = dict(table)
+            table['index'] = len(tables)
+            table.setdefault('page', format_page_range(start, end))
+            tables.append(table)
+
+    return tables, sorted(failed_pages)
+
+
+def _normalize_cell(value):
+    """행 비교용 셀 정규화 (공백/쉼표 제거, 빈 값 통일)"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    text = str(value)
+    if text.lower() == "nan" or re.fullmatch(r"Unnamed: \d+(\.\d+)?|Column_\d+", text):
+        return ""
+    return re.sub(r"[\s,]", "", text)
+
+
+def _rows_match(row_a, row_b, threshold=0.8):
+    """두 행의 셀이 threshold 비율 이상 일치하면 같은 행으로 간주 (경계의 인식 오차 허용)"""
+    if len(row_a) != len(row_b) or not row_a:
+        return False
+    same = sum(1 for a, b in zip(row_a, row_b) if a == b)
+    return same / len(row_a) >= threshold and any(row_a)
+
+
+def _find_row_overlap(prev_rows, next_rows, max_overlap):
+    """
+    앞 조각의 마지막 행들과 뒤 조각의 첫 행들 중 겹치는 구간 찾기
+
+    조각 경계에서 잘린 행이 한쪽에만 깨져서 나올 수 있으므로, 앞 조각의 마지막 행이나
+    뒤 조각의 첫 행 하나를 버리는 경우까지 비교하여 가장 긴 겹침을 선택합니다.
+
+    Returns:
+        tuple: (앞 표에서 유지할 행 수, 뒤 표에서 이어 붙이기 시작할 행 위치), 겹침이 없으면 None
+    """
+    best = None
+    for drop_prev in (0, 1):
+        for drop_next in (0, 1):
+            kept_prev = prev_rows[:len(prev_rows) - drop_prev]
+            candidates = next_rows[drop_next:]
+            limit = min(len(kept_prev), len(candidates), max_overlap)
+            for overlap in range(limit, 0, -1):
+                if all(_rows_match(a, b) for a, b in zip(kept_prev[-overlap:], candidates[:overlap])):
+                    if best is None or overlap > best[0]:
+                        best = (overlap, len(kept_prev), drop_next + overlap)
+                    break
+    return best[1:] if best else None
+
+
+def stitch_tile_tables(tile_tables, max_overlap_rows=15):
+    """
+    조각별로 추출된 표를 위에서 아래 순서로 이어 붙이고 겹치는 행을 제거
+
+    앞 조각의 마지막 표와 뒤 조각의 첫 표의 열 수가 같으면 같은 표가 이어지는 것으로 보고 합칩니다.
+    뒤 조각에서 헤더로 해석된 행이 실제 데이터 행이면 데이터로 되돌린 뒤 비교합니다.
+
+    Args:
+        tile_tables (list): 조각 순서대로 정렬된 표 정보 dict 목록의 목록
+        max_overlap_rows (int): 겹침으로 간주할 최대 행 수
+
+    Returns:
+        list: 합쳐진 표 정보 dict 목록
+    """
+    stitched = []
+    for tables in tile_tables:
+        for position, table in enumerate(tables):
+            table = dict(table)
+            prev = stitched[-1] if stitched else None
+            can_merge = (
+                position == 0 and prev is not None
+                and not prev.get('error') and not table.get('error')
+                and len(prev['df'].columns) == len(table['df'].columns)
+            )
+            if not can_merge:
+                stitched.append(table)
+                continue
+
+            prev_df, next_df = prev['df'], table['df']
+            prev_values = prev_df.values.tolist()
+            next_values = next_df.values.tolist()
+            # 헤더가 앞 표와 같으면 반복된 헤더이므로 버리고, 다르면 데이터 행으로 되돌림
+            header = [_normalize_cell(col) for col in next_df.columns]
+            if header != [_normalize_cell(col) for col in prev_df.columns]:
+                next_values = [[
+                    "" if re.fullmatch(r"Unnamed: \d+(\.\d+)?|Column_\d+", str(col)) else col
+                    for col in next_df.columns
+                ]] + next_values
+
+            overlap = _find_row_overlap(
+                [[_normalize_cell(v) for v in row] for row in prev_values],
+                [[_normalize_cell(v) for v in row] for row in next_values],
+                max_overlap_rows
+            )
+            if overlap is None:
+                # 겹치는 행을 찾지 못하면 같은 표인지 확신할 수 없으므로 별도 표로 유지
+                stitched.append(table)
+                continue
+
+            prev_keep, next_start = overlap
+            merged_df = pd.DataFrame(prev_values[:prev_keep] + next_values[next_start:], columns=prev_df.columns)
+            prev.update({'df': merged_df, 'original_df': merged_df, 'stitched': True})
+
+    for idx, table in enumerate(stitched):
+        table['index'] = idx
+    return stitched
+
+
+def extract_tables_from_image_tiles(image_data, model_name, api_key, quality="높음", max_workers=4,
+                                    prompt=None, cache=None, notify=_log_notify, thread_initializer=None,
+                                    on_progress=None, cancel_event=None, output_format=None):
+    """
+    세로로 긴 이미지를 겹치는 조각으로 나누어 동시에 추출하고 결과를 이어 붙임
+
+    분할이 필요 없는 크기면 단일 요청으로 처리합니다.
+
+    Args:
+        image_data (bytes): 원본 이미지 바이트
+        model_name (str): Gemini 모델명
+        api_key (str): Google API 키
+        quality (str): 추출 품질
+        max_workers (int): 동시에 처리할 최대 요청 수
+        prompt (str): 사용할 프롬프트 (None이면 기본 이미지 프롬프트)
+        cache (ResultCache): 결과 캐시
+        notify (callable): (level, message)를 받는 알림 함수
+        thread_initializer (callable): 작업 스레드 시작 시 호출할 함수
+        on_progress (callable): (완료한 조각 수, 전체 조각 수)를 받는 진행 상황 콜백
+        cancel_event (threading.Event): 설정되면 남은 조각을 취소하고 ExtractionCancelled 발생
+        output_format (str): 응답 형식 ('csv', 'json', None이면 자동)
+
+    Returns:
+        tuple: (표 정보 dict 목록, 실패한 조각 번호 목록 (1부터 시작))
+    """
+    image = open_rgb_image(image_data)
+    budget = get_image_budget(quality)
+    layout = get_tile_layout(image.size, quality)
+    if layout is None:
+        file_bytes, file_type = prepare_image(image, budget, notify)
+        result = extract_tables(file_bytes, file_type, model_name, api_key,
+                                quality=quality, prompt=prompt, cache=cache, notify=notify,
+                                cancel_event=cancel_event, output_format=output_format)
+        if on_progress is not None:
+            on_progress(1, 1)
+        return result.tables, []
+
+    tiles = split_image_tiles(image, *layout)
+    notify("info", f"긴 이미지를 {len(tiles)}개 조각으로 나누어 추출합니다 ({image.width}x{image.height}).")
+    output_format = get_output_format(output_format)
+    tile_prompt = (prompt or get_default_prompt("png", output_format)) + TILE_PROMPT_SUFFIX
+
+    def extract_tile(tile_image):
+        # 조각마다 인코딩까지 작업 스레드에서 수행하여 업로드와 겹치게 함
+        file_bytes, file_type = prepare_image(tile_image, budget, notify=lambda *_: None)
+        return extract_tables(file_bytes, file_type, model_name, api_key,
+                              quality=quality, prompt=tile_prompt, cache=cache, notify=notify,
+                              cancel_event=cancel_event, output_format=output_format).tables
+
+    results = [[] for _ in tiles]
+    failed_tiles = []
+    completed = 0
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), initializer=thread_initializer) as executor:
+        futures = {executor.submit(extract_tile, tile): idx for idx, (_, _, tile) in enumerate(tiles)}
+        for future in _iter_completed(futures, cancel_event):
+            idx = futures[future]
+            completed += 1
+            if on_progress is not None:
+                on_progress(completed, len(tiles))
+            try:
+                results[idx] = future.result()
+            except ExtractionCancelled:
+                raise
+            except Exception as e:
+                # 한 조각의 실패가 나머지 조각 결과에 영향을 주지 않도록 기록만 함
+                notify("warning", f"{idx + 1}번째 조각 처리 중 오류: {e}")
+                failed_tiles.append(idx + 1)
+
+    return stitch_tile_tables(results), sorted(failed_tiles)
+
+
+@timed("extract_total")
+def extract_document(data, file_type, model_name, api_key, quality="높음", prompt=None, cache=None,
+                     all_pages=False, pages_per_chunk=1, max_workers=4, text_layer=True, tile_images=True,
+                     notify=_log_notify, thread_initializer=None, on_progress=None, cancel_event=None,
+                     output_format=None, stream=False, on_table=None):
+    """
+    업로드된 파일 하나에서 표 추출 (추출 방식 선택부터 결과까지)
+
+    PDF는 첫 페이지 또는 전체 페이지를, 이미지는 필요하면 조각으로 나누어 추출하며,
+    텍스트 레이어로 확실하게 추출되는 첫 페이지는 API를 호출하지 않습니다.
+
+    Args:
+        data: 원본 파일 바이트 (PDF는 파일 객체나 파일 경로도 가능)
+        file_type (str): 'pdf' 또는 이미지 확장자
+        model_name (str): Gemini 모델명
+        api_key (str): Google API 키
+        quality (str): 추출 품질
+        prompt (str): 사용할 프롬프트 (None이면 기본 프롬프트)
+        cache (ResultCache): 결과 캐시
+        all_pages (bool): PDF 전체 페이지 추출 여부 (False면 첫 페이지만)
+        pages_per_chunk (int): 전체 페이지 추출 시 한 번의 요청에 포함할 페이지 수
+        max_workers (int): 페이지/조각을 동시에 처리할 최대 요청 수
+        text_layer (bool): 텍스트 레이어 우선 추출 여부
+        tile_images (bool): 긴 이미지 분할 추출 여부
+        notify (callable): (level, message)를 받는 알림 함수
+        thread_initializer (callable): 작업 스레드 시작 시 호출할 함수
+        on_progress (callable): (완료한 요청 수, 전체 요청 수)를 받는 진행 상황 콜백
+        cancel_event (threading.Event): 설정되면 남은 요청을 취소하고 ExtractionCancelled 발생
+        output_format (str): 응답 형식 ('csv', 'json', None이면 자동)
+        stream (bool): 요청 하나로 추출하는 경우(첫 페이지, 분할하지 않는 이미지) 스트리밍 응답 사용 여부
+        on_table (callable): 스트리밍 중 표가 완성될 때마다 표 정보 dict를 받는 콜백
+
+    Returns:
+        ExtractionResult: 추출 결과 (extra['failed']에 실패한 페이지 범위 또는 조각 번호 목록)
+    """
+    started = time.perf_counter()
+    file_type = file_type.lower()
+    extract_kwargs = {'quality': quality, 'prompt': prompt, 'cache': cache, 'notify': notify,
+                      'output_format': output_format}
+    parallel_kwargs = {
+        'max_workers': max_workers,
+        'thread_initializer': thread_initializer,
+        'on_progress': on_progress,
+        'cancel_event': cancel_event,
+    }
+
+    if file_type == "pdf" and all_pages:
+        tables, failed = extract_tables_from_pdf_pages(
+            data, model_name, api_key, pages_per_chunk=pages_per_chunk, local_first=text_layer,
+            **extract_kwargs, **parallel_kwargs
+        )
+        return ExtractionResult(tables=tables, elapsed=time.perf_counter() - started, extra={'failed': failed})
+
+    if file_type != "pdf" and tile_images and needs_tiling(data, quality):
+        tables, failed = extract_tables_from_image_tiles(data, model_name, api_key,
+                                                         **extract_kwargs, **parallel_kwargs)
+        return ExtractionResult(tables=tables, elapsed=time.perf_counter() - started, extra={'failed': failed})
+
+    if on_progress is not None:
+        on_progress(0, 1)
+    if file_type == "pdf":
+        local_tables = extract_tables_from_text_layer(data, max_pages=1) if text_layer else {}
+        if 1 in local_tables:
+            # 첫 페이지를 텍스트 레이어에서 바로 추출할 수 있으면 API 호출 생략
+            if on_progress is not None:
+                on_progress(1, 1)
+            return ExtractionResult(tables=local_tables[1], elapsed=time.perf_counter() - started,
+                                    extra={'failed': [], 'text_layer': True})
+        file_bytes = extract_first_page_pdf(data)
+    else:
+        file_bytes, file_type = process_image_bytes(data, quality=quality, notify=notify)
+
+    result = extract_tables(file_bytes, file_type, model_name, api_key, cancel_event=cancel_event,
+                            stream=stream, on_table=on_table, **extract_kwargs)
+    if on_progress is not None:
+        on_progress(1, 1)
+    result.extra['failed'] = []
+    return result
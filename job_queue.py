@@ -0,0 +1,443 @@
+"""
+백그라운드 추출 작업 대기열
+
+Streamlit 스크립트 스레드 밖의 작업 풀에서 추출을 실행하고, 작업 상태와 결과를 SQLite에
+저장합니다. 화면이 다시 실행되거나 브라우저를 새로고침해도 소유자 ID로 작업을 다시 찾을 수
+있으며, 단계별 진행 상황 조회와 취소를 지원합니다.
+
+- 작업 상태: queued → running → done / failed / cancelled
+- 업로드한 파일은 작업이 끝날 때까지 작업 디렉터리에 저장하고, 끝나면 삭제합니다.
+- API 키는 디스크에 저장하지 않습니다. 서버가 다시 시작되어 중단된 작업은
+  resume_interrupted로 소유자가 키를 다시 전달하면 이어서 처리합니다.
+- 실행 중인 작업은 실행하는 대기열(worker)이 주기적으로 heartbeat를 갱신하며, 새 대기열은
+  heartbeat가 끊긴 작업만 대기 상태로 되돌리므로 같은 저장소를 쓰는 다른 프로세스의 작업은 건드리지 않습니다.
+"""
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import extractor_core as core
+from extractor_core import ExtractionCancelled, ExtractionError
+from result_cache import DEFAULT_CACHE_DIR, deserialize_tables, serialize_tables
+
+logger = logging.getLogger("table_extractor")
+
+DEFAULT_JOB_WORKERS = 2
+# 끝난 작업 기록 보존 기간
+DEFAULT_JOB_MAX_AGE = 7 * 24 * 60 * 60  # 7일
+# 작업별로 보관하는 최근 알림 메시지 수
+MAX_JOB_MESSAGES = 20
+# 실행 중인 작업의 heartbeat 갱신 간격과, 중단된 작업으로 보는 heartbeat 경과 시간(초)
+HEARTBEAT_INTERVAL = 30
+STALE_HEARTBEAT = 5 * HEARTBEAT_INTERVAL
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+# 진행 단계 표시 이름
+STAGE_LABELS = {
+    "queued": "대기 중",
+    "preparing": "파일 준비",
+    "extracting": "표 추출",
+    "saving": "결과 저장",
+    "done": "완료",
+    "failed": "실패",
+    "cancelled": "취소됨",
+}
+
+
+class JobStore:
+    """
+    SQLite 기반 작업 저장소
+
+    작업 정보(상태, 단계, 진행률, 알림 메시지, 결과 표)를 저장하며 여러 스레드에서 함께 사용할 수 있습니다.
+    """
+
+    def __init__(self, store_dir=DEFAULT_CACHE_DIR):
+        self.input_dir = os.path.join(store_dir, "job_inputs")
+        os.makedirs(self.input_dir, exist_ok=True)
+        self.path = os.path.join(store_dir, "jobs.sqlite3")
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    file_type TEXT NOT NULL,
+                    options_json TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    messages_json TEXT NOT NULL DEFAULT '[]',
+                    result_json TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    worker TEXT,
+                    heartbeat REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs(owner, created_at)")
+            # 이전 버전에서 만든 저장소에 실행 대기열/heartbeat 열 추가
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, column_type in (("worker", "TEXT"), ("heartbeat", "REAL")):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """트랜잭션 하나를 위한 연결 (블록이 끝나면 커밋 또는 롤백한 뒤 연결을 닫음)"""
+        with contextlib.closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+
+    def input_path(self, job_id):
+        return os.path.join(self.input_dir, job_id)
+
+    def create(self, owner, file_name, file_type, data, options):
+        """작업을 대기 상태로 추가하고 작업 ID 반환"""
+        job_id = uuid.uuid4().hex
+        with open(self.input_path(job_id), "wb") as f:
+            f.write(data)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, owner, file_name, file_type, options_json, status, stage, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', 'queued', ?)",
+                (job_id, owner, file_name, file_type, json.dumps(options, ensure_ascii=False), time.time())
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        """작업 필드 갱신"""
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def claim(self, job_id, worker):
+        """
+        대기 중이고 취소 요청이 없는 작업을 실행 상태로 바꿈 (조건부 UPDATE 한 번으로 처리)
+
+        Args:
+            job_id (str): 작업 ID
+            worker (str): 작업을 실행할 대기열 ID
+
+        Returns:
+            bool: 이 대기열이 작업을 가져왔으면 True (이미 취소/실행된 작업이면 False)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'preparing', started_at = ?, worker = ?, heartbeat = ? "
+                "WHERE id = ? AND status = 'queued' AND cancel_requested = 0",
+                (now, worker, now, job_id)
+            ).rowcount
+        return claimed == 1
+
+    def cancel_queued(self, job_id):
+        """
+        아직 실행되지 않은 작업을 취소 상태로 바꿈 (조건부 UPDATE 한 번으로 처리)
+
+        Returns:
+            bool: 대기 중이던 작업을 취소했으면 True (이미 실행 중이거나 끝난 작업이면 False)
+        """
+        with self._connect() as conn:
+            cancelled = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', stage = 'cancelled', cancel_requested = 1, finished_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount
+        return cancelled == 1
+
+    def touch(self, worker):
+        """대기열이 실행 중인 모든 작업의 heartbeat 갱신"""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE worker = ? AND status = 'running'",
+                         (time.time(), worker))
+
+    def requeue_stale(self, max_age=STALE_HEARTBEAT):
+        """
+        heartbeat가 max_age초 넘게 갱신되지 않은 실행 중 작업(실행하던 프로세스가 끝난 작업)을 대기 상태로 되돌림
+
+        Returns:
+            int: 되돌린 작업 수
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', done = 0, total = 0, worker = NULL "
+                "WHERE status = 'running' AND (heartbeat IS NULL OR heartbeat < ?)",
+                (time.time() - max_age,)
+            ).rowcount
+
+    def add_message(self, job_id, level, message):
+        """작업의 알림 메시지 추가 (최근 MAX_JOB_MESSAGES개만 유지)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT messages_json FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            messages = json.loads(row["messages_json"])
+            messages.append([level, message])
+            conn.execute(
+                "UPDATE jobs SET messages_json = ? WHERE id = ?",
+                (json.dumps(messages[-MAX_JOB_MESSAGES:], ensure_ascii=False), job_id)
+            )
+
+    def get(self, job_id):
+        """작업 정보 dict 반환 (결과 표는 제외, 없으면 None)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def list_jobs(self, owner=None, statuses=None):
+        """작업 목록 (최근 것부터, 결과 표는 제외)"""
+        query = "SELECT * FROM jobs"
+        conditions = []
+        params = []
+        if owner is not None:
+            conditions.append("owner = ?")
+            params.append(owner)
+        if statuses:
+            conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC"
+        with self._connect() as conn:
+            return [self._to_dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def get_tables(self, job_id):
+        """완료된 작업의 표 목록 (결과가 없으면 None)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT result_json FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["result_json"] is None:
+            return None
+        return deserialize_tables(row["result_json"])
+
+    def read_input(self, job_id):
+        with open(self.input_path(job_id), "rb") as f:
+            return f.read()
+
+    def remove_input(self, job_id):
+        try:
+            os.remove(self.input_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, job_id):
+        """작업 기록과 입력 파일 삭제"""
+        self.remove_input(job_id)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def prune(self, max_age=DEFAULT_JOB_MAX_AGE):
+        """보존 기간이 지난 끝난 작업 삭제"""
+        cutoff = time.time() - max_age
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))}) "
+                "AND created_at < ?",
+                (*FINISHED_STATUSES, cutoff)
+            ).fetchall()
+        for row in rows:
+            self.delete(row["id"])
+        return len(rows)
+
+    @staticmethod
+    def _to_dict(row):
+        job = {key: row[key] for key in row.keys()
+               if key not in ("result_json", "options_json", "messages_json", "worker", "heartbeat")}
+        job["options"] = json.loads(row["options_json"])
+        job["messages"] = json.loads(row["messages_json"])
+        job["has_result"] = row["result_json"] is not None
+        job["cancel_requested"] = bool(row["cancel_requested"])
+        return job
+
+
+class JobQueue:
+    """
+    작업 저장소와 작업 풀을 묶은 백그라운드 추출 대기열
+
+    Args:
+        store (JobStore): 작업 저장소
+        workers (int): 동시에 실행할 작업 수
+        cache (ResultCache): 추출 결과 캐시 (None이면 사용하지 않음)
+    """
+
+    def __init__(self, store, workers=DEFAULT_JOB_WORKERS, cache=None):
+        self.store = store
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="extract-job")
+        self._lock = threading.Lock()
+        self._cancel_events = {}
+        self._api_keys = {}
+        self.worker = uuid.uuid4().hex
+
+        # 끝난 프로세스에서 실행 중이던 작업(heartbeat가 끊긴 작업)은 API 키가 없으므로
+        # 대기 상태로 되돌려 두고 재개를 기다림 (다른 프로세스가 실행 중인 작업은 그대로 둠)
+        store.requeue_stale()
+        store.prune()
+
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, name="extract-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self):
+        """실행 중인 작업의 heartbeat를 주기적으로 갱신"""
+        while not self._stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.store.touch(self.worker)
+            except sqlite3.Error:
+                logger.exception("작업 heartbeat 갱신 중 오류")
+
+    def submit(self, owner, file_name, file_type, data, api_key, options):
+        """
+        작업 추가
+
+        Args:
+            owner (str): 작업 소유자 ID (세션별)
+            file_name (str): 업로드한 파일 이름
+            file_type (str): 'pdf' 또는 이미지 확장자
+            data (bytes): 파일 바이트
+            api_key (str): Google API 키 (메모리에만 보관)
+            options (dict): core.extract_document 인자 (model_name, quality, prompt, all_pages 등)와
+                결과 캐시 사용 여부(use_cache)
+
+        Returns:
+            str: 작업 ID
+        """
+        job_id = self.store.create(owner, file_name, file_type, data, options)
+        self._schedule(job_id, api_key)
+        return job_id
+
+    def _schedule(self, job_id, api_key):
+        with self._lock:
+            self._cancel_events[job_id] = threading.Event()
+            self._api_keys[job_id] = api_key
+        self._executor.submit(self._run, job_id)
+
+    def resume_interrupted(self, owner, api_key):
+        """
+        서버가 다시 시작되어 실행되지 못한 소유자의 대기 작업을 다시 예약
+
+        Returns:
+            int: 다시 예약한 작업 수
+        """
+        resumed = 0
+        for job in self.store.list_jobs(owner=owner, statuses=["queued"]):
+            with self._lock:
+                scheduled = job["id"] in self._cancel_events
+            if not scheduled and os.path.exists(self.store.input_path(job["id"])):
+                self._schedule(job["id"], api_key)
+                resumed += 1
+        return resumed
+
+    def cancel(self, job_id):
+        """작업 취소 (대기 중이면 바로 취소, 실행 중이면 남은 요청을 취소하고 진행 중인 요청이 끝나면 중단)"""
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            return False
+        # 취소 요청을 먼저 기록하므로 이후에는 _run이 작업을 가져가지 못함
+        self.store.update(job_id, cancel_requested=1)
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        # 아직 실행되지 않았으면 여기서 끝내고, 이미 실행 중이면 _run이 취소 이벤트를 보고 끝냄
+        if self.store.cancel_queued(job_id):
+            self._finish(job_id)
+        return True
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._cancel_events.pop(job_id, None)
+            self._api_keys.pop(job_id, None)
+
+    def _finish(self, job_id, **fields):
+        if fields:
+            self.store.update(job_id, finished_at=time.time(), **fields)
+        self.store.remove_input(job_id)
+        self._forget(job_id)
+
+    def _run(self, job_id):
+        """작업 풀에서 작업 하나 실행"""
+        with self._lock:
+            cancel_event = self._cancel_events.get(job_id)
+            api_key = self._api_keys.get(job_id)
+        if cancel_event is None:
+            return
+        # 대기 중인 작업만 조건부로 가져오므로 그 사이 취소되었거나 다른 대기열이 가져간 작업은 실행하지 않음
+        if cancel_event.is_set() or not self.store.claim(job_id, self.worker):
+            self._forget(job_id)
+            return
+        job = self.store.get(job_id)
+
+        def notify(level, message):
+            self.store.add_message(job_id, level, message)
+
+        def on_progress(done, total):
+            self.store.update(job_id, stage="extracting", done=done, total=total)
+
+        try:
+            # PDF는 저장된 입력 파일을 경로로 넘겨 메모리 맵으로 필요한 페이지만 읽음
+            if job["file_type"].lower() == "pdf":
+                data = self.store.input_path(job_id)
+            else:
+                data = self.store.read_input(job_id)
+            options = dict(job["options"])
+            use_cache = options.pop("use_cache", True)
+            result = core.extract_document(
+                data, job["file_type"], options.pop("model_name"), api_key,
+                cache=self.cache if use_cache else None,
+                notify=notify,
+                on_progress=on_progress,
+                cancel_event=cancel_event,
+                **options
+            )
+            self.store.update(job_id, stage="saving")
+            failed = result.extra.get('failed') or []
+            if failed:
+                notify("warning", f"일부 페이지/조각 추출에 실패했습니다: {failed}")
+            if result.from_cache:
+                notify("info", "이전에 추출한 결과를 캐시에서 불러왔습니다.")
+            self._finish(job_id, status="done", stage="done", result_json=serialize_tables(result.tables))
+        except ExtractionCancelled:
+            self._finish(job_id, status="cancelled", stage="cancelled")
+        except ExtractionError as e:
+            self._finish(job_id, status="failed", stage="failed", error=str(e))
+        except Exception as e:
+            logger.exception("작업 %s 처리 중 예상하지 못한 오류", job_id)
+            self._finish(job_id, status="failed", stage="failed", error=f"예상하지 못한 오류: {e}")
+
+    def shutdown(self, wait=True):
+        """진행 중인 작업을 취소하고 작업 풀 종료"""
+        with self._lock:
+            events = list(self._cancel_events.values())
+        for event in events:
+            event.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._stopped.set()
+
+
+def format_job_progress(job):
+    """작업 진행 상황을 (0~1 진행률, 표시 문자열)로 변환"""
+    label = STAGE_LABELS.get(job["stage"], job["stage"])
+    if job["status"] in FINISHED_STATUSES:
+        return 1.0, label
+    if job["stage"] == "extracting" and job["total"]:
+        return job["done"] / job["total"], f"{label} ({job['done']}/{job['total']})"
+    return 0.0, label
@@ -0,0 +1,110 @@
+"""
+구조화된 JSON 응답의 표 읽기
+
+JSON 응답 모드에서는 모델이 표를 CSV 텍스트 대신 아래 형식의 JSON 하나로 돌려줍니다.
+행은 객체가 아닌 배열이므로 열 이름이 행마다 반복되지 않아 출력 토큰이 CSV와 비슷하고,
+파싱은 json.loads 한 번으로 끝나 따옴표/천 단위 쉼표 보정이 필요 없습니다.
+
+    {"tables": [{"title": "손익계산서", "unit": "백만원",
+                 "header": ["항목", "2023", "2024"],
+                 "rows": [["매출액", "1,000", "1,200"], ...]}]}
+
+라이브러리가 응답 스키마(response_schema)를 지원하면 TABLE_SCHEMA를 생성 설정에 넣어
+형식을 강제하고, 지원하지 않으면 프롬프트로만 형식을 요청합니다.
+"""
+import json
+
+from csv_tokenizer import rows_to_frame
+
+# 응답 스키마 (Gemini 스키마 형식: 타입 이름은 대문자)
+TABLE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'tables': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'title': {'type': 'STRING'},
+                    'unit': {'type': 'STRING'},
+                    'header': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+                    'rows': {'type': 'ARRAY', 'items': {'type': 'ARRAY', 'items': {'type': 'STRING'}}},
+                },
+                'required': ['header', 'rows'],
+            },
+        },
+    },
+    'required': ['tables'],
+}
+JSON_MIME_TYPE = "application/json"
+
+
+class JsonTablesError(ValueError):
+    """응답이 표 JSON 형식이 아닐 때 발생하는 예외 (잘린 응답 포함)"""
+
+
+def _strip_code_fence(text):
+    """응답 스키마 없이 받은 응답의 ```json … ``` 감싸기 제거"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text
+
+
+def _cell(value):
+    """셀 값을 문자열로 (빈 값은 "")"""
+    if value is None:
+        return ""
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return text if text.strip() else ""
+
+
+def load_json_tables(text):
+    """
+    JSON 응답 텍스트에서 표 목록 읽기
+
+    Args:
+        text (str): 모델 응답 텍스트
+
+    Returns:
+        list: {'title', 'unit', 'header', 'rows'} dict 목록
+
+    Raises:
+        JsonTablesError: JSON이 아니거나(잘린 응답 포함) 표 형식이 맞지 않는 경우
+    """
+    try:
+        payload = json.loads(_strip_code_fence(text))
+    except ValueError as e:
+        raise JsonTablesError(f"JSON 응답을 읽을 수 없습니다: {e}") from e
+    # 스키마 없이 받은 응답은 최상위가 표 배열일 수도 있음
+    tables = payload.get('tables') if isinstance(payload, dict) else payload
+    if not isinstance(tables, list):
+        raise JsonTablesError("JSON 응답에 tables 배열이 없습니다.")
+    for table in tables:
+        if not isinstance(table, dict) or not isinstance(table.get('header', []), list) \
+                or not isinstance(table.get('rows', []), list) \
+                or not all(isinstance(row, list) for row in table.get('rows', [])):
+            raise JsonTablesError("JSON 응답의 표 형식이 올바르지 않습니다.")
+    return tables
+
+
+def json_table_to_frame(table):
+    """
+    JSON 표 하나를 데이터프레임으로 변환
+
+    CSV 모드와 같은 정규화(csv_tokenizer.rows_to_frame)를 거치므로 빈 셀은 None, 빈 행과 데이터가 없는
+    열은 제거되고, 빈 헤더는 'Unnamed: i', 중복 헤더는 'name.1' 형식이 됩니다.
+    헤더보다 긴 행이 있으면 열을 늘립니다.
+
+    Args:
+        table (dict): load_json_tables 결과의 표 하나
+
+    Returns:
+        tuple: (데이터프레임, 헤더보다 길어 열을 늘린 행 수) - 남는 셀이 없으면 (None, 0)
+    """
+    header = [_cell(name) for name in table.get('header') or []]
+    rows = [[_cell(value) for value in row] for row in table.get('rows') or []]
+    widened = sum(1 for row in rows if len(row) > len(header) and any(row[len(header):]))
+    return rows_to_frame(header, rows), widened
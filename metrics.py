@@ -0,0 +1,225 @@
+"""
+추출 단계별 계측 (소요 시간, 전송 바이트, 재시도, 토큰 사용량)
+
+- stage(name) / timed(name): 단계 소요 시간을 재는 컨텍스트 관리자와 데코레이터
+  (PDF 분할, 이미지 전처리, 모델 호출, CSV 파싱, 화면 표시 등)
+- record_request(...): Gemini 요청 하나의 전송 바이트, 시도 횟수, 응답 usage_metadata 토큰 수 기록
+- 모든 이벤트는 환경 변수 TABLE_EXTRACTOR_METRICS_LOG로 지정한 파일에 JSON 한 줄씩 기록하고
+  (지정하지 않으면 'table_extractor.metrics' 로거의 DEBUG 메시지로만 남김), 프로세스 전체 집계는
+  prometheus_text()로 Prometheus 텍스트 형식, summary()로 dict 형식으로 조회합니다.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("table_extractor.metrics")
+
+METRICS_LOG_PATH = os.environ.get("TABLE_EXTRACTOR_METRICS_LOG")
+# 단계 소요 시간 히스토그램 구간(초)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class MetricsRegistry:
+    """단계별 소요 시간 히스토그램과 요청 카운터를 모으는 스레드 안전 저장소"""
+
+    def __init__(self, log_path=METRICS_LOG_PATH):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # (단계, 레이블) -> {'count', 'sum', 'max', 'buckets'}
+            self._stages = {}
+            # (이름, 레이블) -> 값
+            self._counters = {}
+
+    def emit(self, event):
+        """이벤트 하나를 JSON 한 줄로 기록"""
+        event = dict(event, ts=round(time.time(), 3))
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        logger.debug(line)
+        if self.log_path:
+            try:
+                with self._log_lock, open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logger.warning("계측 로그 기록 실패: %s", e)
+
+    def observe(self, stage_name, seconds, labels=None, **fields):
+        """단계 소요 시간 기록"""
+        key = (stage_name, _label_key(labels))
+        with self._lock:
+            entry = self._stages.get(key)
+            if entry is None:
+                entry = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(DURATION_BUCKETS)}
+                self._stages[key] = entry
+            entry['count'] += 1
+            entry['sum'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    entry['buckets'][i] += 1
+        self.emit({'event': 'stage', 'stage': stage_name, 'seconds': round(seconds, 4),
+                   **(labels or {}), **fields})
+
+    def increment(self, name, value=1, labels=None):
+        """카운터 증가"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """현재 집계 복사본 (단계, 카운터)"""
+        with self._lock:
+            stages = {key: dict(entry, buckets=list(entry['buckets'])) for key, entry in self._stages.items()}
+            return stages, dict(self._counters)
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry():
+    """프로세스 전체에서 공유하는 계측 저장소 반환"""
+    return _registry
+
+
+@contextlib.contextmanager
+def stage(name, **labels):
+    """
+    with 블록의 소요 시간을 단계 이름으로 기록 (예외가 나도 기록하며 status 레이블로 구분)
+
+    Args:
+        name (str): 단계 이름 ('pdf_split', 'image_prepare', 'model_call', 'csv_parse' 등)
+        **labels: 집계를 나눌 레이블 (모델명, 품질 등 - 값의 종류가 적은 것만 사용)
+
+    Yields:
+        dict: 이벤트에 함께 기록할 필드를 넣을 수 있는 dict
+    """
+    fields = {}
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield fields
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _registry.observe(name, time.perf_counter() - started, dict(labels, status=status), **fields)
+
+
+def timed(name, **labels):
+    """함수 호출 전체를 단계 이름으로 기록하는 데코레이터 (stage와 같음)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_request(model_name, bytes_sent, attempts, prompt_tokens=None, output_tokens=None,
+                   from_cache=False, status="ok"):
+    """
+    Gemini 요청 하나의 전송량과 사용량 기록
+
+    Args:
+        model_name (str): 모델명
+        bytes_sent (int): 전송한 프롬프트와 파일 바이트 수 (시도 횟수만큼 다시 보낸 양 포함)
+        attempts (int): 시도 횟수
+        prompt_tokens (int): 응답 usage_metadata의 입력 토큰 수 (없으면 None)
+        output_tokens (int): 응답 usage_metadata의 출력 토큰 수 (없으면 None)
+        from_cache (bool): 결과 캐시에서 가져왔는지 여부
+        status (str): 'ok' 또는 'error'
+    """
+    labels = {'model': model_name}
+    _registry.increment("requests_total", labels=dict(labels, status=status, cache="hit" if from_cache else "miss"))
+    _registry.increment("request_bytes_sent_total", bytes_sent, labels)
+    _registry.increment("request_retries_total", max(0, attempts - 1), labels)
+    if prompt_tokens:
+        _registry.increment("prompt_tokens_total", prompt_tokens, labels)
+    if output_tokens:
+        _registry.increment("output_tokens_total", output_tokens, labels)
+    _registry.emit({
+        'event': 'request', 'model': model_name, 'status': status, 'from_cache': from_cache,
+        'bytes_sent': bytes_sent, 'attempts': attempts,
+        'prompt_tokens': prompt_tokens, 'output_tokens': output_tokens,
+    })
+
+
+def get_usage_counts(response):
+    """응답 usage_metadata의 (입력 토큰 수, 출력 토큰 수) - 라이브러리 버전에 따라 없으면 None"""
+    usage = getattr(response, "usage_metadata", None)
+    return (getattr(usage, "prompt_token_count", None) or None,
+            getattr(usage, "candidates_token_count", None) or None)
+
+
+def prometheus_text(prefix="table_extractor"):
+    """현재 집계를 Prometheus 텍스트 노출 형식으로 반환"""
+    stages, counters = _registry.snapshot()
+    lines = []
+
+    metric = f"{prefix}_stage_duration_seconds"
+    lines.append(f"# HELP {metric} 추출 단계별 소요 시간")
+    lines.append(f"# TYPE {metric} histogram")
+    for (stage_name, label_key), entry in sorted(stages.items()):
+        base = (("stage", stage_name),) + label_key
+        for bound, count in zip(DURATION_BUCKETS, entry['buckets']):
+            lines.append(f"{metric}_bucket{_format_labels(base, [('le', bound)])} {count}")
+        lines.append(f"{metric}_bucket{_format_labels(base, [('le', '+Inf')])} {entry['count']}")
+        lines.append(f"{metric}_sum{_format_labels(base)} {entry['sum']:.6f}")
+        lines.append(f"{metric}_count{_format_labels(base)} {entry['count']}")
+
+    names = sorted({name for name, _ in counters})
+    for name in names:
+        metric = f"{prefix}_{name}"
+        lines.append(f"# TYPE {metric} counter")
+        for (counter_name, label_key), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{metric}{_format_labels(label_key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    """
+    단계별 집계 요약 (사이드바 표시용)
+
+    Returns:
+        dict: {'stages': {단계: {'count', 'total', 'mean', 'max'}}, 'counters': {이름: 합계}}
+              - 레이블은 합쳐서 단계/카운터 이름별로 집계
+    """
+    stages, counters = _registry.snapshot()
+    stage_totals = {}
+    for (stage_name, _), entry in stages.items():
+        total = stage_totals.setdefault(stage_name, {'count': 0, 'total': 0.0, 'max': 0.0})
+        total['count'] += entry['count']
+        total['total'] += entry['sum']
+        total['max'] = max(total['max'], entry['max'])
+    for total in stage_totals.values():
+        total['mean'] = total['total'] / total['count'] if total['count'] else 0.0
+
+    counter_totals = {}
+    for (name, _), value in counters.items():
+        counter_totals[name] = counter_totals.get(name, 0) + value
+    return {'stages': stage_totals, 'counters': counter_totals}
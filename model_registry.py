@@ -0,0 +1,254 @@
+"""
+프로세스 전체에서 재사용하는 Gemini 모델 핸들 저장소
+
+- genai.configure는 API 키가 바뀔 때만 호출합니다.
+- GenerativeModel은 (API 키, 모델명, 생성 설정)마다 한 번만 만들어 재시도와 이후 요청에서 재사용합니다.
+- 라이브러리가 컨텍스트 캐싱(genai.caching)을 지원하고 프롬프트가 캐시 최소 크기를 넘으면
+  고정 프롬프트를 서버에 캐시하여 요청마다 다시 보내지 않습니다. 지원하지 않는 버전에서는
+  프롬프트를 요청에 포함하는 기존 방식으로 동작합니다.
+- 라이브러리가 File API(genai.upload_file)를 지원하면 인라인 한도를 넘는 큰 파일을 업로드하여
+  요청에는 파일 참조만 넣을 수 있습니다.
+- 라이브러리가 응답 스키마(response_schema)를 지원하면 JSON 응답 모드에서 출력 형식을 강제할 수 있습니다.
+- google.generativeai는 불러오는 데 1초 가까이 걸리므로 처음 사용할 때 불러옵니다(load_genai).
+"""
+import datetime
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+import time
+
+# 컨텍스트 캐시를 만들 수 있는 최소 입력 토큰 수 (이보다 짧은 프롬프트는 서버가 거부)
+CONTEXT_CACHE_MIN_TOKENS = 32768
+CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+# File API 업로드 후 파일 처리가 끝나기를 기다리는 최대 시간(초)과 확인 간격
+FILE_ACTIVE_TIMEOUT = 120
+FILE_POLL_INTERVAL = 1
+# 만료 직전의 캐시는 요청 도중 사라질 수 있으므로 미리 새로 만듦
+CONTEXT_CACHE_REFRESH_MARGIN = 60
+# 프롬프트 토큰 수 추정 (글자 2개당 약 1토큰)
+CHARS_PER_TOKEN = 2
+
+# google.generativeai 모듈 (처음 사용할 때 load_genai가 불러옴, 시험할 때는 가짜 모듈로 교체 가능)
+genai = None
+_genai_lock = threading.Lock()
+
+
+def load_genai():
+    """google.generativeai 모듈 반환 (아직 불러오지 않았으면 불러옴)"""
+    global genai
+    if genai is None:
+        with _genai_lock:
+            if genai is None:
+                import google.generativeai
+                genai = google.generativeai
+    return genai
+
+
+def supports_context_caching():
+    """설치된 google-generativeai가 컨텍스트 캐싱을 지원하는지 확인"""
+    genai = load_genai()
+    return (getattr(genai, "caching", None) is not None
+            and hasattr(genai.GenerativeModel, "from_cached_content"))
+
+
+def supports_structured_output():
+    """설치된 google-generativeai가 JSON 응답 스키마(response_mime_type, response_schema)를 지원하는지 확인"""
+    try:
+        parameters = inspect.signature(load_genai().GenerationConfig).parameters
+    except (TypeError, ValueError):
+        return False
+    return 'response_mime_type' in parameters and 'response_schema' in parameters
+
+
+def supports_file_upload():
+    """설치된 google-generativeai가 File API 업로드를 지원하는지 확인"""
+    return getattr(load_genai(), "upload_file", None) is not None
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ModelRegistry:
+    """
+    설정된 GenerativeModel 핸들과 컨텍스트 캐시를 보관하는 스레드 안전 저장소
+
+    genai.configure는 전역 설정이므로 API 키가 바뀌면 다시 설정하며, 이미 만들어진
+    모델은 처음 요청할 때 만든 클라이언트를 계속 사용합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configured_key = None
+        self._models = {}
+        self._context_caches = {}
+        # 컨텍스트 캐시 생성에 실패한 (모델, 프롬프트)는 다시 시도하지 않음
+        self._context_cache_failures = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.configures = 0
+        self.context_cache_hits = 0
+        self.uploads = 0
+
+    def configure(self, api_key):
+        """API 키가 마지막으로 설정한 키와 다를 때만 genai.configure 호출"""
+        with self._lock:
+            self._configure_locked(api_key)
+
+    def _configure_locked(self, api_key):
+        if api_key != self._configured_key:
+            load_genai().configure(api_key=api_key)
+            self._configured_key = api_key
+            self.configures += 1
+
+    def get_model(self, api_key, model_name, generation_config, prompt=None):
+        """
+        설정에 맞는 모델 핸들 반환 (없으면 만들어 보관)
+
+        Args:
+            api_key (str): Google API 키
+            model_name (str): Gemini 모델명
+            generation_config (dict): GenerationConfig 인자 (temperature, top_p, max_output_tokens 등)
+            prompt (str): 고정 프롬프트 (지정하면 가능한 경우 컨텍스트 캐시에 올림)
+
+        Returns:
+            tuple: (모델 핸들, 프롬프트가 컨텍스트 캐시에 포함되어 요청에서 생략해도 되는지 여부)
+        """
+        # 응답 스키마(dict)처럼 해시할 수 없는 값도 있으므로 JSON 문자열을 키로 사용
+        config_key = json.dumps(generation_config, sort_keys=True, ensure_ascii=False)
+        with self._lock:
+            self._configure_locked(api_key)
+
+            if prompt is not None:
+                cached_model = self._get_cached_prompt_model(api_key, model_name, generation_config,
+                                                             config_key, prompt)
+                if cached_model is not None:
+                    self.context_cache_hits += 1
+                    return cached_model, True
+
+            key = (_digest(api_key), model_name, config_key)
+            model = self._models.get(key)
+            if model is None:
+                self.misses += 1
+                genai = load_genai()
+                model = genai.GenerativeModel(
+                    model_name,
+                    generation_config=genai.GenerationConfig(**generation_config)
+                )
+                self._models[key] = model
+            else:
+                self.hits += 1
+            return model, False
+
+    def _get_cached_prompt_model(self, api_key, model_name, generation_config, config_key, prompt):
+        """컨텍스트 캐시를 사용하는 모델 핸들 반환 (사용할 수 없으면 None)"""
+        if not supports_context_caching() or len(prompt) // CHARS_PER_TOKEN < CONTEXT_CACHE_MIN_TOKENS:
+            return None
+
+        genai = load_genai()
+        cache_key = (_digest(api_key), model_name, _digest(prompt))
+        if cache_key in self._context_cache_failures:
+            return None
+
+        entry = self._context_caches.get(cache_key)
+        if entry is None or entry['expires_at'] - time.time() < CONTEXT_CACHE_REFRESH_MARGIN:
+            try:
+                cached_content = genai.caching.CachedContent.create(
+                    model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+                    contents=[prompt],
+                    ttl=CONTEXT_CACHE_TTL,
+                )
+            except Exception:
+                # 캐싱을 지원하지 않는 모델이거나 요청이 거부된 경우 일반 요청으로 처리
+                self._context_cache_failures.add(cache_key)
+                return None
+            entry = {
+                'content': cached_content,
+                'expires_at': time.time() + CONTEXT_CACHE_TTL.total_seconds(),
+                'models': {},
+            }
+            self._context_caches[cache_key] = entry
+
+        model = entry['models'].get(config_key)
+        if model is None:
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content=entry['content'],
+                generation_config=genai.GenerationConfig(**generation_config),
+            )
+            entry['models'][config_key] = model
+        return model
+
+    def upload_file(self, api_key, data, mime_type):
+        """
+        큰 요청 파일을 File API로 업로드하고 요청에 넣을 파일 핸들 반환
+
+        업로드한 파일은 delete_file로 지우며, 지우지 못해도 서버에서 보존 기간이 지나면 삭제됩니다.
+
+        Args:
+            api_key (str): Google API 키
+            data (bytes): 파일 바이트
+            mime_type (str): 파일 MIME 타입
+
+        Returns:
+            파일 핸들 (generate_content의 contents에 그대로 사용)
+        """
+        self.configure(api_key)
+        # 라이브러리 버전에 관계없이 경로로 업로드할 수 있도록 임시 파일에 기록
+        fd, path = tempfile.mkstemp(prefix="gemini_upload_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            uploaded = load_genai().upload_file(path=path, mime_type=mime_type)
+        finally:
+            os.remove(path)
+
+        deadline = time.monotonic() + FILE_ACTIVE_TIMEOUT
+        while getattr(getattr(uploaded, "state", None), "name", "ACTIVE") == "PROCESSING":
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"업로드한 파일 처리가 {FILE_ACTIVE_TIMEOUT}초 안에 끝나지 않았습니다.")
+            time.sleep(FILE_POLL_INTERVAL)
+            uploaded = load_genai().get_file(uploaded.name)
+        with self._lock:
+            self.uploads += 1
+        return uploaded
+
+    def delete_file(self, uploaded):
+        """upload_file로 올린 파일 삭제 (실패해도 무시)"""
+        try:
+            load_genai().delete_file(uploaded.name)
+        except Exception:
+            pass
+
+    def clear(self):
+        """보관한 모델 핸들과 설정 상태 초기화 (서버의 컨텍스트 캐시는 TTL이 지나면 삭제됨)"""
+        with self._lock:
+            self._configured_key = None
+            self._models.clear()
+            self._context_caches.clear()
+            self._context_cache_failures.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'models': len(self._models),
+                'hits': self.hits,
+                'misses': self.misses,
+                'configures': self.configures,
+                'context_caches': len(self._context_caches),
+                'context_cache_hits': self.context_cache_hits,
+                'context_caching_supported': supports_context_caching(),
+                'uploads': self.uploads,
+                'file_upload_supported': supports_file_upload(),
+            }
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry():
+    """프로세스 전체에서 공유하는 모델 저장소 반환"""
+    return _registry
@@ -0,0 +1,48 @@
+"""
+PDF 입력을 복사 없이 여는 도우미
+
+업로드 바이트, 파일 객체(Streamlit 업로드 파일 등), 파일 경로를 모두 받아 PyPDF2가 읽을 수 있는
+스트림으로 엽니다. 바이트는 BytesIO가 버퍼를 공유하므로 복사하지 않고, 경로는 메모리 맵으로 열어
+큰 스캔 PDF도 실제로 읽는 부분만 메모리에 올립니다.
+
+PyPDF2의 페이지 객체는 필요할 때 스트림에서 읽으므로, 열린 스트림을 사용하는 작업은
+모두 with 블록 안에서 끝내야 합니다.
+"""
+import contextlib
+import io
+import mmap
+import os
+
+
+@contextlib.contextmanager
+def open_pdf_stream(source):
+    """
+    PDF 입력을 읽기용 스트림으로 열기
+
+    Args:
+        source: PDF 바이트(bytes), 읽기 가능한 바이너리 파일 객체, 또는 파일 경로(str/PathLike)
+
+    Yields:
+        PyPDF2.PdfReader에 넘길 수 있는 스트림 (파일 객체는 처음 위치로 되돌려 그대로 사용)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # 빈 파일은 메모리 맵을 만들 수 없음 (PyPDF2가 빈 파일 오류를 냄)
+                yield f
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+    else:
+        source.seek(0)
+        yield source
+
+
+def read_pdf_bytes(source):
+    """PDF 입력 전체를 바이트로 반환 (바이트는 그대로, 그 외에는 한 번 읽음)"""
+    if isinstance(source, bytes):
+        return source
+    with open_pdf_stream(source) as stream:
+        return bytes(stream.read())
@@ -0,0 +1,254 @@
+"""
+텍스트 레이어가 있는(디지털로 생성된) PDF에서 API 호출 없이 표를 추출
+
+PyPDF2의 텍스트 추출 visitor 콜백으로 각 텍스트 조각의 위치를 모으고,
+y 좌표로 행을, x 구간으로 열을 묶어 표를 재구성합니다. 배치가 깔끔하지 않아
+확신할 수 없는 페이지는 결과를 내지 않으므로 호출하는 쪽에서 Gemini로 처리합니다.
+"""
+import csv
+import io
+from dataclasses import dataclass
+
+from pdf_source import open_pdf_stream
+
+# 글자 폭 추정치 (글꼴 크기 대비 평균 글자 폭, 한글 등 전각 문자는 1.0)
+AVG_CHAR_WIDTH = 0.5
+WIDE_CHAR_WIDTH = 1.0
+
+# 표로 인정할 최소 크기와 신뢰도 기준
+MIN_TABLE_ROWS = 3
+MIN_TABLE_COLUMNS = 2
+DEFAULT_MIN_CONFIDENCE = 0.85
+
+
+@dataclass
+class TextRun:
+    """위치가 있는 텍스트 조각 (x, y는 PDF 좌표계: 아래쪽이 y=0)"""
+    x: float
+    y: float
+    text: str
+    size: float
+
+    @property
+    def width(self):
+        """글꼴 크기로 추정한 텍스트 폭"""
+        return sum(WIDE_CHAR_WIDTH if ord(ch) > 0x2E7F else AVG_CHAR_WIDTH for ch in self.text) * self.size
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+
+def collect_text_runs(page):
+    """
+    페이지의 텍스트 조각과 위치 수집
+
+    Args:
+        page: PyPDF2 페이지 객체
+
+    Returns:
+        list: TextRun 목록
+    """
+    runs = []
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        text = text.replace("\n", " ").strip()
+        if not text:
+            return
+        # 텍스트 행렬(tm)을 현재 변환 행렬(cm)로 변환하여 페이지 좌표 계산
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        scale = abs(tm[3] * cm[3]) or 1.0
+        runs.append(TextRun(x, y, text, (font_size or 10.0) * scale))
+
+    page.extract_text(visitor_text=visitor)
+    return runs
+
+
+def group_rows(runs):
+    """
+    y 좌표가 가까운 텍스트 조각을 같은 행으로 묶고, 각 행에서 붙어 있는 조각은 한 셀로 합침
+
+    Returns:
+        list: 위에서 아래 순서의 행 목록 (각 행은 x 순서의 TextRun 목록)
+    """
+    if not runs:
+        return []
+    rows = []
+    for run in sorted(runs, key=lambda r: (-r.y, r.x)):
+        if rows and abs(rows[-1][0].y - run.y) <= max(rows[-1][0].size, run.size) * 0.5:
+            rows[-1].append(run)
+        else:
+            rows.append([run])
+
+    merged_rows = []
+    for row in rows:
+        cells = []
+        for run in sorted(row, key=lambda r: r.x):
+            # 앞 셀의 끝과 거의 붙어 있으면 같은 셀 (한 단어가 여러 조각으로 그려진 경우)
+            if cells and run.x - cells[-1].right < run.size * 0.3:
+                prev = cells[-1]
+                joiner = "" if run.x - prev.right < run.size * 0.1 else " "
+                cells[-1] = TextRun(prev.x, prev.y, prev.text + joiner + run.text, prev.size)
+            else:
+                cells.append(run)
+        merged_rows.append(cells)
+    return merged_rows
+
+
+def detect_column_bands(rows):
+    """
+    여러 행에 걸친 셀의 x 구간을 겹치는 것끼리 합쳐 열 구간 계산
+
+    왼쪽/오른쪽 정렬이 섞여 있어도 같은 열의 셀은 구간이 겹치므로 정렬 방식에 영향을 받지 않습니다.
+
+    Returns:
+        list: (시작 x, 끝 x) 열 구간 목록
+    """
+    intervals = sorted((cell.x, cell.right) for row in rows for cell in row)
+    bands = []
+    for start, end in intervals:
+        if bands and start <= bands[-1][1]:
+            bands[-1][1] = max(bands[-1][1], end)
+        else:
+            bands.append([start, end])
+    return [tuple(band) for band in bands]
+
+
+def split_table_blocks(rows):
+    """
+    여러 셀이 있는 행이 연속된 구간을 표 후보로 분리 (한 셀짜리 제목/본문 행은 경계로 사용)
+
+    Returns:
+        list: 행 목록의 목록
+    """
+    blocks = []
+    current = []
+    for row in rows:
+        if len(row) >= MIN_TABLE_COLUMNS:
+            current.append(row)
+        else:
+            if len(current) >= MIN_TABLE_ROWS:
+                blocks.append(current)
+            current = []
+    if len(current) >= MIN_TABLE_ROWS:
+        blocks.append(current)
+    return blocks
+
+
+def build_table(rows):
+    """
+    행 목록을 열 구간에 맞춰 2차원 표로 배치하고 신뢰도 계산
+
+    신뢰도는 한 행의 두 셀이 같은 열에 들어가는 충돌이 없는 행의 비율과
+    셀 채움 비율로 계산합니다.
+
+    Returns:
+        tuple: (문자열 2차원 목록, 신뢰도 0.0~1.0)
+    """
+    bands = detect_column_bands(rows)
+    if len(bands) < MIN_TABLE_COLUMNS:
+        return None, 0.0
+
+    grid = []
+    clean_rows = 0
+    filled = 0
+    for row in rows:
+        cells = [""] * len(bands)
+        collision = False
+        for run in row:
+            col_idx = next(i for i, (start, end) in enumerate(bands) if start <= run.x <= end)
+            if cells[col_idx]:
+                collision = True
+                cells[col_idx] += " " + run.text
+            else:
+                cells[col_idx] = run.text
+        clean_rows += 0 if collision else 1
+        filled += sum(1 for cell in cells if cell)
+        grid.append(cells)
+
+    fill_ratio = filled / (len(rows) * len(bands))
+    confidence = (clean_rows / len(rows)) * min(1.0, fill_ratio / 0.6)
+    return grid, confidence
+
+
+def grid_to_csv(grid):
+    """2차원 표를 모델 응답과 같은 QUOTE_ALL CSV 텍스트로 변환"""
+    output = io.StringIO()
+    csv.writer(output, quoting=csv.QUOTE_ALL, lineterminator="\n").writerows(grid)
+    return output.getvalue()
+
+
+def extract_page_tables(page, min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    페이지 하나에서 표 추출
+
+    Args:
+        page: PyPDF2 페이지 객체
+        min_confidence (float): 표로 인정할 최소 신뢰도
+
+    Returns:
+        list: 표 CSV 텍스트 목록, 확신할 수 없는 페이지(텍스트/표 없음, 이미지 포함, 배치 불명확)는 None
+    """
+    # 이미지가 포함된 페이지는 이미지 속 표를 놓칠 수 있으므로 모델에 맡김
+    if has_images(page):
+        return None
+
+    rows = group_rows(collect_text_runs(page))
+    tables = []
+    for block in split_table_blocks(rows):
+        grid, confidence = build_table(block)
+        if grid is None or confidence < min_confidence:
+            return None
+        tables.append(grid_to_csv(grid))
+
+    # 텍스트가 없거나(스캔 문서) 표를 찾지 못한 페이지도 모델에 맡김
+    return tables or None
+
+
+def has_images(page):
+    """페이지 리소스에 이미지 XObject가 있는지 확인"""
+    try:
+        xobjects = page["/Resources"].get_object().get("/XObject")
+        if xobjects is None:
+            return False
+        return any(
+            xobject.get_object().get("/Subtype") == "/Image"
+            for xobject in xobjects.get_object().values()
+        )
+    except (KeyError, AttributeError):
+        return False
+
+
+def extract_text_layer_tables(pdf_data, max_pages=None, min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    PDF의 각 페이지에서 텍스트 레이어로 표 추출을 시도
+
+    Args:
+        pdf_data: PDF 바이트, 파일 객체 또는 파일 경로 (pdf_source.open_pdf_stream 참고)
+        max_pages (int): 앞에서부터 처리할 최대 페이지 수 (None이면 전체)
+        min_confidence (float): 표로 인정할 최소 신뢰도
+
+    Returns:
+        dict: {페이지 번호(1부터): 표 CSV 텍스트 목록} - 확신할 수 있는 페이지만 포함
+    """
+    import PyPDF2
+
+    results = {}
+    with open_pdf_stream(pdf_data) as stream:
+        try:
+            reader = PyPDF2.PdfReader(stream)
+            page_count = len(reader.pages)
+        except Exception:
+            return {}
+        if max_pages:
+            page_count = min(page_count, max_pages)
+
+        for page_idx in range(page_count):
+            try:
+                tables = extract_page_tables(reader.pages[page_idx], min_confidence)
+            except Exception:
+                tables = None
+            if tables is not None:
+                results[page_idx + 1] = tables
+    return results
@@ -0,0 +1,254 @@
+"""
+전처리한 이미지/페이지의 지각 해시(perceptual hash) 색인
+
+바이트가 같은 파일만 찾는 결과 캐시와 달리, 다시 인코딩하거나 크기만 바뀐 같은 문서도
+찾을 수 있도록 요청 바이트에서 지각 해시를 계산해 저장합니다.
+
+- 이미지: 256비트 차이 해시(dHash, 16x16)를 해밍 거리로 비교
+- PDF 페이지: 스캔본처럼 첫 페이지에 이미지가 들어 있으면 가장 큰 이미지의 dHash,
+  텍스트 레이어만 있으면 묶음의 모든 페이지에서 공백을 정리한 텍스트의 SHA-256 (같을 때만 일치)
+
+dHash는 표의 선과 배치만 반영하므로 같은 양식에 숫자만 다른 재무제표도 유사도가 1.0에 가깝게
+나옵니다. 따라서 이미지 지문은 flag_similarity 이상일 때 비슷한 파일로 알리기만 하고 항상 새로
+추출하며, 저장된 결과는 내용으로 확인할 수 있는 텍스트 레이어 지문이 정확히 같을 때만 재사용합니다.
+"""
+import contextlib
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# dHash 한 변의 크기 (비트 수 = HASH_SIZE ** 2)
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# 비슷한 파일로 알릴 기본 유사도 기준 (환경 변수로 변경 가능)
+DEFAULT_FLAG_SIMILARITY = float(os.environ.get("TABLE_EXTRACTOR_DEDUP_FLAG_SIMILARITY", 0.85))
+# 바이트별 1인 비트 수 (해밍 거리 계산용)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """
+    이미지의 차이 해시 (가로로 이웃한 픽셀의 밝기 비교)
+
+    Args:
+        image (Image): PIL 이미지
+        hash_size (int): 해시 한 변의 크기
+
+    Returns:
+        bytes: hash_size ** 2 비트를 묶은 바이트
+    """
+    from PIL import Image
+
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.int16)
+    return np.packbits(pixels[:, 1:] > pixels[:, :-1]).tobytes()
+
+
+def _largest_image(page):
+    """PDF 페이지에 들어 있는 가장 큰 이미지 (없거나 읽을 수 없으면 None)"""
+    from PIL import Image
+
+    largest = None
+    try:
+        for image_file in page.images:
+            image = Image.open(io.BytesIO(image_file.data))
+            if largest is None or image.width * image.height > largest.width * largest.height:
+                largest = image
+    except Exception:
+        return None
+    return largest
+
+
+def _pdf_fingerprint(pdf_data):
+    """
+    PDF(페이지 묶음) 지문
+
+    첫 페이지에 이미지가 있으면 가장 큰 이미지의 dHash(비슷한 파일로 알리기만 함), 아니면 모든 페이지의
+    공백을 정리한 텍스트를 이어 붙인 SHA-256입니다. 텍스트 지문은 결과 재사용에 쓰이므로 여러 페이지
+    묶음에서 이미지만 있거나 텍스트가 없는 페이지가 있으면 내용을 확인할 수 없어 None을 돌려줍니다.
+    """
+    import PyPDF2
+
+    pages = PyPDF2.PdfReader(io.BytesIO(pdf_data)).pages
+    largest = _largest_image(pages[0])
+    if largest is not None:
+        return 'image', dhash(largest)
+
+    texts = []
+    for page_idx, page in enumerate(pages):
+        if page_idx and _largest_image(page) is not None:
+            return None
+        text = re.sub(r"\s+", " ", page.extract_text() or "").strip()
+        if not text:
+            return None
+        texts.append(text)
+    # 페이지 하나는 이전 지문과 같은 값 (페이지 구분자 \f는 공백 정리 후 텍스트에 남지 않음)
+    return 'text', hashlib.sha256("\f".join(texts).encode("utf-8")).digest()
+
+
+def compute_fingerprint(file_bytes, file_type):
+    """
+    요청 바이트의 지문 계산
+
+    Args:
+        file_bytes (bytes): 전처리된 이미지 또는 PDF(페이지) 바이트
+        file_type (str): 'pdf' 또는 이미지 확장자
+
+    Returns:
+        tuple: (종류 'image' 또는 'text', 해시 바이트), 계산할 수 없으면 None
+    """
+    from PIL import Image
+
+    try:
+        if file_type.lower() == "pdf":
+            return _pdf_fingerprint(file_bytes)
+        return 'image', dhash(Image.open(io.BytesIO(file_bytes)))
+    except Exception:
+        return None
+
+
+class NearDuplicateIndex:
+    """
+    SQLite에 저장하는 지각 해시 색인
+
+    지문은 범위(scope - 모델/프롬프트/생성 설정)별로 결과 캐시 키와 함께 저장하며,
+    조회는 메모리에 올린 해시 행렬과 한 번에 비교합니다.
+
+    Args:
+        cache_dir (str): 색인 파일을 둘 디렉터리
+        flag_similarity (float): 비슷한 이미지로 알릴 최소 유사도 (0~1)
+    """
+
+    def __init__(self, cache_dir, flag_similarity=DEFAULT_FLAG_SIMILARITY):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "fingerprints.sqlite3")
+        self.flag_similarity = flag_similarity
+        self._lock = threading.Lock()
+        # (scope, kind) -> (캐시 키 목록, 해시 행렬)
+        self._groups = None
+        self.served = 0
+        self.flagged = 0
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    cache_key TEXT PRIMARY KEY,
+                    scope TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    hash BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """트랜잭션 하나를 위한 연결 (블록이 끝나면 커밋 또는 롤백한 뒤 연결을 닫음)"""
+        with contextlib.closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+
+    def _load(self):
+        """저장된 지문을 범위/종류별 행렬로 읽음 (처음 조회할 때 한 번)"""
+        if self._groups is not None:
+            return
+        rows = {}
+        with self._connect() as conn:
+            for cache_key, scope, kind, value in conn.execute(
+                    "SELECT cache_key, scope, kind, hash FROM fingerprints ORDER BY created_at"):
+                rows.setdefault((scope, kind), []).append((cache_key, value))
+        self._groups = {
+            group: ([key for key, _ in entries],
+                    np.frombuffer(b"".join(value for _, value in entries), dtype=np.uint8).reshape(len(entries), -1))
+            for group, entries in rows.items()
+        }
+
+    def find(self, fingerprint, scope):
+        """
+        가장 비슷한 저장된 지문 찾기
+
+        Args:
+            fingerprint (tuple): compute_fingerprint 결과
+            scope (str): 비교할 범위 (모델/프롬프트/생성 설정 키)
+
+        Returns:
+            dict: {'cache_key', 'similarity', 'serve'} (flag_similarity 미만이면 None)
+                  - 'serve'는 텍스트 지문이 정확히 같을 때만 True (이미지 지문은 알리기만 함)
+        """
+        if fingerprint is None:
+            return None
+        kind, value = fingerprint
+        with self._lock:
+            self._load()
+            keys, hashes = self._groups.get((scope, kind), ([], None))
+            if not keys:
+                return None
+            query = np.frombuffer(value, dtype=np.uint8)
+            if kind == 'image':
+                distances = _POPCOUNT[hashes ^ query].sum(axis=1)
+                best = int(np.argmin(distances))
+                similarity = 1.0 - distances[best] / HASH_BITS
+            else:
+                matches = np.flatnonzero((hashes == query).all(axis=1))
+                if not len(matches):
+                    return None
+                best, similarity = int(matches[-1]), 1.0
+            if similarity < self.flag_similarity:
+                return None
+            # 이미지 지문이 같아도 표의 숫자는 다를 수 있으므로 결과를 재사용하지 않음
+            serve = kind == 'text'
+            if serve:
+                self.served += 1
+            else:
+                self.flagged += 1
+            return {'cache_key': keys[best], 'similarity': float(similarity), 'serve': serve}
+
+    def add(self, fingerprint, scope, cache_key):
+        """결과 캐시 키에 대한 지문 저장"""
+        if fingerprint is None:
+            return
+        kind, value = fingerprint
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (cache_key, scope, kind, hash, created_at) VALUES (?, ?, ?, ?, ?)",
+                (cache_key, scope, kind, value, time.time())
+            )
+        with self._lock:
+            if self._groups is None:
+                return
+            keys, hashes = self._groups.get((scope, kind), ([], None))
+            if cache_key in keys:
+                # 같은 키를 다시 저장한 경우는 다음 조회 때 새로 읽음
+                self._groups = None
+                return
+            row = np.frombuffer(value, dtype=np.uint8)[None, :]
+            self._groups[(scope, kind)] = (keys + [cache_key], row if hashes is None else np.vstack([hashes, row]))
+
+    def remove(self, cache_key):
+        """결과가 캐시에서 사라진 지문 삭제"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM fingerprints WHERE cache_key = ?", (cache_key,))
+        with self._lock:
+            self._groups = None
+
+    def clear(self):
+        """색인 전체 삭제"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM fingerprints")
+        with self._lock:
+            self._groups = None
+
+    def stats(self):
+        """색인 상태 (지문 수, 재사용/알림 횟수) 반환"""
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        with self._lock:
+            return {'entries': entries, 'served': self.served, 'flagged': self.flagged}
@@ -0,0 +1,252 @@
+"""
+Gemini API 호출용 클라이언트 측 속도 제한과 재시도 정책
+
+- TokenBucketLimiter: 분당 요청 수(RPM)와 분당 토큰 수(TPM)를 함께 지키는 토큰 버킷.
+  프로세스 안의 모든 스레드가 모델별로 하나의 제한기를 공유합니다.
+- RetryPolicy: 지터가 있는 지수 백오프. 서버가 알려준 재시도 시간을 우선합니다.
+- is_retryable_error / get_retry_after: 재시도 가능한 오류와 즉시 실패해야 하는 오류 구분.
+"""
+import functools
+import os
+import random
+import re
+import threading
+import time
+
+# 모델별 기본 한도 (RPM, TPM) - 환경 변수 GEMINI_RPM / GEMINI_TPM으로 덮어쓸 수 있음
+DEFAULT_RATE_LIMITS = {
+    "gemini-1.5-pro": (360, 4_000_000),
+    "gemini-1.5-flash": (1000, 4_000_000),
+}
+FALLBACK_RATE_LIMIT = (60, 1_000_000)
+
+# 서버 오류 메시지에 포함된 재시도 안내 ("retry in 12.5s", "retryDelay": "30s")
+RETRY_HINT_PATTERN = re.compile(r'(?:retry in|retry after|retryDelay"?:\s*"?)\s*([\d.]+)\s*s', re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=None)
+def get_retryable_errors():
+    """
+    재시도하면 성공할 수 있는 오류 (요청 한도 초과, 일시적인 서버 오류, 네트워크 오류)
+
+    google.api_core는 처음 오류를 검사할 때 불러옵니다.
+    """
+    from google.api_core import exceptions as api_exceptions
+
+    return (
+        api_exceptions.TooManyRequests,       # 429 (ResourceExhausted 포함)
+        api_exceptions.ServiceUnavailable,    # 503
+        api_exceptions.InternalServerError,   # 500
+        api_exceptions.BadGateway,            # 502
+        api_exceptions.GatewayTimeout,        # 504 (DeadlineExceeded 포함)
+        api_exceptions.Aborted,
+        api_exceptions.Unknown,
+        ConnectionError,
+        TimeoutError,
+    )
+
+
+def is_retryable_error(error):
+    """재시도하면 성공할 수 있는 오류인지 확인"""
+    return isinstance(error, get_retryable_errors())
+
+
+def get_retry_after(error):
+    """
+    오류에 포함된 서버의 재시도 대기 시간 안내 추출
+
+    HTTP Retry-After 헤더, gRPC RetryInfo 상세 정보, 오류 메시지 순서로 확인합니다.
+
+    Returns:
+        float: 대기 시간(초), 안내가 없으면 None
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    for detail in getattr(error, "details", None) or ():
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+
+    match = RETRY_HINT_PATTERN.search(str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class RetryPolicy:
+    """
+    지터가 있는 지수 백오프 재시도 정책
+
+    Args:
+        max_retries (int): 최대 시도 횟수 (첫 시도 포함)
+        base_delay (float): 첫 재시도 기본 대기 시간(초)
+        max_delay (float): 최대 대기 시간(초)
+    """
+
+    def __init__(self, max_retries=3, base_delay=2.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def compute_delay(self, attempt, retry_after=None):
+        """
+        attempt번째(0부터) 실패 후 대기 시간 계산
+
+        서버 안내가 있으면 그 시간에 약간의 지터를 더해 사용하고, 없으면
+        base_delay * 2^attempt 상한 안에서 무작위로 고르는 "full jitter" 방식을 사용합니다.
+        """
+        if retry_after is not None:
+            return min(self.max_delay, retry_after + random.uniform(0, self.base_delay / 2))
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(self.base_delay / 2, max(self.base_delay / 2, ceiling))
+
+
+class TokenBucketLimiter:
+    """
+    분당 요청 수와 분당 토큰 수를 함께 제한하는 스레드 안전 토큰 버킷
+
+    Args:
+        requests_per_minute (int): 분당 최대 요청 수
+        tokens_per_minute (int): 분당 최대 토큰 수 (입력 + 출력 추정치)
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_budget = float(requests_per_minute)
+        self._token_budget = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._condition = threading.Condition()
+
+        # 대기 시간 통계
+        self.acquisitions = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.backoffs = 0
+        self.backoff_seconds = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._request_budget = min(self.requests_per_minute,
+                                   self._request_budget + elapsed * self.requests_per_minute / 60)
+        self._token_budget = min(self.tokens_per_minute,
+                                 self._token_budget + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens=0):
+        """
+        요청 1건과 tokens개의 토큰을 쓸 수 있을 때까지 대기
+
+        Args:
+            tokens (int): 이번 요청의 예상 토큰 수
+
+        Returns:
+            float: 대기한 시간(초)
+        """
+        # 한 요청이 분당 한도보다 많으면 영원히 기다리지 않도록 한도로 제한
+        tokens = min(tokens, self.tokens_per_minute)
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    request_wait = (1 - self._request_budget) * 60 / self.requests_per_minute
+                    token_wait = (tokens - self._token_budget) * 60 / self.tokens_per_minute
+                    wait = max(request_wait, token_wait)
+                if wait <= 0:
+                    self._request_budget -= 1
+                    self._token_budget -= tokens
+                    break
+                self._condition.wait(wait)
+
+            waited = time.monotonic() - started
+            self.acquisitions += 1
+            if waited > 0.001:
+                self.throttled += 1
+                self.wait_seconds += waited
+        return waited
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """실제 사용 토큰 수가 추정치와 다르면 버킷에 차이를 반영"""
+        with self._condition:
+            self._token_budget -= actual_tokens - estimated_tokens
+
+    def penalize(self, delay):
+        """
+        서버가 요청 한도 초과를 알렸을 때 모든 스레드의 다음 요청을 delay초 뒤로 미룸
+
+        한 스레드가 429를 받으면 다른 스레드도 같은 한도를 공유하므로 함께 멈춰야
+        연속된 429를 피할 수 있습니다.
+        """
+        with self._condition:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self._condition.notify_all()
+
+    def record_backoff(self, delay):
+        """재시도 대기 시간 기록"""
+        with self._condition:
+            self.backoffs += 1
+            self.backoff_seconds += delay
+
+    def stats(self):
+        """대기 시간 통계 반환"""
+        with self._condition:
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "acquisitions": self.acquisitions,
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "backoffs": self.backoffs,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_default_rate_limit(model_name):
+    """
+    모델의 기본 한도 (환경 변수 GEMINI_RPM, GEMINI_TPM이 모델별 기본값보다 우선)
+
+    Returns:
+        tuple: (분당 요청 수, 분당 토큰 수)
+    """
+    default_rpm, default_tpm = DEFAULT_RATE_LIMITS.get(model_name, FALLBACK_RATE_LIMIT)
+    return (int(os.environ.get("GEMINI_RPM", default_rpm)),
+            int(os.environ.get("GEMINI_TPM", default_tpm)))
+
+
+def get_rate_limiter(model_name):
+    """모델별로 프로세스 전체에서 공유하는 제한기 반환"""
+    with _limiters_lock:
+        limiter = _limiters.get(model_name)
+        if limiter is None:
+            limiter = TokenBucketLimiter(*get_default_rate_limit(model_name))
+            _limiters[model_name] = limiter
+        return limiter
+
+
+def configure_rate_limit(model_name, requests_per_minute, tokens_per_minute):
+    """모델의 공유 제한기 한도를 새로 설정 (CLI 옵션 등)"""
+    with _limiters_lock:
+        _limiters[model_name] = TokenBucketLimiter(requests_per_minute, tokens_per_minute)
+        return _limiters[model_name]
+
+
+def all_limiter_stats():
+    """모든 모델 제한기의 통계"""
+    with _limiters_lock:
+        return {model_name: limiter.stats() for model_name, limiter in _limiters.items()}
@@ -0,0 +1,301 @@
+"""
+SQLite 기반 추출 결과 캐시
+
+전처리한 파일 바이트와 추출 설정(모델, 프롬프트, 생성 설정, 응답 형식)으로 만든 콘텐츠 키에
+원본 응답 텍스트와 파싱한 표를 함께 저장하므로, 같은 파일을 같은 설정으로 다시 추출하면
+API를 호출하지 않습니다. 용량과 보존 기간을 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다.
+
+바이트는 다르지만 거의 같은 요청은 perceptual_index의 지각 해시 색인으로 찾으며(find_similar),
+텍스트 레이어 지문이 정확히 같을 때만 저장된 결과를 재사용합니다. 통계의 적중률에는 키가 같은
+적중(hits)과 유사 파일 재사용(similar_hits)을 모두 포함합니다.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from perceptual_index import NearDuplicateIndex, compute_fingerprint
+
+logger = logging.getLogger("table_extractor")
+
+# 기본 캐시 위치 및 한도
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TABLE_EXTRACTOR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "table_extractor")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60  # 30일
+
+
+def make_cache_key(file_bytes, model_name, prompt, mime_type, temperature, max_output_tokens,
+                   output_format="csv"):
+    """
+    추출 결과를 식별하는 콘텐츠 기반 캐시 키 생성
+
+    Args:
+        file_bytes (bytes): 전처리된 파일 바이트
+        model_name (str): Gemini 모델명
+        prompt (str): 실제로 사용된 프롬프트
+        mime_type (str): 파일 MIME 타입
+        temperature (float): 생성 온도
+        max_output_tokens (int): 최대 출력 토큰 수
+        output_format (str): 응답 형식 ('csv' 또는 'json', CSV는 기존 키와 같음)
+
+    Returns:
+        str: SHA-256 16진수 키
+    """
+    hasher = hashlib.sha256()
+    hasher.update(file_bytes)
+    params = [model_name, prompt, mime_type, float(temperature), int(max_output_tokens)]
+    if output_format != "csv":
+        params.append(output_format)
+    params = json.dumps(params, ensure_ascii=False)
+    hasher.update(params.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def make_similarity_scope(model_name, prompt, temperature, max_output_tokens, output_format="csv"):
+    """
+    유사 파일 비교 범위 키 (파일 내용과 전송 형식을 제외한 추출 설정)
+
+    다시 인코딩한 같은 이미지는 전송 형식(PNG/JPEG 등)이 달라질 수 있으므로 MIME 타입은 포함하지 않습니다.
+    """
+    return make_cache_key(b"", model_name, prompt, "", temperature, max_output_tokens, output_format)
+
+
+def _frame_to_json(df):
+    """데이터프레임을 JSON 직렬화 가능한 dict로 변환 (컬럼명/값 모두 원형 유지)"""
+    values = df.astype(object).where(pd.notna(df), None).values.tolist()
+    return {"columns": [str(col) for col in df.columns], "data": values}
+
+
+def _frame_from_json(payload):
+    """_frame_to_json으로 저장한 dict를 데이터프레임으로 복원"""
+    return pd.DataFrame(payload["data"], columns=payload["columns"])
+
+
+def serialize_tables(tables):
+    """추출된 표 목록(dict 리스트)을 JSON 문자열로 변환"""
+    serialized = []
+    for table in tables:
+        entry = {}
+        for field, value in table.items():
+            if isinstance(value, pd.DataFrame):
+                entry[field] = {"__frame__": _frame_to_json(value)}
+            else:
+                entry[field] = value
+        serialized.append(entry)
+    return json.dumps(serialized, ensure_ascii=False)
+
+
+def deserialize_tables(text):
+    """serialize_tables로 만든 JSON 문자열을 표 목록으로 복원"""
+    tables = []
+    for entry in json.loads(text):
+        table = {}
+        for field, value in entry.items():
+            if isinstance(value, dict) and "__frame__" in value:
+                table[field] = _frame_from_json(value["__frame__"])
+            else:
+                table[field] = value
+        tables.append(table)
+    return tables
+
+
+class ResultCache:
+    """
+    SQLite 기반 추출 결과 캐시
+
+    원본 응답 텍스트와 파싱된 표를 함께 저장하며, 용량(max_bytes)과
+    보존 기간(max_age)을 초과하면 가장 오래 사용되지 않은 항목부터 제거합니다.
+    near_duplicates가 켜져 있으면 저장한 요청의 지각 해시도 색인하여, 바이트는 다르지만
+    거의 같은 이미지/페이지를 find_similar로 찾을 수 있습니다.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE,
+                 near_duplicates=True):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "results.sqlite3")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.near_duplicates = NearDuplicateIndex(cache_dir) if near_duplicates else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # 키 조회는 실패했지만 유사 파일의 결과를 재사용한 횟수
+        self.similar_hits = 0
+        self.evictions = 0
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    raw_text TEXT NOT NULL,
+                    tables_json TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """트랜잭션 하나를 위한 연결 (블록이 끝나면 커밋 또는 롤백한 뒤 연결을 닫음)"""
+        with contextlib.closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+
+    def get(self, key):
+        """
+        캐시에서 결과 조회 (적중/실패 횟수 기록)
+
+        Args:
+            key (str): make_cache_key로 만든 키
+
+        Returns:
+            tuple: (원본 응답 텍스트, 표 목록) 또는 캐시에 없으면 None
+        """
+        cached = self._lookup(key)
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return cached
+
+    def _lookup(self, key):
+        """적중/실패 횟수를 바꾸지 않는 조회 (find_similar처럼 get에 이어서 하는 조회용)"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT raw_text, tables_json, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.max_age and now - row[2] > self.max_age:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+
+        if row is None:
+            return None
+        try:
+            return row[0], deserialize_tables(row[1])
+        except (ValueError, KeyError) as e:
+            logger.warning("캐시 항목 복원 중 오류: %s", e)
+            return None
+
+    def find_similar(self, file_bytes, file_type, scope):
+        """
+        바이트는 다르지만 거의 같은 요청의 저장된 결과 찾기
+
+        Args:
+            file_bytes (bytes): 전처리된 파일 바이트
+            file_type (str): 'pdf' 또는 이미지 확장자
+            scope (str): 같은 설정끼리만 비교하기 위한 키 (make_similarity_scope)
+
+        Returns:
+            tuple: (저장된 결과 (원본 응답 텍스트, 표 목록) 또는 None,
+                    유사 정보 dict {'fingerprint', 'scope', 'similarity', 'served'} 또는 None)
+                   - 결과가 None이어도 유사 정보의 fingerprint는 put에 넘겨 색인에 추가합니다
+        """
+        if self.near_duplicates is None:
+            return None, None
+        fingerprint = compute_fingerprint(file_bytes, file_type)
+        info = {'fingerprint': fingerprint, 'scope': scope, 'similarity': None, 'served': False}
+        match = self.near_duplicates.find(fingerprint, scope)
+        if match is None:
+            return None, info
+        info['similarity'] = match['similarity']
+        if not match['serve']:
+            return None, info
+        # 같은 요청의 get에서 이미 실패로 기록했으므로 적중/실패 횟수는 다시 세지 않음
+        cached = self._lookup(match['cache_key'])
+        if cached is None:
+            # 결과가 캐시에서 이미 제거된 지문
+            self.near_duplicates.remove(match['cache_key'])
+            info['similarity'] = None
+            return None, info
+        info['served'] = True
+        with self._lock:
+            self.similar_hits += 1
+        return cached, info
+
+    def put(self, key, raw_text, tables, similar=None):
+        """
+        결과를 캐시에 저장하고 한도를 넘으면 오래된 항목을 제거
+
+        Args:
+            key (str): make_cache_key로 만든 키
+            raw_text (str): Gemini 원본 응답 텍스트
+            tables (list): 파싱된 표 목록
+            similar (dict): find_similar가 돌려준 유사 정보 (있으면 지문을 색인에 추가)
+        """
+        tables_json = serialize_tables(tables)
+        size = len(raw_text.encode("utf-8")) + len(tables_json.encode("utf-8"))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, raw_text, tables_json, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, raw_text, tables_json, size, now, now)
+            )
+            self._evict(conn, now)
+        if similar is not None and self.near_duplicates is not None:
+            self.near_duplicates.add(similar['fingerprint'], similar['scope'], key)
+
+    def _evict(self, conn, now):
+        """보존 기간이 지난 항목과 용량 초과분(LRU 순)을 제거"""
+        removed = 0
+        if self.max_age:
+            removed += conn.execute(
+                "DELETE FROM results WHERE created_at < ?", (now - self.max_age,)
+            ).rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_access ASC").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+                removed += 1
+
+        if removed:
+            with self._lock:
+                self.evictions += removed
+
+    def clear(self):
+        """캐시 전체 삭제"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+        if self.near_duplicates is not None:
+            self.near_duplicates.clear()
+
+    def stats(self):
+        """캐시 상태 (항목 수, 용량, 적중/실패/유사 파일 재사용 횟수) 반환"""
+        with self._connect() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "similar_hits": self.similar_hits,
+                "evictions": self.evictions,
+                # 유사 파일 재사용은 키 조회 실패(misses)로 센 요청이 결과를 얻은 경우이므로 적중으로 포함
+                "hit_rate": (self.hits + self.similar_hits) / lookups if lookups else 0.0,
+            }
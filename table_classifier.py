@@ -0,0 +1,171 @@
+"""
+표 유형 분류용 키워드 매처
+
+표 유형별 키워드를 모두 하나의 정규식으로 컴파일해 두고, 표의 열 이름과 셀을 한 번만
+훑어 모든 유형(재무상태표, 손익계산서, 현금흐름표, 투자지표, 계약)의 점수를 함께 계산합니다.
+새 유형은 register_table_type으로 등록하며, 등록하면 다음 분류 때 매처를 다시 컴파일합니다.
+
+점수는 기존 방식과 같이 표 안에 (대소문자 구분 없이) 부분 문자열로 나타나는 키워드의 개수입니다.
+긴 표는 앞쪽 SCAN_HEAD_ROWS행과 합계 항목이 모이는 뒤쪽 SCAN_TAIL_ROWS행만 훑으므로
+분류 시간이 표 길이와 관계없이 일정합니다.
+"""
+import re
+import threading
+
+import pandas as pd
+
+# 셀 사이 구분자 (여러 셀에 걸친 키워드가 매칭되지 않도록 셀 내용에 나오지 않는 제어 문자 사용)
+CELL_SEPARATOR = '\x1f'
+
+# 긴 표에서 키워드를 찾을 앞쪽/뒤쪽 행 수 (유형은 제목, 항목명, 합계 행에서 정해지므로 가운데 행은 건너뜀)
+SCAN_HEAD_ROWS = 200
+SCAN_TAIL_ROWS = 50
+
+# 유형별 키워드
+STATEMENT_KEYWORDS = {
+    '재무상태표': ['재무상태표', '대차대조표', '자산', '부채', '자본', '유동자산', '비유동자산', '자산총계', '부채총계'],
+    '손익계산서': ['손익계산서', '매출액', '매출원가', '매출총이익', '영업이익', '당기순이익', 'EBITDA', '판매비', '관리비'],
+    '현금흐름표': ['현금흐름표', '영업활동', '투자활동', '재무활동', '현금흐름', '기초현금', '기말현금'],
+    '투자지표': ['PER', 'ROA', 'ROE', 'EPS', 'BPS', '성장성', '수익성', '안정성', '주당순이익'],
+}
+CONTRACT_TYPE = '계약'
+CONTRACT_KEYWORDS = ['호실', '계약자', '면적', '분양대금', '납부', '계약금', '중도금', '잔금']
+
+
+class TableType:
+    """
+    등록된 표 유형
+
+    Args:
+        name (str): 유형 이름
+        keywords (list): 유형을 나타내는 키워드
+        min_score (int): detect_table_type이 이 유형으로 판단하는 최소 키워드 수
+        detectable (bool): detect_table_type의 후보인지 여부 (계약 표처럼 별도 함수로 판단하는 유형은 False)
+    """
+
+    def __init__(self, name, keywords, min_score=2, detectable=True):
+        self.name = name
+        self.keywords = list(keywords)
+        self.min_score = min_score
+        self.detectable = detectable
+
+
+class KeywordMatcher:
+    """
+    여러 키워드를 한 번에 찾는 정규식 매처
+
+    키워드를 긴 것부터 나열한 하나의 정규식으로 각 시작 위치의 가장 긴 키워드를 찾고,
+    찾은 키워드에 포함된 짧은 키워드('유동자산' 안의 '자산')도 함께 찾은 것으로 처리합니다.
+    다음 검색은 찾은 위치 바로 다음 글자부터 하므로 서로 걸친 키워드('기초현금흐름'의
+    '기초현금'과 '현금흐름')도 모두 찾아 부분 문자열 검사와 결과가 같습니다.
+    """
+
+    def __init__(self, keywords):
+        keywords = sorted({keyword.lower() for keyword in keywords if keyword}, key=len, reverse=True)
+        self.pattern = None if not keywords else re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+        # 키워드별로 그 안에 포함된 키워드 목록
+        self.contained = {
+            keyword: [other for other in keywords if other in keyword]
+            for keyword in keywords
+        }
+
+    def find(self, text):
+        """
+        텍스트에 나타나는 키워드 집합 반환 (소문자)
+
+        Args:
+            text (str): 소문자로 바꾼 검사할 텍스트
+        """
+        found = set()
+        if self.pattern is None:
+            return found
+        search = self.pattern.search
+        match = search(text)
+        while match is not None:
+            found.update(self.contained[match.group()])
+            match = search(text, match.start() + 1)
+        return found
+
+
+_table_types = {}
+_matcher = None
+_keyword_types = {}
+_registry_lock = threading.Lock()
+
+
+def register_table_type(name, keywords, min_score=2, detectable=True):
+    """
+    표 유형 등록 (같은 이름이 있으면 교체)
+
+    Args:
+        name (str): 유형 이름
+        keywords (list): 유형을 나타내는 키워드
+        min_score (int): 이 유형으로 판단하는 최소 키워드 수
+        detectable (bool): detect_table_type의 후보인지 여부
+    """
+    global _matcher
+    with _registry_lock:
+        _table_types[name] = TableType(name, keywords, min_score, detectable)
+        _matcher = None
+
+
+def get_table_types():
+    """등록된 표 유형 목록 (등록 순서)"""
+    with _registry_lock:
+        return list(_table_types.values())
+
+
+def _get_matcher():
+    """등록된 모든 키워드를 컴파일한 매처와 키워드별 유형 목록 반환 (등록이 바뀌었을 때만 다시 컴파일)"""
+    global _matcher, _keyword_types
+    with _registry_lock:
+        if _matcher is None:
+            keyword_types = {}
+            for table_type in _table_types.values():
+                for keyword in table_type.keywords:
+                    keyword_types.setdefault(keyword.lower(), set()).add(table_type.name)
+            _keyword_types = keyword_types
+            _matcher = KeywordMatcher(keyword_types)
+        return _matcher, _keyword_types
+
+
+def table_text(df):
+    """
+    열 이름과 문자열 셀을 구분자로 이어 붙인 소문자 텍스트 (숫자 열과 결측값은 키워드가 없으므로 제외)
+
+    SCAN_HEAD_ROWS + SCAN_TAIL_ROWS행보다 긴 표는 앞쪽과 뒤쪽 행의 셀만 사용합니다.
+    """
+    if len(df) > SCAN_HEAD_ROWS + SCAN_TAIL_ROWS:
+        df = pd.concat([df.iloc[:SCAN_HEAD_ROWS], df.iloc[-SCAN_TAIL_ROWS:]])
+    values = df.select_dtypes(include=[object, 'string']).to_numpy(dtype=object).ravel()
+    if len(values):
+        values = values[~pd.isna(values)]
+    cells = [str(col) for col in df.columns]
+    cells.extend(map(str, values.tolist()))
+    return CELL_SEPARATOR.join(cells).lower()
+
+
+def score_table_types(df):
+    """
+    표의 열 이름과 셀(긴 표는 앞쪽/뒤쪽 행)을 한 번 훑어 등록된 모든 유형의 점수 계산
+
+    Args:
+        df (DataFrame): 분류할 데이터프레임
+
+    Returns:
+        dict: {유형 이름: 표에 나타난 그 유형의 키워드 수} (등록 순서)
+    """
+    matcher, keyword_types = _get_matcher()
+    scores = {table_type.name: 0 for table_type in get_table_types()}
+    if df is None or df.empty:
+        return scores
+    for keyword in matcher.find(table_text(df)):
+        for name in keyword_types.get(keyword, ()):
+            if name in scores:
+                scores[name] += 1
+    return scores
+
+
+for _name, _keywords in STATEMENT_KEYWORDS.items():
+    register_table_type(_name, _keywords)
+register_table_type(CONTRACT_TYPE, CONTRACT_KEYWORDS, min_score=1, detectable=False)
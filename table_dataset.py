@@ -0,0 +1,217 @@
+"""
+추출한 표를 분할 저장하는 열 기반 데이터셋 (Parquet 또는 Arrow IPC)
+
+일괄 추출 결과를 문서/페이지/표 유형별 하이브 형식 디렉터리
+(document=<문서>/page=<페이지>/table_type=<유형>/part-….parquet)에 추가하기만 합니다.
+표는 메모리에 모아 두었다가 파티션마다 파일 하나로 한꺼번에 쓰므로 표마다 작은 파일이 생기지 않고,
+이미 쓴 파일은 고치지 않습니다. 파일은 숨김 임시 파일에 쓴 뒤 이름을 바꾸므로 읽는 쪽에서
+쓰다 만 파일을 보지 않습니다.
+
+읽을 때는 read_table_dataset으로 필요한 파티션과 열만 읽으며, 숫자 열은 숫자 타입으로 저장되어
+있으므로 CSV처럼 값을 다시 파싱하지 않습니다. pyarrow가 설치되어 있을 때만 사용할 수 있습니다.
+
+사용 예:
+    with TableDatasetWriter("dataset/") as writer:
+        writer.add(result.tables, document="report_2024_05")
+
+    df = read_table_dataset("dataset/", filters={'table_type': '손익계산서'})
+"""
+import os
+import threading
+import time
+import urllib.parse
+import uuid
+
+import pandas as pd
+
+from table_export import frame_to_arrow_table, get_export_frame, import_pyarrow, to_typed_frame, write_arrow_table
+from table_processing import detect_table_type
+
+# 형식별 파일 확장자
+DATASET_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+# 파티션 열 (디렉터리 순서)
+PARTITION_KEYS = ('document', 'page', 'table_type')
+# 파일 안에서 같은 파티션의 표를 구분하는 열
+TABLE_COLUMN = 'table'
+# 파티션 열 타입 (page는 정수로 읽어야 filters={'page': 3}이 맞음)
+PARTITION_TYPES = {'document': 'string', 'page': 'int32', 'table_type': 'string'}
+# 값이 없는 파티션 (pyarrow가 결측값으로 읽는 이름)
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+# 메모리에 모은 행이 이 수를 넘으면 파일로 씀
+DEFAULT_FLUSH_ROWS = 100_000
+
+
+def _partition_path(root, partition):
+    """파티션 값 (document, page, table_type)에 해당하는 디렉터리 경로"""
+    parts = [
+        f"{key}={NULL_PARTITION if value is None else urllib.parse.quote(str(value), safe='')}"
+        for key, value in zip(PARTITION_KEYS, partition)
+    ]
+    return os.path.join(root, *parts)
+
+
+class TableDatasetWriter:
+    """
+    추출한 표를 분할 데이터셋에 추가하는 작성기
+
+    여러 스레드에서 add를 호출해도 됩니다. with 블록을 벗어나거나 flush를 호출하면 남은 표를 씁니다.
+
+    Args:
+        root (str): 데이터셋 디렉터리
+        file_format (str): 'parquet' 또는 'arrow' (Arrow IPC)
+        flush_rows (int): 메모리에 모은 행이 이 수를 넘으면 파일로 씀
+        restructure (bool): 계약 테이블을 재구성하여 저장할지 여부
+
+    Raises:
+        ImportError: pyarrow가 설치되어 있지 않은 경우
+    """
+
+    def __init__(self, root, file_format="parquet", flush_rows=DEFAULT_FLUSH_ROWS, restructure=False):
+        self._pa = import_pyarrow()
+        if self._pa is None:
+            raise ImportError("데이터셋으로 저장하려면 pyarrow를 설치하세요.")
+        if file_format not in DATASET_FORMATS:
+            raise ValueError(f"지원하지 않는 형식입니다: {file_format}")
+        self.root = root
+        self.file_format = file_format
+        self.flush_rows = flush_rows
+        self.restructure = restructure
+        self._lock = threading.Lock()
+        # 파티션 -> 아직 쓰지 않은 데이터프레임 목록
+        self._pending = {}
+        self._pending_rows = 0
+
+        self.files_written = 0
+        self.tables_written = 0
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def add(self, tables, document):
+        """
+        문서 하나에서 추출한 표를 추가 (파싱 오류가 난 표와 빈 표는 제외)
+
+        Args:
+            tables (list): 추출된 표 정보 목록
+            document (str): 문서 이름 (파티션 값)
+
+        Returns:
+            int: 추가한 표 수
+        """
+        added = []
+        for table in tables:
+            df = get_export_frame(table, self.restructure)
+            if df is None or df.empty:
+                continue
+            partition = (document, table.get('page'), detect_table_type(df))
+            df = to_typed_frame(df)
+            # 파티션/표 번호 열과 겹치는 원본 열 이름은 바꿈
+            reserved = set(PARTITION_KEYS) | {TABLE_COLUMN}
+            df = df.rename(columns=lambda col: f"{col}.원본" if col in reserved else col)
+            df.insert(0, TABLE_COLUMN, table['index'] + 1)
+            added.append((partition, df))
+
+        with self._lock:
+            for partition, df in added:
+                self._pending.setdefault(partition, []).append(df)
+                self._pending_rows += len(df)
+            should_flush = self._pending_rows >= self.flush_rows
+        if should_flush:
+            self.flush()
+        return len(added)
+
+    def flush(self):
+        """
+        모아 둔 표를 파티션마다 파일 하나로 기록
+
+        Returns:
+            list: 새로 쓴 파일 경로 목록
+        """
+        with self._lock:
+            pending, self._pending, self._pending_rows = self._pending, {}, 0
+
+        written = []
+        for partition, frames in pending.items():
+            df = pd.concat(frames, ignore_index=True, sort=False)
+            units = {}
+            for frame in frames:
+                units.update(frame.attrs.get('column_units', {}))
+            df.attrs['column_units'] = units
+            written.append(self._write(partition, df))
+            with self._lock:
+                self.files_written += 1
+                self.tables_written += len(frames)
+                self.rows_written += len(df)
+        return written
+
+    def _write(self, partition, df):
+        directory = _partition_path(self.root, partition)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:12]}{DATASET_FORMATS[self.file_format]}"
+        path = os.path.join(directory, name)
+        # '.'으로 시작하는 파일은 데이터셋을 읽을 때 무시됨
+        temp_path = os.path.join(directory, f".{name}.tmp")
+        try:
+            write_arrow_table(frame_to_arrow_table(df, self._pa), temp_path, self.file_format, self._pa)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return path
+
+    def stats(self):
+        """기록한 파일/표/행 수와 아직 쓰지 않은 행 수 반환"""
+        with self._lock:
+            return {
+                'files': self.files_written,
+                'tables': self.tables_written,
+                'rows': self.rows_written,
+                'pending_rows': self._pending_rows,
+            }
+
+
+def read_table_dataset(root, file_format="parquet", filters=None, columns=None):
+    """
+    분할 데이터셋에서 표 읽기
+
+    파티션 조건에 맞는 파일만 열고, 파일마다 다른 열은 합집합으로 맞춥니다.
+    같은 이름의 열이 파일마다 숫자/문자열로 다르면 합칠 수 없으므로 table_type 등으로 범위를 좁혀 읽습니다.
+
+    Args:
+        root (str): 데이터셋 디렉터리
+        file_format (str): 'parquet' 또는 'arrow'
+        filters (dict): 파티션 조건 (예: {'document': 'report_2024_05', 'table_type': '손익계산서'})
+        columns (list): 읽을 열 이름 (None이면 전체)
+
+    Returns:
+        DataFrame: 조건에 맞는 표를 합친 데이터프레임 (파티션 열 포함, page는 정수)
+    """
+    pa = import_pyarrow()
+    if pa is None:
+        raise ImportError("데이터셋을 읽으려면 pyarrow를 설치하세요.")
+    import pyarrow.dataset as ds
+
+    file_format = "ipc" if file_format == "arrow" else file_format
+    partitioning = ds.partitioning(
+        pa.schema([(key, pa.type_for_alias(PARTITION_TYPES[key])) for key in PARTITION_KEYS]), flavor="hive")
+    expression = None
+    for key, value in (filters or {}).items():
+        condition = ds.field(key) == value
+        expression = condition if expression is None else expression & condition
+
+    dataset = ds.dataset(root, format=file_format, partitioning=partitioning)
+    fragments = list(dataset.get_fragments(filter=expression))
+    if not fragments:
+        return pd.DataFrame(columns=list(columns or []))
+    try:
+        schema = pa.unify_schemas([fragment.physical_schema for fragment in fragments]
+                                  + [partitioning.schema])
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"열 타입이 서로 다른 파일이 섞여 있습니다. 조건을 좁혀 읽으세요: {e}") from e
+    dataset = ds.dataset([fragment.path for fragment in fragments], schema=schema, format=file_format,
+                         partitioning=partitioning, partition_base_dir=root)
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
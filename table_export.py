@@ -0,0 +1,350 @@
+"""
+추출된 표 내보내기 (표별 CSV, 전체 표 ZIP/XLSX, 여러 표를 합친 CSV/Parquet/Arrow)
+
+내보낼 바이트는 필요할 때만 만듭니다. ZIP은 표마다 CSV를 압축 항목에 바로 써서
+전체 CSV 문자열을 메모리에 따로 모으지 않으며, XLSX는 openpyxl 또는 xlsxwriter가
+설치되어 있을 때만 사용할 수 있습니다.
+
+XLSX와 Parquet/Arrow IPC는 숫자 형식 열을 숫자 타입(Int64/Float64)으로 바꿔 내보내므로 받는 쪽에서
+문자열을 다시 파싱하지 않아도 됩니다. 값에서 뺀 단위는 XLSX에서는 열 이름에, Parquet/Arrow에서는 스키마
+메타데이터에 남기고, '007' 같은 코드 값 열은 문자열로 둡니다. Parquet/Arrow는 pyarrow가 설치되어 있을 때만 사용할 수 있습니다.
+"""
+import functools
+import importlib.util
+import io
+import json
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from table_processing import is_contract_table, normalize_numeric_columns, restructure_table_data
+
+# 이 크기를 넘는 ZIP은 메모리 대신 임시 파일에 만듦
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+# 엑셀 시트 이름 최대 길이와 사용할 수 없는 문자
+SHEET_NAME_MAX_LENGTH = 31
+SHEET_NAME_INVALID_CHARS = '[]:*?/\\'
+# 숫자로 바꾸지 않을 코드 값 ('007', '-012'는 해당, '0', '0.5', '0,123'은 해당하지 않음)
+LEADING_ZERO_PATTERN = r"^[+-]?0\d"
+
+
+def table_label(table):
+    """화면과 파일 이름에 쓰는 표 이름 (예: '표 2 (p.3)', 여러 파일의 표는 'report 표 2 (p.3)')"""
+    label = f"표 {table['index'] + 1}"
+    if 'page' in table:
+        label += f" (p.{table['page']})"
+    if table.get('file_name'):
+        label = f"{table['file_name']} {label}"
+    return label
+
+
+def table_file_name(base_name, table):
+    """
+    표를 저장할 파일 이름 (확장자 제외, 예: 'report_p3_table_2')
+
+    여러 파일을 함께 내보낼 때는 표의 'file_name'(원본 파일 이름)을 base_name 대신 사용합니다.
+    """
+    name = table.get('file_name') or base_name
+    if 'page' in table:
+        name += f"_p{table['page']}"
+    return name + f"_table_{table['index'] + 1}"
+
+
+def get_export_frame(table, restructure=False):
+    """
+    표에서 내보낼 데이터프레임 반환
+
+    Args:
+        table (dict): 추출된 표 정보
+        restructure (bool): 계약 테이블 형식이면 재구성한 표(상단/하단 결합)를 내보낼지 여부
+
+    Returns:
+        DataFrame: 내보낼 데이터프레임, 파싱 오류가 난 표이면 None
+    """
+    if table.get('error', False):
+        return None
+    df = table['df']
+    if restructure and is_contract_table(df):
+        restructured = restructure_table_data(df)
+        if isinstance(restructured, dict) and 'combined' in restructured:
+            return restructured['combined']
+    return df
+
+
+def get_original_text(table):
+    """파싱 오류가 난 표의 원본 CSV 텍스트"""
+    return str(table['df']['original_csv'].iloc[0])
+
+
+def frame_to_csv_bytes(df):
+    """데이터프레임을 엑셀에서 바로 열리는 UTF-8(BOM) CSV 바이트로 변환"""
+    return df.to_csv(index=False).encode('utf-8-sig')
+
+
+def export_tables_zip(tables, base_name, restructure=False):
+    """
+    모든 표를 표마다 CSV 파일 하나씩 담은 ZIP으로 내보내기
+
+    파싱 오류가 난 표는 원본 텍스트를 '_error.txt' 파일로 담습니다.
+
+    Args:
+        tables (list): 추출된 표 정보 목록
+        base_name (str): 파일 이름 앞부분
+        restructure (bool): 계약 테이블을 재구성하여 내보낼지 여부
+
+    Returns:
+        bytes: ZIP 파일 내용
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as buffer:
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for table in tables:
+                name = table_file_name(base_name, table)
+                df = get_export_frame(table, restructure)
+                if df is None:
+                    archive.writestr(name + "_error.txt", get_original_text(table).encode('utf-8'))
+                    continue
+                # CSV를 압축 항목에 바로 기록
+                with archive.open(name + ".csv", 'w') as entry:
+                    with io.TextIOWrapper(entry, encoding='utf-8-sig', newline='') as text:
+                        df.to_csv(text, index=False)
+        buffer.seek(0)
+        return buffer.read()
+
+
+def make_column_names(columns):
+    """열 이름을 문자열로 바꾸고 빈 이름/중복 이름에 번호를 붙임 (열 기반 형식은 고유한 문자열 이름 필요)"""
+    names = []
+    used = set()
+    for position, col in enumerate(columns):
+        name = str(col).strip() if col is not None else ""
+        name = name or f"열{position + 1}"
+        candidate = name
+        suffix = 1
+        while candidate in used:
+            candidate = f"{name}.{suffix}"
+            suffix += 1
+        used.add(candidate)
+        names.append(candidate)
+    return names
+
+
+def has_leading_zero_codes(column):
+    """'007', '0123' 처럼 0으로 시작하는 코드 값이 있는 열인지 (숫자로 바꾸면 앞의 0이 사라짐)"""
+    values = column.dropna().astype(str).str.strip()
+    return bool(values.str.match(LEADING_ZERO_PATTERN).any())
+
+
+def to_typed_frame(df, units_in_header=False):
+    """
+    내보내기용으로 열 타입을 정한 데이터프레임
+
+    모든 값이 숫자 형식인 열은 숫자 타입(Int64/Float64)으로 바꾸고 단위는 attrs['column_units']에
+    남깁니다. 0으로 시작하는 코드 값('007')이 있는 열과 나머지 열은 값을 고치지 않고 string 타입으로 둡니다.
+
+    Args:
+        df (DataFrame): 추출된 표
+        units_in_header (bool): 값에서 뺀 단위를 열 이름 뒤에 '(단위)'로 붙일지 여부
+            (attrs를 저장하지 못하는 XLSX용)
+
+    Returns:
+        DataFrame: 타입을 정한 새 데이터프레임 (열 이름은 고유한 문자열)
+    """
+    df = df.set_axis(make_column_names(df.columns), axis=1)
+    codes = [col for position, col in enumerate(df.columns)
+             if df.dtypes.iloc[position] == object and has_leading_zero_codes(df.iloc[:, position])]
+    typed = normalize_numeric_columns(df, skip_columns=codes)
+    units = typed.attrs.get('column_units', {})
+    for position, col in enumerate(df.columns):
+        column = df.iloc[:, position]
+        if col not in units and column.dtype == object:
+            # 숫자 열이 아니면 쉼표/괄호 정리 전의 원래 문자열 유지
+            typed.isetitem(position, column.astype('string'))
+    if units_in_header:
+        # 열 이름에 이미 단위가 있으면(예: '매출(백만원)') 그대로 둠
+        names = make_column_names([
+            f"{col} ({units[col]['unit']})"
+            if units.get(col, {}).get('unit') and units[col]['unit'] not in col else col
+            for col in typed.columns
+        ])
+        renamed = dict(zip(typed.columns, names))
+        typed.columns = names
+        typed.attrs['column_units'] = {renamed[col]: info for col, info in units.items()}
+    return typed
+
+
+def merge_tables(tables, restructure=False, typed=False):
+    """
+    모든 표를 하나의 데이터프레임으로 합침 (파싱 오류가 난 표는 제외)
+
+    앞에 출처 열('파일', '페이지', '표')을 붙이며, 표마다 다른 열은 합집합으로 맞추고 빈 값은 NaN입니다.
+
+    Args:
+        tables (list): 추출된 표 정보 목록
+        restructure (bool): 계약 테이블을 재구성하여 합칠지 여부
+        typed (bool): 표마다 숫자 열을 숫자 타입으로 바꾼 뒤 합칠지 여부 (열별 단위는 attrs['column_units'])
+
+    Returns:
+        DataFrame: 합친 데이터프레임 (합칠 표가 없으면 빈 데이터프레임)
+    """
+    frames = []
+    column_units = {}
+    for table in tables:
+        df = get_export_frame(table, restructure)
+        if df is None:
+            continue
+        if typed:
+            df = to_typed_frame(df)
+            column_units.update(df.attrs.get('column_units', {}))
+        source = {}
+        if table.get('file_name'):
+            source['파일'] = table['file_name']
+        if 'page' in table:
+            source['페이지'] = table['page']
+        source['표'] = table['index'] + 1
+        # 원본 열 이름과 겹치지 않도록 출처 열을 앞에 붙임
+        df = df.rename(columns=lambda col: f"{col}.원본" if col in source else col)
+        frames.append(df.assign(**source)[list(source) + list(df.columns)])
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames, ignore_index=True, sort=False)
+    if typed:
+        merged.attrs['column_units'] = column_units
+    return merged
+
+
+@functools.lru_cache(maxsize=None)
+def import_pyarrow():
+    """pyarrow 모듈 (설치되어 있지 않거나 불러올 수 없으면 None, 결과는 한 번만 확인)"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def frame_to_arrow_table(df, pa=None):
+    """
+    데이터프레임을 Arrow 테이블로 변환
+
+    여러 표를 합치며 타입이 섞인 열(object)은 문자열로 바꾸고, attrs['column_units']는
+    스키마 메타데이터 'column_units'(JSON)로 남깁니다.
+
+    Args:
+        df (DataFrame): 변환할 데이터프레임 (to_typed_frame 또는 merge_tables(typed=True) 결과)
+        pa: pyarrow 모듈 (None이면 불러옴)
+    """
+    pa = pa or import_pyarrow()
+    df = df.set_axis(make_column_names(df.columns), axis=1)
+    for position in range(len(df.columns)):
+        column = df.iloc[:, position]
+        if column.dtype == object:
+            df.isetitem(position, column.astype('string'))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    units = df.attrs.get('column_units')
+    if units:
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'column_units'] = json.dumps(units, ensure_ascii=False).encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+    return table
+
+
+def write_arrow_table(table, sink, file_format="parquet", pa=None):
+    """
+    Arrow 테이블을 Parquet 또는 Arrow IPC 파일 형식으로 기록
+
+    Args:
+        table: pyarrow.Table
+        sink: 파일 경로 또는 바이너리 파일 객체
+        file_format (str): 'parquet' 또는 'arrow'
+        pa: pyarrow 모듈 (None이면 불러옴)
+    """
+    pa = pa or import_pyarrow()
+    if file_format == "parquet":
+        pa.parquet.write_table(table, sink)
+    elif file_format == "arrow":
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"지원하지 않는 형식입니다: {file_format}")
+
+
+def export_tables_columnar(tables, file_format="parquet", restructure=False):
+    """
+    모든 표를 출처 열과 함께 하나의 Parquet 또는 Arrow IPC 파일로 내보내기
+
+    숫자 열은 숫자 타입으로 바꾼 뒤 합치며, 같은 이름의 열이 표마다 숫자/문자열로 다르면 문자열이 됩니다.
+
+    Args:
+        tables (list): 추출된 표 정보 목록
+        file_format (str): 'parquet' 또는 'arrow'
+        restructure (bool): 계약 테이블을 재구성하여 내보낼지 여부
+
+    Returns:
+        bytes: 파일 내용, pyarrow가 설치되어 있지 않으면 None
+    """
+    pa = import_pyarrow()
+    if pa is None:
+        return None
+    buffer = io.BytesIO()
+    write_arrow_table(frame_to_arrow_table(merge_tables(tables, restructure, typed=True), pa),
+                      buffer, file_format, pa)
+    return buffer.getvalue()
+
+
+def get_xlsx_engine():
+    """설치된 XLSX 작성 엔진 이름 (openpyxl 또는 xlsxwriter), 없으면 None"""
+    for engine in ("xlsxwriter", "openpyxl"):
+        if importlib.util.find_spec(engine) is not None:
+            return engine
+    return None
+
+
+def make_sheet_names(tables):
+    """표마다 엑셀 규칙(31자, 금지 문자, 중복 불가)에 맞는 시트 이름 생성"""
+    names = []
+    used = set()
+    for table in tables:
+        name = table_label(table)
+        name = "".join("_" if ch in SHEET_NAME_INVALID_CHARS else ch for ch in name)[:SHEET_NAME_MAX_LENGTH]
+        candidate = name
+        suffix = 2
+        while candidate.lower() in used:
+            tail = f" ({suffix})"
+            candidate = name[:SHEET_NAME_MAX_LENGTH - len(tail)] + tail
+            suffix += 1
+        used.add(candidate.lower())
+        names.append(candidate)
+    return names
+
+
+def export_tables_xlsx(tables, restructure=False):
+    """
+    모든 표를 표마다 시트 하나씩 담은 XLSX로 내보내기
+
+    파싱 오류가 난 표는 원본 텍스트를 한 열짜리 시트로 담습니다.
+
+    Args:
+        tables (list): 추출된 표 정보 목록
+        restructure (bool): 계약 테이블을 재구성하여 내보낼지 여부
+
+    Returns:
+        bytes: XLSX 파일 내용, 작성 엔진이 설치되어 있지 않으면 None
+    """
+    engine = get_xlsx_engine()
+    if engine is None:
+        return None
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine=engine) as writer:
+        for table, sheet_name in zip(tables, make_sheet_names(tables)):
+            df = get_export_frame(table, restructure)
+            if df is None:
+                df = pd.DataFrame({'original_csv': get_original_text(table).splitlines()})
+            else:
+                # 숫자 열은 엑셀에서 숫자 셀로 보이도록 숫자 타입으로 기록 (단위는 열 이름으로)
+                df = to_typed_frame(df, units_in_header=True)
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return buffer.getvalue()
@@ -0,0 +1,411 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from table_classifier import CONTRACT_TYPE, get_table_types, score_table_types
+
+# 열 전체를 하나의 문자열로 이어 붙일 때 쓰는 구분자 (셀 내용에 나오지 않는 제어 문자)
+CELL_SEPARATOR = '\x1f'
+
+# 숫자 셀 정리: 쉼표/공백/통화 기호/닫는 괄호 제거, 여는 괄호와 △는 음수 부호로
+NUMERIC_REPLACEMENTS = [
+    (',', ''), (' ', ''), ('\u00a0', ''), ('\t', ''), ('₩', ''), ('$', ''), (')', ''),
+    ('(', '-'), ('△', '-'),
+]
+
+# 값 끝에 붙는 단위 (긴 것부터 확인)
+UNIT_SUFFIXES = ['백만원', '천원', '억원', '조원', '원', '%']
+
+# 숫자 열에서 값이 없음을 뜻하는 표시
+EMPTY_VALUE_MARKERS = ['', '-', '–', '—', 'N/A', 'n/a', 'NA']
+
+# 열 이름에 포함된 단위 표시 (예: '매출액(백만원)', '면적(㎡)', '[단위: 억원]')
+HEADER_UNIT_PATTERN = re.compile(r'[(\[]\s*(?:단위\s*[:：]\s*)?(%|원|천원|백만원|억원|조원|㎡|주|배)\s*[)\]]')
+
+# 계약 테이블 재구성: 상단 표(세대 정보) 열
+UNIT_COLUMNS = ['호실', '계약자', '면적(㎡)', '분양대금']
+# 하단 표(납부 정보)의 구분 열 이름
+INSTALLMENT_LABEL_COLUMN = '구분'
+# 같은 이름의 열에 pandas가 붙이는 접미사 ('납부금액', '납부금액.1', ... '납부금액.5')
+DUPLICATE_SUFFIX_PATTERN = re.compile(r'^(.*)\.(\d+)$')
+
+# 납부 차수 열을 찾는 함수
+def find_installment_columns(df):
+    """
+    열 이름에서 납부 차수별로 반복되는 열 구성을 찾음
+    
+    CSV 헤더에 같은 이름이 반복되면 pandas가 '.1', '.2' … 접미사를 붙이므로, 접미사가 붙은 열이
+    하나라도 있는 이름을 차수별 항목(납부할금액, 납부금액, 납부일 등)으로 봅니다.
+    접미사가 없는 열이 첫 차수(0)입니다.
+    
+    Args:
+        df (DataFrame): 원본 데이터프레임
+    
+    Returns:
+        tuple: (항목 이름 목록(열 순서), 차수 수) - 반복되는 열이 없으면 ([], 0)
+    """
+    names = [str(col) for col in df.columns]
+    suffixed = {}
+    for name in names:
+        match = DUPLICATE_SUFFIX_PATTERN.match(name)
+        if match and match.group(1) in names:
+            suffixed[match.group(1)] = max(suffixed.get(match.group(1), 0), int(match.group(2)))
+    if not suffixed:
+        return [], 0
+    fields = [name for name in names if name in suffixed]
+    return fields, max(suffixed.values()) + 1
+
+# 납부 차수 이름을 만드는 함수
+def get_installment_labels(stages):
+    """차수 수에 맞는 구분 이름 (첫 차수는 계약금, 마지막 차수는 잔금, 나머지는 중도금 n차)"""
+    if stages <= 1:
+        return ['계약금'][:stages]
+    return ['계약금'] + [f'중도금 {i}차' for i in range(1, stages - 1)] + ['잔금']
+
+# PDF 테이블 구조와 유사하게 데이터 재구성
+def restructure_table_data(df):
+    """
+    Gemini가 추출한 계약 CSV 데이터를 PDF 테이블 구조와 유사하게 재구성
+    
+    한 행이 세대 하나이고 납부 차수별 열이 옆으로 반복되는 넓은 표를, 모든 행에 대해 한 번에
+    상단 표(세대 정보)와 하단 표(차수별 납부 정보)로 나눕니다. 차수별 열은 열 이름으로 찾으므로
+    ('납부금액', '납부금액.1' …) 차수 수나 항목이 달라도 그대로 처리합니다.
+    
+    Args:
+        df (DataFrame): 원본 데이터프레임
+    
+    Returns:
+        dict: 'top_table'(세대별 한 행), 'bottom_table'(세대×차수별 한 행, 여러 세대면 '호실' 열 포함),
+              'long'(세대 정보와 납부 정보를 합친 긴 형식), 'combined'(내보낼 표 - 세대가 하나면
+              상단/구분선/하단을 이은 표, 여럿이면 긴 형식) - 재구성할 수 없으면 원본 데이터프레임
+    """
+    try:
+        # 데이터가 없는 경우 원본 반환
+        if df.empty or len(df) == 0:
+            return df
+        
+        fields, stages = find_installment_columns(df)
+        if not fields:
+            # 반복되는 열이 없으면 기존 열 구성(납부 항목 3개, 계약금/중도금 1~4차/잔금)으로 가정
+            fields, stages = ['납부할금액(연체료포함)', '납부금액', '납부일'], 6
+        installment_columns = {name for field in fields
+                               for name in [field] + [f'{field}.{i}' for i in range(1, stages)]}
+        
+        # 상단 테이블 (기본 정보): 열 이름으로 찾고, 이름이 다르면 차수별 열이 아닌 앞쪽 열 사용
+        df = df.reset_index(drop=True)
+        if '호실' in df.columns and '계약자' in df.columns:
+            top_table = df.reindex(columns=UNIT_COLUMNS, fill_value='')
+        else:
+            other = [col for col in df.columns if str(col) not in installment_columns][:len(UNIT_COLUMNS)]
+            top_table = df[other].set_axis(UNIT_COLUMNS[:len(other)], axis=1)
+            top_table = top_table.reindex(columns=UNIT_COLUMNS, fill_value='')
+        
+        # 하단 테이블 (납부 정보): (세대, 항목, 차수) 값을 (세대, 차수, 항목)으로 바꿔 한 번에 펼침
+        wide_columns = [field if stage == 0 else f'{field}.{stage}'
+                        for field in fields for stage in range(stages)]
+        values = df.reindex(columns=wide_columns, fill_value='').to_numpy(dtype=object)
+        values = values.reshape(len(df), len(fields), stages).transpose(0, 2, 1).reshape(-1, len(fields))
+        bottom_table = pd.DataFrame(values, columns=fields)
+        bottom_table.insert(0, INSTALLMENT_LABEL_COLUMN, np.tile(get_installment_labels(stages), len(df)))
+        
+        units = top_table.loc[top_table.index.repeat(stages)].reset_index(drop=True)
+        long_table = pd.concat([units, bottom_table], axis=1)
+        
+        if len(df) == 1:
+            # 단일 세대: 상단/하단 표를 구분선으로 이어 붙임
+            separator = pd.DataFrame([['---'] * len(UNIT_COLUMNS)], columns=UNIT_COLUMNS)
+            combined = pd.concat([top_table, separator, bottom_table], ignore_index=True)
+        else:
+            # 여러 세대: 하단 표에 세대를 구분하는 호실 열을 붙이고, 내보낼 때는 긴 형식 사용
+            bottom_table.insert(0, UNIT_COLUMNS[0], units[UNIT_COLUMNS[0]])
+            combined = long_table
+        
+        return {
+            'top_table': top_table,
+            'bottom_table': bottom_table,
+            'long': long_table,
+            'combined': combined
+        }
+        
+    except Exception as e:
+        print(f"테이블 재구성 중 오류: {e}")
+        return df
+
+# 표가 계약 테이블 형식인지 확인하는 함수
+def is_contract_table(df, scores=None):
+    """
+    표가 계약 테이블 형식(호실, 계약자, 면적 등의 정보)인지 확인
+    
+    Args:
+        df (DataFrame): 확인할 데이터프레임
+        scores (dict): score_table_types 결과 (detect_table_type과 함께 쓸 때 다시 훑지 않도록 전달)
+    
+    Returns:
+        bool: 계약 테이블 형식이면 True, 아니면 False
+    """
+    if df is None or df.empty:
+        return False
+    
+    # 표 형태 검사 (재무제표 같은 복잡한 표는 일반적으로 행이 많고 열이 많음)
+    # 납부 차수별 열이 반복되는 계약 대장은 세대 수(행)와 차수(열)가 많아도 검사 대상
+    is_small_table = len(df) < 20 and len(df.columns) < 10
+    if not is_small_table and not find_installment_columns(df)[0]:
+        return False
+    
+    # 계약 테이블로 판단하는 조건: 열 이름이나 셀에 계약 관련 키워드가 포함되어 있어야 함
+    if scores is None:
+        scores = score_table_types(df)
+    contract_type = next(t for t in get_table_types() if t.name == CONTRACT_TYPE)
+    return scores.get(CONTRACT_TYPE, 0) >= contract_type.min_score
+
+# 표 유형을 감지하는 함수
+def detect_table_type(df, scores=None):
+    """
+    표 유형을 감지하는 함수 (재무상태표, 손익계산서, 현금흐름표 등)
+    
+    열 이름과 셀(긴 표는 앞쪽/뒤쪽 행)을 한 번 훑어 등록된 유형(table_classifier.register_table_type)별
+    키워드 수를 세고, 가장 많이 나타난 유형을 선택합니다.
+    
+    Args:
+        df (DataFrame): 감지할 데이터프레임
+        scores (dict): score_table_types 결과 (is_contract_table과 함께 쓸 때 다시 훑지 않도록 전달)
+    
+    Returns:
+        str: 감지된 표 유형 ('재무상태표', '손익계산서', '현금흐름표', '투자지표', '기타')
+    """
+    if df is None or df.empty:
+        return '알 수 없음'
+    
+    if scores is None:
+        scores = score_table_types(df)
+    
+    # 가장 높은 점수의 유형 선택 (유형별 최소 점수 이상 매칭되어야 함)
+    candidates = [t for t in get_table_types() if t.detectable]
+    if not candidates:
+        return '기타'
+    best = max(candidates, key=lambda t: scores.get(t.name, 0))
+    if scores.get(best.name, 0) >= best.min_score:
+        return best.name
+    else:
+        return '기타'
+
+# 표를 적절하게 가공하는 함수
+def process_table_by_type(df, table_type):
+    """
+    표 유형에 따라 적절한 후처리를 수행하는 함수
+    
+    재무제표 유형은 첫 번째 열(항목명)을 제외한 숫자 열을 실제 숫자 타입(Int64/Float64)으로
+    변환하고, 단위(%, 백만원 등)와 음수 개수를 df.attrs['column_units']에 기록합니다.
+    
+    Args:
+        df (DataFrame): 처리할 데이터프레임
+        table_type (str): 표 유형 ('재무상태표', '손익계산서', '현금흐름표', '기타')
+    
+    Returns:
+        DataFrame: 처리된 데이터프레임
+    """
+    if df is None or df.empty:
+        return df
+    
+    # 표 유형에 따른 처리
+    if table_type in ['재무상태표', '손익계산서', '현금흐름표']:
+        # 숫자 열을 숫자 타입으로 변환 (첫 번째 열은 항목명이므로 제외)
+        df = normalize_numeric_columns(df, skip_columns=[df.columns[0]])
+    else:
+        df = df.copy()
+    
+    # 남은 문자열 열의 공백 제거 (문자열이 아닌 값은 그대로 유지)
+    for position in np.flatnonzero((df.dtypes == object).to_numpy()):
+        column = df.iloc[:, position]
+        stripped = column.str.strip()
+        df.isetitem(position, stripped.where(stripped.notna(), column))
+    
+    # 빈 열과 빈 행 제거 (숫자 열의 '-' 같은 빈 값 표시도 결측값으로 처리됨)
+    df = df.dropna(how='all', axis=0).dropna(how='all', axis=1)
+    
+    return df
+
+# 숫자 열을 한꺼번에 변환하는 함수
+def normalize_numeric_columns(df, skip_columns=()):
+    """
+    데이터프레임의 숫자 열을 숫자 타입(Int64/Float64)으로 변환
+    
+    변환할 모든 문자열 열을 구분자로 이어 붙인 문자열 하나에 쉼표/통화 기호 제거와
+    괄호/△ 음수 변환을 한 번에 적용하고, 다시 나눈 값을 열마다 한꺼번에 실수로 변환합니다.
+    단위가 붙어 있는 등 이 방식으로 변환되지 않는 열만 normalize_numeric_column으로 따로 처리합니다.
+    
+    Args:
+        df (DataFrame): 처리할 데이터프레임
+        skip_columns (list): 변환하지 않을 열 이름
+    
+    Returns:
+        DataFrame: 변환된 데이터프레임 (attrs['column_units']에 열별 단위 정보)
+    """
+    df = df.copy()
+    column_units = dict(df.attrs.get('column_units', {}))
+    positions = [
+        position for position, col in enumerate(df.columns)
+        if col not in skip_columns and df.dtypes.iloc[position] == object
+    ]
+    
+    cells = None
+    if positions:
+        block = df.iloc[:, positions].fillna('').to_numpy(dtype=object)
+        try:
+            joined = CELL_SEPARATOR.join(block.T.ravel().tolist())
+        except TypeError:
+            # 문자열이 아닌 값이 섞여 있으면 열마다 처리
+            joined = None
+        if joined is not None and joined.count(CELL_SEPARATOR) == block.size - 1:
+            cells = np.array(_clean_numeric_text(joined).split(CELL_SEPARATOR), dtype=object)
+            cells = cells.reshape(len(positions), len(df))
+    
+    for k, position in enumerate(positions):
+        col = df.columns[position]
+        series = df.iloc[:, position]
+        values = _cells_to_float(cells[k]) if cells is not None else None
+        if values is not None:
+            converted, info = _to_typed_series(values, series, col, None)
+        else:
+            converted, info = normalize_numeric_column(series, header=col)
+        df.isetitem(position, converted)
+        if info is not None:
+            column_units[col] = info
+    df.attrs['column_units'] = column_units
+    return df
+
+# 숫자 열 하나를 변환하는 함수
+def normalize_numeric_column(series, header=None):
+    """
+    열의 모든 값이 숫자 형식이면 숫자 타입으로 변환하고 단위 정보를 반환
+    
+    열 전체를 구분자로 이어 붙인 문자열 하나에 치환(쉼표/통화 기호 제거, 괄호/△ 음수를 '-'로,
+    끝의 단위 제거)을 적용한 뒤 다시 나누어 한꺼번에 실수로 변환합니다.
+    값 끝의 단위(%, 백만원 등)는 열의 단위 정보로 옮깁니다. 숫자가 아닌 값이 섞여 있거나
+    단위가 서로 다르면 문자열로 두고 공백 제거, 쉼표 제거, 괄호 음수 변환만 적용합니다.
+    
+    Args:
+        series (Series): 처리할 열
+        header: 열 이름 (단위 표시를 찾는 데 사용)
+    
+    Returns:
+        tuple: (변환된 Series, 단위 정보 dict - 'unit', 'percent', 'negatives', 'dtype') 또는
+               숫자 열이 아니면 (문자열 정리만 한 Series, None)
+    """
+    if series.dtype != object:
+        return series, None
+    
+    inferred = pd.api.types.infer_dtype(series, skipna=True)
+    values, unit = None, None
+    if inferred == 'string':
+        joined = CELL_SEPARATOR.join(series.fillna('').tolist())
+        if joined.count(CELL_SEPARATOR) == len(series) - 1:
+            joined, unit = _strip_unit(_clean_numeric_text(joined))
+            if joined is not None:
+                values = _cells_to_float(np.array(joined.split(CELL_SEPARATOR), dtype=object))
+    elif inferred in ('integer', 'floating', 'mixed-integer-float'):
+        values = series.astype('float64').to_numpy()
+    elif inferred == 'empty':
+        return series, None
+    
+    if values is None:
+        # 숫자 열이 아니면 이전과 같이 문자열 값만 정리
+        text = series.str.strip().str.replace(',', '', regex=False).str.replace(r'^\((.*)\)$', r'-\1', regex=True)
+        return text.where(text.notna(), series), None
+    return _to_typed_series(values, series, header, unit)
+
+# 숫자 문자열 정리 함수
+def _clean_numeric_text(joined):
+    """이어 붙인 셀 문자열에서 쉼표/공백/통화 기호를 지우고 괄호/△ 음수를 '-'로 변환"""
+    for old, new in NUMERIC_REPLACEMENTS:
+        joined = joined.replace(old, new)
+    return joined
+
+# 값 끝의 단위를 떼어 내는 함수
+def _strip_unit(joined):
+    """
+    이어 붙인 셀 문자열에서 셀 끝의 단위를 제거
+    
+    Returns:
+        tuple: (단위를 뗀 문자열, 단위) - 단위가 두 종류 이상이면 (None, None)
+    """
+    unit = None
+    joined += CELL_SEPARATOR
+    for suffix in UNIT_SUFFIXES:
+        if suffix + CELL_SEPARATOR in joined:
+            if unit is not None:
+                return None, None
+            unit = suffix
+            joined = joined.replace(suffix + CELL_SEPARATOR, CELL_SEPARATOR)
+    return joined[:-1], unit
+
+# 정리된 셀을 실수로 변환하는 함수
+def _cells_to_float(cells):
+    """
+    정리된 셀 배열을 실수 배열로 변환
+    
+    Returns:
+        ndarray: float64 배열 (빈 값은 NaN), 숫자가 아닌 셀이 있거나 모두 빈 값이면 None
+    """
+    empty = pd.Series(cells, copy=False).isin(EMPTY_VALUE_MARKERS).to_numpy()
+    if empty.all():
+        return None
+    cells = np.where(empty, 'nan', cells)
+    try:
+        values = cells.astype('float64')
+    except (TypeError, ValueError):
+        return None
+    # 'inf', 'nan' 같은 문자열도 실수로 변환되므로 따로 거부
+    if np.isinf(values).any() or (np.isnan(values) & ~empty).any():
+        return None
+    return values
+
+# 실수 배열을 결측값을 허용하는 숫자 열로 만드는 함수
+def _to_typed_series(values, series, header, unit):
+    """
+    실수 배열을 Int64(모두 정수인 경우) 또는 Float64 Series로 만들고 단위 정보 생성
+    
+    Returns:
+        tuple: (변환된 Series, 단위 정보 dict)
+    """
+    missing = np.isnan(values)
+    present = values[~missing]
+    if np.all(np.mod(present, 1) == 0) and np.all(np.abs(present) < 2 ** 53):
+        array = pd.arrays.IntegerArray(np.where(missing, 0, values).astype('int64'), missing)
+    else:
+        array = pd.arrays.FloatingArray(np.where(missing, 0.0, values), missing)
+    converted = pd.Series(array, index=series.index, name=series.name)
+    
+    if unit is None and header is not None:
+        header_unit = HEADER_UNIT_PATTERN.search(str(header))
+        unit = header_unit.group(1) if header_unit else None
+    return converted, {
+        'unit': unit,
+        'percent': unit == '%',
+        'negatives': int(np.count_nonzero(present < 0)),
+        'dtype': str(converted.dtype),
+    }
+
+# 숫자 값 처리 함수
+def process_numeric_value(value):
+    """
+    숫자 값을 처리하는 함수
+    
+    Args:
+        value: 처리할 값
+    
+    Returns:
+        처리된 값
+    """
+    if not isinstance(value, str):
+        return value
+    
+    # 천단위 구분자(쉼표) 제거
+    value = value.replace(',', '')
+    
+    # 괄호로 표시된 음수를 "-" 기호로 변환
+    if value.startswith('(') and value.endswith(')'):
+        value = '-' + value[1:-1]
+    
+    return value
@@ -0,0 +1,86 @@
+"""
+추출 결과 검증
+
+모델 응답을 다시 받지 않고 로컬에서 빠르게 확인할 수 있는 항목만 검사합니다.
+단계적 모델 사용(빠른 모델 → 강한 모델)에서 빠른 모델의 결과를 그대로 쓸지,
+강한 모델로 다시 추출할지 판단하는 데 사용합니다.
+
+- 표를 하나도 찾지 못했거나 파싱 오류가 난 표가 있는지
+- CSV 형식 오류를 보정한 표(행마다 열 수가 달라 셀을 합치거나 열을 늘린 표)가 있는지
+- 숫자 열에 숫자로 읽을 수 없는 셀(예: '1O,000', '12.3.4')이 섞여 있는지
+"""
+import re
+
+import pandas as pd
+
+# 숫자 셀로 인정하는 형식 (부호/괄호 음수, 천 단위 쉼표, 소수점, 단위 접미사)
+NUMBER_PATTERN = re.compile(
+    r'^[(\-−△▲+]?\s*(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?\s*\)?\s*(?:%|원|천원|백만원|억원|조원|배|주)?$'
+)
+EMPTY_CELLS = {'', '-', '–', '—', 'n/a', 'na', 'nan', 'none'}
+# 숫자 형식 셀이 이 비율 이상인 열을 숫자 열로 봄
+NUMERIC_COLUMN_RATIO = 0.6
+# 숫자 열에서 숫자로 읽을 수 없는 셀의 허용 비율
+MAX_MALFORMED_NUMBER_RATIO = 0.05
+
+
+def malformed_number_ratio(df):
+    """
+    숫자 열에서 숫자가 들어 있지만 숫자 형식이 아닌 셀의 비율
+
+    첫 열은 항목명으로 보고 검사하지 않습니다.
+
+    Args:
+        df (DataFrame): 검사할 데이터프레임
+
+    Returns:
+        float: 0.0 ~ 1.0 (숫자 열이 없으면 0.0)
+    """
+    checked = malformed = 0
+    for col in df.columns[1:]:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            continue
+        cells = series.dropna().astype(str).str.strip()
+        cells = cells[~cells.str.lower().isin(EMPTY_CELLS)]
+        if cells.empty:
+            continue
+        is_number = cells.str.match(NUMBER_PATTERN)
+        if is_number.mean() < NUMERIC_COLUMN_RATIO:
+            continue
+        has_digit = cells.str.contains(r'\d')
+        checked += len(cells)
+        malformed += int((has_digit & ~is_number).sum())
+    return malformed / checked if checked else 0.0
+
+
+def validate_tables(tables, allow_empty=False):
+    """
+    추출된 표 목록을 검증하여 발견한 문제 목록 반환
+
+    Args:
+        tables (list): 추출된 표 정보 목록
+        allow_empty (bool): 표가 하나도 없는 결과를 정상으로 볼지 여부
+
+    Returns:
+        list: 문제 설명 문자열 목록 (비어 있으면 통과)
+    """
+    if not tables:
+        return [] if allow_empty else ["표를 찾지 못했습니다"]
+
+    issues = []
+    for table in tables:
+        name = f"표 {table['index'] + 1}"
+        if table.get('error', False):
+            issues.append(f"{name} 파싱 실패")
+            continue
+        if table.get('recovery', False):
+            issues.append(f"{name} 행마다 열 수가 다름")
+        df = table['df']
+        if df.empty or len(df.columns) < 2:
+            issues.append(f"{name} 내용이 비어 있음")
+            continue
+        ratio = malformed_number_ratio(df)
+        if ratio > MAX_MALFORMED_NUMBER_RATIO:
+            issues.append(f"{name} 숫자 형식 오류 {ratio:.0%}")
+    return issues